@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Dynamic Router dashboard benchmark
+Times get_router_status() ticks of router-dashboard.py against fixture trees
+instead of the live machine, so results are reproducible and comparable
+between commits. Each fixture holds a /proc, /sys/class/net and /etc tree plus
+canned output for stub ip, ss, systemctl, nmcli and pgrep executables that
+are put first on PATH. Fixtures are generated for the built-in scenarios
+(small: 2 clients, 3 subnets; huge: 5k neighbours, 10k subnets, 50k flows)
+or recorded from a live router with --record.
+Every scenario/collector pair runs in its own process and reports tick
+latency percentiles (all probes forced, and the steady one-second schedule),
+subprocesses spawned per tick, read() and write() calls per tick from
+/proc/self/io (other syscalls such as open, stat and ioctl are not counted
+there), peak RSS and per-probe timings.
+Usage: python3 router-bench.py [--scenarios small,huge] [--collectors native,shell] [--iterations 30]
+                               [--fixtures DIR] [--save baseline.json] [--compare baseline.json]
+       sudo python3 router-bench.py --record NAME --fixtures DIR
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "router-dashboard.py")
+
+SCENARIOS = {
+    'small': {'clients': 2, 'subnets': 3, 'sockets': 20, 'flows': 50, 'vpn': 1},
+    'huge': {'clients': 5000, 'subnets': 10000, 'sockets': 20000, 'flows': 50000, 'vpn': 4},
+}
+WAN_IFACE, WAN_IP, WAN_GATEWAY = "ens18", "192.0.2.10", "192.0.2.1"
+LAN_IFACE, LAN_IP, LAN_PREFIX = "ens19", "10.20.0.1", 18
+COUNTER_NAMES = ('rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets')
+SERVICE_UNIT = "dynamic-router.service"
+
+# Stubs answer the exact commands ShellCollector and the probes run
+STUBS = {
+    'ip': '''case "$*" in
+  route) cat "$F/ip-route" ;;
+  "-4 addr show "*) cat "$F/ip-addr-$4" 2>/dev/null ;;
+  "neigh show dev "*) cat "$F/ip-neigh-$4" 2>/dev/null ;;
+  "-o link show") cat "$F/ip-link" ;;
+  "route show dev "*) grep " dev $4 " "$F/ip-route" ;;
+esac''',
+    'ss': 'cat "$F/ss"',
+    'systemctl': '''case "$1" in
+  is-active) cat "$F/systemctl-is-active" ;;
+  show) cat "$F/systemctl-$4" 2>/dev/null ;;
+esac''',
+    'nmcli': 'cat "$F/nmcli-dev-show"',
+    'pgrep': 'cat "$F/pgrep"',
+}
+
+# --------------- Fixtures ---------------------------------------
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+def hex_ip(ip):
+    """Address as it appears in /proc/net/route (host byte order hex)"""
+    return f"{struct.unpack('<I', socket.inet_aton(ip))[0]:08X}"
+
+def host(network, index):
+    """index-th address after network, as a dotted quad"""
+    return socket.inet_ntoa(struct.pack('>I', struct.unpack('>I', socket.inet_aton(network))[0] + index))
+
+def write_stubs(root):
+    for name, body in STUBS.items():
+        path = os.path.join(root, "bin", name)
+        write(path, f'#!/bin/sh\nF="$ROUTER_BENCH_FIXTURE/commands"\n{body}\n')
+        os.chmod(path, 0o755)
+
+def write_service(root, exec_start, active=True):
+    commands = os.path.join(root, "commands")
+    write(os.path.join(commands, "systemctl-is-active"), "active\n" if active else "inactive\n")
+    write(os.path.join(commands, "systemctl-ExecStart"), exec_start + "\n")
+    write(os.path.join(commands, "systemctl-ActiveEnterTimestamp"),
+          time.strftime("%a %Y-%m-%d %H:%M:%S UTC\n", time.gmtime(time.time() - 86400)))
+    write(os.path.join(root, "etc", "systemd", "system", SERVICE_UNIT), f"[Service]\nExecStart={exec_start}\n")
+
+def build_fixture(root, clients, subnets, sockets, flows, vpn):
+    """Write a synthetic router: WAN, LAN, vpn tun interfaces and the given table sizes"""
+    rng = random.Random(f"{clients}/{subnets}/{sockets}/{flows}/{vpn}")
+    proc = os.path.join(root, "proc")
+    net = os.path.join(root, "sys", "class", "net")
+    commands = os.path.join(root, "commands")
+    vpns = [f"tun{i}" for i in range(vpn)]
+    lan_network = host(LAN_IP, -1)
+    lan_mask = socket.inet_ntoa(struct.pack('>I', (0xffffffff << (32 - LAN_PREFIX)) & 0xffffffff))
+
+    # Interfaces
+    ifaces = ["lo", WAN_IFACE, LAN_IFACE] + vpns
+    for index, iface in enumerate(ifaces, 1):
+        write(os.path.join(net, iface, "ifindex"), f"{index}\n")
+        write(os.path.join(net, iface, "flags"), "0x1003\n" if iface != "lo" else "0x9\n")
+        for name in COUNTER_NAMES:
+            write(os.path.join(net, iface, "statistics", name), f"{rng.randrange(1 << 40)}\n")
+    write(os.path.join(commands, "ip-link"),
+          "".join(f"{index}: {iface}: <UP,LOWER_UP> mtu 1500 state UP\n" for index, iface in enumerate(ifaces, 1)))
+    write(os.path.join(commands, f"ip-addr-{WAN_IFACE}"), f"    inet {WAN_IP}/24 brd 192.0.2.255 scope global {WAN_IFACE}\n")
+    write(os.path.join(commands, f"ip-addr-{LAN_IFACE}"), f"    inet {LAN_IP}/{LAN_PREFIX} scope global {LAN_IFACE}\n")
+
+    # Routes: default via WAN, the two connected networks, a few per VPN
+    routes = [(WAN_IFACE, "0.0.0.0", WAN_GATEWAY, "0.0.0.0", 100), (WAN_IFACE, "192.0.2.0", "0.0.0.0", "255.255.255.0", 100),
+              (LAN_IFACE, lan_network, "0.0.0.0", lan_mask, 0)]
+    routes += [(iface, f"172.{16 + i}.0.0", "0.0.0.0", "255.255.0.0", 50) for i, iface in enumerate(vpns)]
+    lines = ["Iface\tDestination\tGateway \tFlags\tRefCnt\tUse\tMetric\tMask\t\tMTU\tWindow\tIRTT"]
+    lines += [f"{iface}\t{hex_ip(dest)}\t{hex_ip(gw)}\t{'0003' if gw != '0.0.0.0' else '0001'}\t0\t0\t{metric}\t{hex_ip(mask)}\t0\t0\t0"
+              for iface, dest, gw, mask, metric in routes]
+    write(os.path.join(proc, "net", "route"), "\n".join(lines) + "\n")
+    ip_routes = [f"default via {WAN_GATEWAY} dev {WAN_IFACE} proto dhcp metric 100",
+                 f"192.0.2.0/24 dev {WAN_IFACE} proto kernel scope link src {WAN_IP}",
+                 f"{lan_network}/{LAN_PREFIX} dev {LAN_IFACE} proto kernel scope link src {LAN_IP}"]
+    ip_routes += [f"172.{16 + i}.0.0/16 dev {iface} scope link" for i, iface in enumerate(vpns)]
+    write(os.path.join(commands, "ip-route"), "\n".join(ip_routes) + "\n")
+
+    # Neighbours
+    neighbours = [host(LAN_IP, i + 1) for i in range(clients)]
+    macs = [f"52:54:00:{i >> 16 & 0xff:02x}:{i >> 8 & 0xff:02x}:{i & 0xff:02x}" for i in range(clients)]
+    lines = ["IP address       HW type     Flags       HW address            Mask     Device"]
+    lines += [f"{ip:<16} 0x1         0x2         {mac}     *        {LAN_IFACE}" for ip, mac in zip(neighbours, macs)]
+    write(os.path.join(proc, "net", "arp"), "\n".join(lines) + "\n")
+    write(os.path.join(commands, f"ip-neigh-{LAN_IFACE}"),
+          "".join(f"{ip} lladdr {mac} REACHABLE\n" for ip, mac in zip(neighbours, macs)))
+
+    # Router sockets, half of them established
+    lines = ["  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode"]
+    for i in range(sockets):
+        state = "01" if i % 2 == 0 else "0A"
+        lines.append(f"{i:4}: {hex_ip(WAN_IP)}:{1024 + i % 60000:04X} {hex_ip(host('93.184.0.0', i % 65000))}:01BB "
+                     f"{state} 00000000:00000000 00:00000000 00000000     0        0 {100000 + i}")
+    write(os.path.join(proc, "net", "tcp"), "\n".join(lines) + "\n")
+    write(os.path.join(commands, "ss"), "State Recv-Q Send-Q Local Address:Port Peer Address:Port\n" +
+          "".join(f"ESTAB 0 0 {WAN_IP}:{1024 + i} 93.184.0.1:443\n" for i in range(0, sockets, 2)))
+
+    # Forwarded flows of the LAN clients
+    lines = []
+    for i in range(flows):
+        client = neighbours[i % len(neighbours)] if neighbours else host(LAN_IP, 1)
+        remote = host("93.184.0.0", rng.randrange(65000))
+        sport = 1024 + i % 60000
+        lines.append(f"ipv4     2 tcp      6 431999 ESTABLISHED src={client} dst={remote} sport={sport} dport=443 "
+                     f"packets={i % 900 + 1} bytes={(i % 900 + 1) * 120} src={remote} dst={WAN_IP} sport=443 dport={sport} "
+                     f"packets={i % 700 + 1} bytes={(i % 700 + 1) * 1400} [ASSURED] mark=0 zone=0 use=2")
+    write(os.path.join(proc, "net", "nf_conntrack"), "\n".join(lines) + "\n" if lines else "")
+
+    # The router process, found through /proc/<pid>/cmdline
+    for pid, cmdline in ((1, "/sbin/init"), (812, "/usr/sbin/dnsmasq"), (1344, "/bin/bash /usr/local/bin/dynamic-router.sh --run")):
+        write(os.path.join(proc, str(pid), "cmdline"), cmdline.replace(" ", "\0") + "\0")
+    write(os.path.join(commands, "pgrep"), "1344\n")
+
+    # Configuration
+    subnets_file = os.path.join(root, "etc", "router", "vpn-subnets.txt")
+    write(subnets_file, "# VPN subnets\n" + "".join(f"{host('100.64.0.0', i * 256)}/24\n" for i in range(subnets)))
+    write(os.path.join(root, "etc", "dnsmasq.d", "lan.conf"),
+          f"interface={LAN_IFACE}\ndhcp-range=10.20.0.100,10.20.63.200,12h\nserver=1.1.1.1\nserver=9.9.9.9\n")
+    write_service(root, f"/usr/local/bin/dynamic-router.sh --lan {LAN_IFACE} --vpn --subnets {subnets_file}")
+    write(os.path.join(commands, "nmcli-dev-show"),
+          f"GENERAL.DEVICE: {WAN_IFACE}\nIP4.ADDRESS[1]: {WAN_IP}/24\nIP4.DNS[1]: 192.0.2.53\nIP4.DNS[2]: 192.0.2.54\n")
+    write_stubs(root)
+
+def copy_file(source, target):
+    """Copy a file, /proc files included (they report size 0), False if unreadable"""
+    try:
+        with open(source, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(data)
+    return True
+
+def capture(command):
+    try:
+        return subprocess.run(command, shell=True, capture_output=True, text=True, timeout=10).stdout
+    except subprocess.TimeoutExpired:
+        return ""
+
+def record_fixture(root, dashboard):
+    """Snapshot the files and command output the dashboard reads on this machine"""
+    proc = os.path.join(root, "proc")
+    commands = os.path.join(root, "commands")
+    for table in ("route", "arp", "tcp", "tcp6", "nf_conntrack"):
+        copy_file(f"/proc/net/{table}", os.path.join(proc, "net", table))
+    ifaces = os.listdir("/sys/class/net")
+    for iface in ifaces:
+        for name in ("ifindex", "flags") + tuple(f"statistics/{n}" for n in COUNTER_NAMES):
+            copy_file(f"/sys/class/net/{iface}/{name}", os.path.join(root, "sys", "class", "net", iface, name))
+        write(os.path.join(commands, f"ip-addr-{iface}"), capture(f"ip -4 addr show {iface}"))
+        write(os.path.join(commands, f"ip-neigh-{iface}"), capture(f"ip neigh show dev {iface}"))
+    write(os.path.join(commands, "ip-route"), capture("ip route"))
+    write(os.path.join(commands, "ip-link"), capture("ip -o link show"))
+    write(os.path.join(commands, "ss"), capture("ss -t state established"))
+    wan = capture("ip route | awk '/^default/ {print $5; exit}'").strip()
+    write(os.path.join(commands, "nmcli-dev-show"), capture(f"nmcli dev show {wan}") if wan else "")
+    write(os.path.join(commands, "pgrep"), "")
+    copy_file(dashboard.DNSMASQ_CONF, os.path.join(root, "etc", "dnsmasq.d", "lan.conf"))
+    copy_file(dashboard.COMPILED_SUBNETS_FILE, os.path.join(root, "etc", "router", "vpn-subnets.compiled"))
+
+    # The subnets file named in ExecStart is copied and ExecStart points at the copy
+    exec_start = capture(f"systemctl show {SERVICE_UNIT} -p ExecStart --value").strip()
+    subnets_file = dashboard.DEFAULT_SUBNETS_FILE
+    if '--subnets' in exec_start:
+        parts = exec_start.split('--subnets')[1].split()
+        subnets_file = parts[0] if parts else subnets_file
+    copy = os.path.join(root, "etc", "router", "vpn-subnets.txt")
+    copy_file(subnets_file, copy)
+    write_service(root, exec_start.replace(subnets_file, copy),
+                  active=capture(f"systemctl is-active {SERVICE_UNIT}").strip() == "active")
+    write_stubs(root)
+
+# --------------- Measurement ------------------------------------
+
+def load_dashboard():
+    spec = importlib.util.spec_from_file_location("router_dashboard", DASHBOARD)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def read_proc_io():
+    """syscr, syscw and rchar of this process, empty when /proc/self/io is not readable"""
+    try:
+        with open("/proc/self/io") as f:
+            return {key: int(value) for key, value in (line.split(': ') for line in f)}
+    except OSError:
+        return {}
+
+def latency(samples, percentile):
+    ordered = sorted(samples)
+    return {
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p90_ms': round(percentile(ordered, 90) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+def run_worker(fixture, collector_name, iterations):
+    """Measure one collector against one fixture, in this (fresh) process"""
+    dashboard = load_dashboard()
+    commands = os.path.join(fixture, "commands")
+    etc = os.path.join(fixture, "etc")
+    dashboard.UNIT_FILE = os.path.join(etc, "systemd", "system", SERVICE_UNIT)
+    dashboard.DNSMASQ_CONF = os.path.join(etc, "dnsmasq.d", "lan.conf")
+    dashboard.DEFAULT_SUBNETS_FILE = os.path.join(etc, "router", "vpn-subnets.txt")
+    dashboard.COMPILED_SUBNETS_FILE = os.path.join(etc, "router", "vpn-subnets.compiled")
+
+    class FixtureCollector(dashboard.NativeCollector):
+        """NativeCollector whose addresses come from the fixture. The native ioctl is
+        still issued, against the live kernel, so its cost stays in the timings."""
+
+        def iface_address(self, iface, prefix=False):
+            super().iface_address(iface, prefix)
+            try:
+                with open(os.path.join(commands, f"ip-addr-{iface}")) as f:
+                    address = next((line.split()[1] for line in f if line.strip().startswith('inet ')), "")
+            except OSError:
+                return ""
+            return address if prefix else address.split('/')[0]
+
+    if collector_name == 'native':
+        dashboard.collector = FixtureCollector(os.path.join(fixture, "proc"), os.path.join(fixture, "sys"))
+    else:
+        dashboard.collector = dashboard.COLLECTORS[collector_name]()
+    dashboard.conntrack = dashboard.ConntrackAccounting(os.path.join(fixture, "proc"))
+    dashboard.conntrack.start_events = lambda: False  # live kernel events would skew the fixture
+    profiler = dashboard.ProbeProfiler()
+    scheduler = dashboard.build_scheduler(profiler)
+
+    spawned = [0]
+
+    class CountingPopen(subprocess.Popen):
+        def __init__(self, *args, **kwargs):
+            spawned[0] += 1
+            super().__init__(*args, **kwargs)
+    subprocess.Popen = CountingPopen
+
+    # Cold tick: first read of every file, empty caches
+    start = time.perf_counter()
+    scheduler.refresh()
+    cold = time.perf_counter() - start
+
+    # Forced ticks: every probe runs, the cost of a full refresh
+    io_before = read_proc_io()
+    spawned[0] = 0
+    full = []
+    for _ in range(iterations):
+        scheduler.invalidate()
+        start = time.perf_counter()
+        scheduler.refresh()
+        full.append(time.perf_counter() - start)
+    io_after = read_proc_io()
+    full_spawned = spawned[0]
+
+    # Steady ticks: the dashboard's one-second schedule on a simulated clock
+    now = time.time()
+    steady = []
+    spawned[0] = 0
+    for second in range(1, iterations + 1):
+        start = time.perf_counter()
+        scheduler.refresh(now + second)
+        steady.append(time.perf_counter() - start)
+
+    status = scheduler.data
+    return {
+        'collector': collector_name,
+        'iterations': iterations,
+        'cold_ms': round(cold * 1000, 3),
+        'full': latency(full, dashboard.percentile),
+        'steady': latency(steady, dashboard.percentile),
+        'subprocesses_per_tick': round(full_spawned / iterations, 2),
+        'steady_subprocesses_per_tick': round(spawned[0] / iterations, 2),
+        'read_syscalls_per_tick': round((io_after.get('syscr', 0) - io_before.get('syscr', 0)) / iterations, 1),
+        'write_syscalls_per_tick': round((io_after.get('syscw', 0) - io_before.get('syscw', 0)) / iterations, 1),
+        'read_bytes_per_tick': round((io_after.get('rchar', 0) - io_before.get('rchar', 0)) / iterations),
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'probes': profiler.summary()['probes'],
+        # Sanity check that the fixture was actually read
+        'seen': {'clients': status['lan_clients'], 'subnets': len(status['vpn_subnets']),
+                 'connections': status['connections'], 'flows': status['forwarded_flows']},
+    }
+
+def run_scenario(fixture, collector_name, iterations):
+    env = dict(os.environ, ROUTER_BENCH_FIXTURE=fixture,
+               PATH=os.path.join(fixture, "bin") + os.pathsep + os.environ.get('PATH', ''))
+    env.pop('ROUTER_DASHBOARD_PROFILE', None)
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', fixture, collector_name,
+                             str(iterations)], env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{collector_name} on {fixture} failed:\n{result.stderr}")
+    return json.loads(result.stdout)
+
+# --------------- Reporting --------------------------------------
+
+def print_results(results):
+    print(f"{'scenario/collector':<22} {'p50':>9} {'p90':>9} {'p99':>9} {'steady p50':>11} "
+          f"{'procs':>6} {'reads':>8} {'rss MB':>7}  seen")
+    for key, r in results.items():
+        seen = ", ".join(f"{value} {name}" for name, value in r['seen'].items())
+        print(f"{key:<22} {r['full']['p50_ms']:>7.2f}ms {r['full']['p90_ms']:>7.2f}ms {r['full']['p99_ms']:>7.2f}ms "
+              f"{r['steady']['p50_ms']:>9.2f}ms {r['subprocesses_per_tick']:>6g} {r['read_syscalls_per_tick']:>8g} "
+              f"{r['peak_rss_kb'] / 1024:>7.1f}  {seen}")
+    print("  p50/p90/p99: every probe forced; steady: one-second schedule; procs and reads per forced tick")
+    print("  reads: read() calls from /proc/self/io, open/stat/ioctl and other syscalls are not counted")
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline, True when a p50 got worse by more than threshold %"""
+    regressed = False
+    print(f"\n{'vs baseline':<22} {'p50':>18} {'p99':>18} {'procs':>12} {'rss MB':>14}")
+    for key, r in results.items():
+        old = baseline.get('results', {}).get(key)
+        if not old:
+            print(f"{key:<22} (not in baseline)")
+            continue
+
+        def change(new, before):
+            if not before:
+                return f"{new:g}"
+            return f"{new:g} ({(new - before) / before * 100:+.0f}%)"
+        p50, old_p50 = r['full']['p50_ms'], old['full']['p50_ms']
+        worse = old_p50 and (p50 - old_p50) / old_p50 * 100 > threshold
+        regressed = regressed or worse
+        print(f"{key:<22} {change(p50, old_p50):>18} {change(r['full']['p99_ms'], old['full']['p99_ms']):>18} "
+              f"{change(r['subprocesses_per_tick'], old['subprocesses_per_tick']):>12} "
+              f"{change(round(r['peak_rss_kb'] / 1024, 1), round(old['peak_rss_kb'] / 1024, 1)):>14}"
+              f"{'  REGRESSION' if worse else ''}")
+    return regressed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark router-dashboard collectors against fixture trees")
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS),
+                        help="comma separated built-in or recorded scenarios (default: small,huge)")
+    parser.add_argument('--collectors', default="native,shell", help="comma separated collectors (default: native,shell)")
+    parser.add_argument('--iterations', type=int, default=30, help="ticks measured per series (default: 30)")
+    parser.add_argument('--fixtures', help="fixture directory, kept between runs (default: a temporary one)")
+    parser.add_argument('--record', metavar='NAME', help="record this machine as fixture NAME under --fixtures and exit")
+    parser.add_argument('--save', metavar='FILE', help="write the results as a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare against a baseline, exit 1 on a p50 regression")
+    parser.add_argument('--threshold', type=float, default=25.0,
+                        help="p50 increase in percent counted as a regression (default: 25)")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON instead of a table")
+    parser.add_argument('--worker', nargs=3, metavar=('FIXTURE', 'COLLECTOR', 'ITERATIONS'), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.worker:
+        fixture, collector_name, iterations = args.worker
+        print(json.dumps(run_worker(fixture, collector_name, int(iterations))))
+        return
+
+    if args.record:
+        if not args.fixtures:
+            print("Error: --record needs --fixtures DIR to keep the recording in.")
+            sys.exit(1)
+        root = os.path.join(args.fixtures, args.record)
+        record_fixture(root, load_dashboard())
+        print(f"Recorded fixture {root}")
+        return
+
+    fixtures = args.fixtures or tempfile.mkdtemp(prefix="router-bench-")
+    results = {}
+    try:
+        for scenario in args.scenarios.split(','):
+            root = os.path.join(fixtures, scenario)
+            if not os.path.isdir(root):
+                if scenario not in SCENARIOS:
+                    print(f"Error: unknown scenario '{scenario}' and no fixture at {root}.")
+                    sys.exit(1)
+                build_fixture(root, **SCENARIOS[scenario])
+            for collector_name in args.collectors.split(','):
+                print(f"  {scenario}/{collector_name} ...", file=sys.stderr, flush=True)
+                results[f"{scenario}/{collector_name}"] = run_scenario(os.path.abspath(root), collector_name, args.iterations)
+    finally:
+        if not args.fixtures:
+            shutil.rmtree(fixtures, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=1))
+    else:
+        print_results(results)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'created': time.strftime("%Y-%m-%dT%H:%M:%S"), 'python': platform.python_version(),
+                       'machine': platform.machine(), 'iterations': args.iterations, 'results': results},
+                      f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,29 @@
 """
 Dynamic Router Terminal UI (TUI)
 A terminal-based interface for monitoring and controlling the dynamic router
-Usage: sudo python3 router-tui.py
+Usage: sudo python3 router-tui.py [--collector native|shell] [--hub | --standalone] [--socket PATH]
+       sudo python3 router-tui.py --export [--listen 127.0.0.1:9469] [--json-lines FILE]
 Controls: q=quit, r=restart, s=stop, l=logs, h=help
 """
 
+import argparse
 import curses
+import http.server
+import errno
+import fcntl
+import heapq
+import ipaddress
+import json
+import math
+import re
+import socket
+import struct
 import subprocess
+import threading
 import time
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import sys
 import os
@@ -33,153 +49,1773 @@ def get_human_readable_bytes(bytes_val):
     except:
         return "0 B"
 
-def get_router_status():
-    """Gather all router status information"""
-    data = {}
+def get_human_readable_rate(bits_per_sec, compact=False):
+    """Convert a bit-rate to human readable format"""
+    for unit in ['', 'k', 'M', 'G']:
+        if bits_per_sec < 1000.0:
+            break
+        bits_per_sec /= 1000.0
+    else:
+        unit = 'T'
+    if compact:
+        return f"{bits_per_sec:.0f}{unit}" if bits_per_sec >= 10 or not unit else f"{bits_per_sec:.1f}{unit}"
+    return f"{bits_per_sec:.1f} {unit}b/s"
+
+# === Collectors ===
+# A collector answers the handful of kernel questions get_router_status() asks.
+# ShellCollector keeps the original ip/ss/cat pipelines. NativeCollector reads
+# the same facts straight from /proc and /sys and only falls back to the shell
+# pipeline when a native source is missing.
+
+VPN_IFACE_RE = re.compile(r'^(tun|tap|ppp|wg|ipsec)\d*$')  # same as router_ifaces.py
+NEIGH_STATES = ('REACHABLE', 'STALE', 'DELAY')
+ROUTER_RUN_PATTERN = 'dynamic-router.sh --run'
+
+class ShellCollector:
+    """Collect router facts through shell pipelines (one fork per question)"""
+    name = "shell"
+
+    def default_route_iface(self):
+        return run_command("ip route | awk '/^default/ {print $5; exit}'")
+
+    def iface_address(self, iface, prefix=False):
+        """Primary IPv4 address of iface, optionally with /prefix"""
+        output = run_command(f"ip -4 addr show {iface} 2>/dev/null | grep 'inet ' | awk '{{print $2}}'")
+        address = output.split('\n')[0]
+        return address if prefix else address.split('/')[0]
+
+    def iface_counters(self, iface, names=('rx_bytes', 'tx_bytes')):
+        """Read /sys/class/net/<iface>/statistics counters as ints"""
+        paths = " ".join(f"/sys/class/net/{iface}/statistics/{name}" for name in names)
+        values = run_command(f"cat {paths} 2>/dev/null").split('\n')
+        counters = {}
+        for name, value in zip(names, values):
+            try:
+                counters[name] = int(value)
+            except ValueError:
+                counters[name] = 0
+        for name in names[len(counters):]:
+            counters[name] = 0
+        return counters
+
+    def established_connections(self):
+        conns = run_command("ss -t state established | wc -l")
+        try:
+            return max(0, int(conns) - 1)
+        except ValueError:
+            return 0
+
+    def neighbours(self, iface):
+        """IPs of reachable neighbours on iface, link-local addresses excluded"""
+        clients = []
+        for line in run_command(f"ip neigh show dev {iface}").split('\n'):
+            if line and any(state in line for state in NEIGH_STATES):
+                ip = line.split()[0]
+                if not ip.startswith('169.254.'):
+                    clients.append(ip)
+        return clients
+
+    def link_names(self):
+        """All interface names in ifindex order"""
+        output = run_command("ip -o link show | awk -F': ' '{print $2}'")
+        return [name.split('@')[0] for name in output.split('\n') if name]
+
+    def link_up(self, iface):
+        """True if iface is administratively up (IFF_UP)"""
+        flags = run_command(f"cat /sys/class/net/{iface}/flags 2>/dev/null")
+        try:
+            return bool(int(flags, 16) & 0x1)
+        except ValueError:
+            return False
+
+    def routes(self, iface, limit=3):
+        """First few routes via iface, formatted like `ip route`"""
+        output = run_command(f"ip route show dev {iface} 2>/dev/null | head -{limit}")
+        return [line for line in output.split('\n') if line]
+
+    def find_processes(self, pattern):
+        """PIDs whose command line contains pattern"""
+        # [x]yz keeps the shell running pgrep from matching itself
+        output = run_command(f"pgrep -f '[{pattern[0]}]{pattern[1:]}'")
+        return [int(pid) for pid in output.split() if pid.isdigit()]
+
+class NativeCollector(ShellCollector):
+    """Collect router facts from /proc and /sys without forking"""
+    name = "native"
+
+    SIOCGIFADDR = 0x8915
+    SIOCGIFNETMASK = 0x891b
+    RTF_UP = 0x1
+    ATF_COM = 0x2
+    TCP_ESTABLISHED = '01'
+
+    def __init__(self, proc_root="/proc", sys_root="/sys"):
+        self.proc_root = proc_root
+        self.net_root = os.path.join(sys_root, "class", "net")
+        self._sock = None
+
+    def _read_table(self, path):
+        """Rows of a whitespace separated /proc table, header skipped"""
+        with open(path) as f:
+            next(f, None)
+            return [line.split() for line in f]
+
+    def default_route_iface(self):
+        try:
+            rows = self._read_table(os.path.join(self.proc_root, "net", "route"))
+        except OSError:
+            return super().default_route_iface()
+        best = None
+        for row in rows:
+            # Iface Destination Gateway Flags RefCnt Use Metric Mask ...
+            if len(row) < 8 or row[1] != '00000000' or row[7] != '00000000':
+                continue
+            if not int(row[3], 16) & self.RTF_UP:
+                continue
+            metric = int(row[6])
+            if best is None or metric < best[0]:
+                best = (metric, row[0])
+        return best[1] if best else ""
+
+    def _ioctl_ipv4(self, iface, request):
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        ifreq = struct.pack('256s', iface[:15].encode())
+        return socket.inet_ntoa(fcntl.ioctl(self._sock.fileno(), request, ifreq)[20:24])
+
+    def iface_address(self, iface, prefix=False):
+        try:
+            address = self._ioctl_ipv4(iface, self.SIOCGIFADDR)
+            if prefix:
+                netmask = self._ioctl_ipv4(iface, self.SIOCGIFNETMASK)
+                bits = bin(int.from_bytes(socket.inet_aton(netmask), 'big')).count('1')
+                address = f"{address}/{bits}"
+            return address
+        except OSError as e:
+            if e.errno in (errno.EADDRNOTAVAIL, errno.ENODEV):
+                return ""
+            return super().iface_address(iface, prefix)
+
+    def iface_counters(self, iface, names=('rx_bytes', 'tx_bytes')):
+        stats_dir = os.path.join(self.net_root, iface, "statistics")
+        counters = {}
+        try:
+            for name in names:
+                with open(os.path.join(stats_dir, name)) as f:
+                    counters[name] = int(f.read())
+        except FileNotFoundError:
+            if not os.path.isdir(self.net_root):
+                return super().iface_counters(iface, names)
+            # Interface went away between ticks
+            return {name: 0 for name in names}
+        except (OSError, ValueError):
+            return super().iface_counters(iface, names)
+        return counters
+
+    def established_connections(self):
+        total = 0
+        found = False
+        for table in ("tcp", "tcp6"):
+            try:
+                rows = self._read_table(os.path.join(self.proc_root, "net", table))
+            except OSError:
+                continue
+            found = True
+            total += sum(1 for row in rows if len(row) > 3 and row[3] == self.TCP_ESTABLISHED)
+        return total if found else super().established_connections()
+
+    def neighbours(self, iface):
+        try:
+            rows = self._read_table(os.path.join(self.proc_root, "net", "arp"))
+        except OSError:
+            return super().neighbours(iface)
+        clients = []
+        for row in rows:
+            # IP address, HW type, Flags, HW address, Mask, Device
+            if len(row) < 6 or row[5] != iface:
+                continue
+            if not int(row[2], 16) & self.ATF_COM or row[3] == '00:00:00:00:00:00':
+                continue
+            if not row[0].startswith('169.254.'):
+                clients.append(row[0])
+        return clients
+
+    def link_names(self):
+        try:
+            names = os.listdir(self.net_root)
+        except OSError:
+            return super().link_names()
+
+        def ifindex(name):
+            try:
+                with open(os.path.join(self.net_root, name, "ifindex")) as f:
+                    return int(f.read())
+            except (OSError, ValueError):
+                return sys.maxsize
+        return sorted(names, key=ifindex)
+
+    def link_up(self, iface):
+        try:
+            with open(os.path.join(self.net_root, iface, "flags")) as f:
+                return bool(int(f.read(), 16) & 0x1)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError):
+            return super().link_up(iface)
+
+    def routes(self, iface, limit=3):
+        try:
+            rows = self._read_table(os.path.join(self.proc_root, "net", "route"))
+        except OSError:
+            return super().routes(iface, limit)
+        routes = []
+        for row in rows:
+            if len(row) < 8 or row[0] != iface:
+                continue
+            dest, gateway, mask = (socket.inet_ntoa(struct.pack('<I', int(v, 16))) for v in (row[1], row[2], row[7]))
+            bits = bin(int(row[7], 16)).count('1')
+            target = "default" if bits == 0 else f"{dest}/{bits}"
+            if gateway != '0.0.0.0':
+                routes.append(f"{target} via {gateway} metric {row[6]}")
+            else:
+                routes.append(f"{target} scope link metric {row[6]}")
+            if len(routes) >= limit:
+                break
+        return routes
+
+    def find_processes(self, pattern):
+        try:
+            entries = os.listdir(self.proc_root)
+        except OSError:
+            return super().find_processes(pattern)
+        own_pid = os.getpid()
+        needle = pattern.encode()
+        pids = []
+        for entry in entries:
+            if not entry.isdigit() or int(entry) == own_pid:
+                continue
+            try:
+                with open(os.path.join(self.proc_root, entry, "cmdline"), 'rb') as f:
+                    cmdline = f.read().replace(b'\0', b' ')
+            except OSError:
+                continue
+            if needle in cmdline:
+                pids.append(int(entry))
+        return sorted(pids)
+
+COLLECTORS = {
+    'native': NativeCollector,
+    'shell': ShellCollector,
+}
+
+collector = NativeCollector()
+
+def read_dnsmasq_conf(path):
+    """Return (lan_iface, upstream servers) from the dnsmasq LAN config"""
+    lan_iface = ""
+    servers = []
+    try:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('interface=') and not lan_iface:
+                    lan_iface = line.split('=', 1)[1]
+                elif line.startswith('server='):
+                    server = line.split('=', 1)[1]
+                    # Remove duplicates while preserving order
+                    if server not in servers:
+                        servers.append(server)
+    except OSError:
+        pass
+    return lan_iface, servers
+
+# === Refresh scheduling ===
+# get_router_status() is split into probes, each owning a group of fields and
+# its own refresh policy: a fixed interval for kernel state, and a file
+# signature (inode, mtime, size) for config files so they are only re-read
+# when they actually change. Any probe can be invalidated explicitly, e.g.
+# after the dashboard restarts or stops the service.
+
+SERVICE_UNIT = "dynamic-router.service"
+UNIT_FILE = f"/etc/systemd/system/{SERVICE_UNIT}"
+DNSMASQ_CONF = "/etc/dnsmasq.d/lan.conf"
+DEFAULT_SUBNETS_FILE = "/etc/router/vpn-subnets.txt"
+COMPILED_SUBNETS_FILE = "/etc/router/vpn-subnets.compiled"
+
+# Shown until the owning probe has completed once
+STATUS_DEFAULTS = {
+    'service_active': False, 'service_status_raw': 'unknown', 'run_mode_active': False,
+    'is_running': False, 'run_mode': 'unknown', 'service_started': None,
+    'exec_start': '', 'vpn_routing_enabled': False, 'vpn_subnets_file': DEFAULT_SUBNETS_FILE,
+    'vpn_subnets': [], 'vpn_subnets_source': 0, 'vpn_subnets_compiled': False, 'lan_iface': '', 'lan_dns': [], 'wan_iface': '', 'wan_ip': 'N/A',
+    'lan_ip': 'N/A', 'vpn_interfaces': [], 'vpn_active': False, 'wan_dns': [],
+    'rx_bytes': '0 B', 'tx_bytes': '0 B', 'connections': 0, 'clients': [], 'lan_clients': 0,
+    'rates': {}, 'counters': {}, 'vpn_up': {},
+    'client_stats': [], 'forwarded_flows': 0, 'conntrack_source': '',
+}
+
+def file_signature(path):
+    """(inode, mtime, size) of path, or None when it cannot be stat'ed"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+class Probe:
+    """A group of status fields refreshed together"""
+
+    def __init__(self, name, fn, interval=None, watch=None, key=None):
+        self.name = name
+        self.fn = fn
+        self.interval = interval  # seconds, None = only on change/invalidation
+        self.watch = watch        # data -> files whose change forces a refresh
+        self.key = key            # data -> other fields the result depends on
+        self.last_run = 0.0
+        self.signature = None
+        self.valid = False
+        self.generation = 0
+
+    def current_signature(self, data):
+        files = tuple((path, file_signature(path)) for path in self.watch(data)) if self.watch else ()
+        return (files, self.key(data) if self.key else None)
+
+    def is_due(self, now, signature):
+        if not self.valid or signature != self.signature:
+            return True
+        return self.interval is not None and now - self.last_run >= self.interval
+
+    def is_stale(self, now):
+        """Never completed, or overdue by more than one interval"""
+        if not self.last_run:
+            return True
+        return self.interval is not None and now - self.last_run > 2 * self.interval + 1
+
+# Opt-in profiling: with ROUTER_DASHBOARD_PROFILE=/path/profile.json every probe
+# run is timed and a JSON summary (percentiles per probe and per field it sets)
+# is rewritten every PROFILE_DUMP_INTERVAL seconds.
+PROFILE_ENV = "ROUTER_DASHBOARD_PROFILE"
+PROFILE_SAMPLES = 512
+PROFILE_DUMP_INTERVAL = 60
+
+def percentile(values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))]
+
+class ProbeProfiler:
+    """Run times of each probe, kept in bounded per-probe deques"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.samples = {}  # probe -> deque of seconds
+        self.runs = {}
+        self.errors = {}
+        self.fields = {}   # probe -> fields of its last result
+        self.last_dump = time.time()
+
+    def wrap(self, name, fn):
+        def timed(data):
+            start = time.perf_counter()
+            try:
+                result = fn(data)
+            except Exception:
+                self.record(name, time.perf_counter() - start, None)
+                raise
+            self.record(name, time.perf_counter() - start, result)
+            return result
+        return timed
+
+    def record(self, name, seconds, result):
+        with self.lock:
+            self.samples.setdefault(name, deque(maxlen=PROFILE_SAMPLES)).append(seconds)
+            self.runs[name] = self.runs.get(name, 0) + 1
+            if result is None:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            else:
+                self.fields[name] = sorted(result)
+            due = self.path and time.time() - self.last_dump >= PROFILE_DUMP_INTERVAL
+        if due:
+            self.dump()
+
+    def summary(self):
+        with self.lock:
+            probes = {}
+            for name, samples in self.samples.items():
+                ordered = sorted(samples)
+                probes[name] = {
+                    'runs': self.runs[name], 'errors': self.errors.get(name, 0),
+                    'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+                    'p90_ms': round(percentile(ordered, 90) * 1000, 3),
+                    'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+                    'max_ms': round(ordered[-1] * 1000, 3),
+                }
+            fields = {field: dict(probes[name], probe=name)
+                      for name, names in self.fields.items() if name in probes for field in names}
+        return {'time': round(time.time(), 3), 'probes': probes, 'fields': fields}
+
+    def dump(self):
+        self.last_dump = time.time()
+        try:
+            with open(self.path + '.tmp', 'w') as f:
+                json.dump(self.summary(), f, indent=1, sort_keys=True)
+            os.replace(self.path + '.tmp', self.path)
+        except OSError:
+            pass
+
+class RefreshScheduler:
+    """Runs only the probes whose interval elapsed or whose inputs changed"""
+
+    def __init__(self, profiler=None):
+        self.profiler = profiler
+        self.probes = {}
+        self.data = dict(STATUS_DEFAULTS)
+        self.updated = {}  # field -> time its probe last completed
+        self.owners = {}   # field -> name of the probe that sets it
+
+    def add(self, name, fn, interval=None, watch=None, key=None):
+        if self.profiler:
+            fn = self.profiler.wrap(name, fn)
+        self.probes[name] = Probe(name, fn, interval, watch, key)
+
+    def invalidate(self, *names):
+        """Force the named probes (all probes when none given) to refresh"""
+        for name in names or self.probes:
+            self.probes[name].valid = False
+            self.probes[name].generation += 1
+
+    def due(self, now, skip=()):
+        """(probe, signature, generation) for every probe that should run now"""
+        due = []
+        for probe in self.probes.values():
+            if probe.name in skip:
+                continue
+            # Taken before running so a change during the run is seen next time
+            signature = probe.current_signature(self.data)
+            if probe.is_due(now, signature):
+                due.append((probe, signature, probe.generation))
+        return due
+
+    def complete(self, probe, signature, generation, result, now):
+        """Merge a probe result that was computed against signature"""
+        self.data.update(result)
+        for field in result:
+            self.updated[field] = now
+            self.owners[field] = probe.name
+        probe.last_run = now
+        probe.signature = signature
+        # An invalidation that arrived while the probe ran still counts
+        probe.valid = generation == probe.generation
+
+    def refresh(self, now=None):
+        """Run every due probe inline, in order"""
+        now = time.time() if now is None else now
+        for probe in self.probes.values():
+            signature = probe.current_signature(self.data)
+            if probe.is_due(now, signature):
+                self.complete(probe, signature, probe.generation, probe.fn(self.data), now)
+        return self.data
+
+# === Traffic history ===
+# One RateHistory per interface holds per-second bit-rates in fixed-size
+# array('d') ring buffers indexed by wall-clock second, so memory stays the
+# same after an hour or after weeks of uptime. Averages and peaks over the
+# 1m/5m/1h windows are computed from array slices.
+
+HISTORY_SECONDS = 3600
+RATE_WINDOWS = (('1m', 60), ('5m', 300), ('1h', 3600))
+SPARK_POINTS = 120
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+class RateHistory:
+    """Per-second rx/tx bit-rates of one interface"""
+
+    def __init__(self, size=HISTORY_SECONDS):
+        self.size = size
+        self.rx = array('d', bytes(8 * size))
+        self.tx = array('d', bytes(8 * size))
+        self.count = 0       # valid samples, at most size
+        self.head = 0        # slot the next sample goes into
+        self.last = None     # (second, rx_bytes, tx_bytes) of the previous sample
+        self.seen = 0.0
+
+    def add(self, now, rx_bytes, tx_bytes):
+        self.seen = now
+        second = int(now)
+        if self.last is not None:
+            last_second, last_rx, last_tx = self.last
+            if second == last_second:
+                return  # the delta keeps growing until the next second
+            if rx_bytes >= last_rx and tx_bytes >= last_tx:
+                elapsed = second - last_second
+                rx_rate = (rx_bytes - last_rx) * 8 / elapsed
+                tx_rate = (tx_bytes - last_tx) * 8 / elapsed
+                # Missed seconds get the average rate over the gap
+                for _ in range(min(elapsed, self.size)):
+                    self.rx[self.head] = rx_rate
+                    self.tx[self.head] = tx_rate
+                    self.head = (self.head + 1) % self.size
+                    self.count = min(self.count + 1, self.size)
+            # A counter going backwards means the interface was reset, skip that delta
+        self.last = (second, rx_bytes, tx_bytes)
+
+    def recent(self, buf, n):
+        """Last n samples of buf, oldest first"""
+        n = min(n, self.count)
+        start = self.head - n
+        if start >= 0:
+            return buf[start:self.head]
+        return buf[start:] + buf[:self.head]
+
+    def window(self, seconds):
+        """[rx avg, rx peak, tx avg, tx peak] over the last seconds"""
+        rx = self.recent(self.rx, seconds)
+        tx = self.recent(self.tx, seconds)
+        if not rx:
+            return [0.0, 0.0, 0.0, 0.0]
+        return [sum(rx) / len(rx), max(rx), sum(tx) / len(tx), max(tx)]
+
+    def summary(self, role):
+        last = (self.head - 1) % self.size
+        return {
+            'role': role,
+            'rx': self.rx[last] if self.count else 0.0,
+            'tx': self.tx[last] if self.count else 0.0,
+            'windows': {name: self.window(seconds) for name, seconds in RATE_WINDOWS},
+            'spark_rx': self.recent(self.rx, SPARK_POINTS).tolist(),
+            'spark_tx': self.recent(self.tx, SPARK_POINTS).tolist(),
+        }
+
+class TrafficHistory:
+    """RateHistory per interface, forgotten an hour after the interface disappears"""
+
+    def __init__(self):
+        self.interfaces = {}
+
+    def sample(self, iface, now, rx_bytes, tx_bytes):
+        history = self.interfaces.get(iface)
+        if history is None:
+            history = self.interfaces[iface] = RateHistory()
+        history.add(now, rx_bytes, tx_bytes)
+        return history
+
+    def prune(self, now, keep):
+        for iface in list(self.interfaces):
+            if iface not in keep and now - self.interfaces[iface].seen > HISTORY_SECONDS:
+                del self.interfaces[iface]
+
+traffic = TrafficHistory()
+
+def sparkline(values, width):
+    """Render the last width values as block characters scaled to their max"""
+    values = values[-width:] if width > 0 else []
+    peak = max(values, default=0)
+    if peak <= 0:
+        return SPARK_CHARS[0] * len(values)
+    top = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[min(top, int(v / peak * top + 0.5))] for v in values)
+
+# === Per-client accounting ===
+# Forwarded traffic per LAN client, from the conntrack table. Each scan of
+# nf_conntrack turns per-flow counters into deltas against the previous scan,
+# so totals and rates build up incrementally instead of being re-summed. Flows
+# that end between two scans are caught from ctnetlink DESTROY events when the
+# kernel allows it (root, nf_conntrack_netlink), otherwise their last bytes
+# are lost. A flow gone from the table before its event arrived keeps its last
+# counters for FLOW_TOMBSTONE seconds, so the event only adds what is new.
+# Flows to or from the router itself (DNS to dnsmasq, SSH) are not forwarded
+# and not counted. Only the top clients by current rate are kept, picked with a heap.
+# Bytes and packets need net.netfilter.nf_conntrack_acct=1 (set by router.sh).
+# Totals of a client without flows are dropped after CLIENT_RETENTION seconds.
+
+CLIENT_TOP = 10
+CLIENT_RETENTION = 3600
+FLOW_TOMBSTONE = 60
+FLOW_RE = re.compile(
+    r'src=(\S+) dst=(\S+) (?:sport=(\d+) dport=(\d+) |type=\d+ code=\d+ id=(\d+) )?'
+    r'(?:packets=(\d+) bytes=(\d+) )?(?:\[UNREPLIED\] )?src=(\S+) dst=\S+ '
+    r'(?:sport=\d+ dport=\d+ |type=\d+ code=\d+ id=\d+ )?(?:packets=(\d+) bytes=(\d+))?')
+
+# ctnetlink, see linux/netfilter/nfnetlink_conntrack.h
+NETLINK_NETFILTER = 12
+NFNLGRP_CONNTRACK_DESTROY = 3
+CT_DELETE_MSG = (1 << 8) | 2  # NFNL_SUBSYS_CTNETLINK, IPCTNL_MSG_CT_DELETE
+CTA_TUPLE_ORIG, CTA_TUPLE_REPLY, CTA_COUNTERS_ORIG, CTA_COUNTERS_REPLY = 1, 2, 9, 10
+NLA_HEADER = struct.Struct('=HH')
+
+def netlink_attrs(data, start, end):
+    """{type: (payload start, payload end)} of the attributes in data[start:end]"""
+    attrs = {}
+    while start + NLA_HEADER.size <= end:
+        length, attr_type = NLA_HEADER.unpack_from(data, start)
+        if length < NLA_HEADER.size:
+            break
+        attrs[attr_type & 0x3fff] = (start + NLA_HEADER.size, start + length)
+        start += (length + 3) & ~3
+    return attrs
+
+def parse_ct_tuple(data, start, end):
+    """(proto, src, dst, sport or icmp id, dport) of a CTA_TUPLE_* attribute"""
+    attrs = netlink_attrs(data, start, end)
+    ip = netlink_attrs(data, *attrs[1])
+    proto = netlink_attrs(data, *attrs[2])
+
+    def port(attr):
+        return struct.unpack_from('>H', data, proto[attr][0])[0] if attr in proto else 0
+
+    number = data[proto[1][0]] if 1 in proto else 0
+    src = socket.inet_ntoa(data[ip[1][0]:ip[1][0] + 4]) if 1 in ip else ''
+    dst = socket.inet_ntoa(data[ip[2][0]:ip[2][0] + 4]) if 2 in ip else ''
+    return (number, src, dst, port(2) or port(4), port(3))
+
+def parse_ct_counters(data, start, end):
+    """(packets, bytes) of a CTA_COUNTERS_* attribute"""
+    attrs = netlink_attrs(data, start, end)
+    packets = struct.unpack_from('>Q', data, attrs[1][0])[0] if 1 in attrs else 0
+    nbytes = struct.unpack_from('>Q', data, attrs[2][0])[0] if 2 in attrs else 0
+    return packets, nbytes
+
+class ConntrackAccounting:
+    """Per-LAN-client bytes, packets and flows of forwarded traffic"""
+
+    def __init__(self, proc_root="/proc", top=CLIENT_TOP):
+        self.path = os.path.join(proc_root, "net", "nf_conntrack")
+        self.top = top
+        self.flows = {}    # flow key -> (client, up bytes, down bytes, packets) at the last scan
+        self.vanished = {}  # flow key -> (client, up, down, packets, time), gone before its DESTROY event
+        self.totals = {}   # client -> [up bytes, down bytes, packets, last seen], ended flows included
+        self.destroyed = deque(maxlen=100000)
+        self.events = False
+        self.last_scan = None
+        self.network = None
+        self._net = (0, 0)  # LAN network address and netmask as integers
+        self._local = frozenset()  # addresses of the router itself
+        self._parsed = {}  # line after the timeout -> parsed flow, for lines unchanged since the last scan
+
+    def start_events(self):
+        """Follow DESTROY events on a thread, False when ctnetlink is not available"""
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_NETFILTER)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            sock.bind((0, 1 << (NFNLGRP_CONNTRACK_DESTROY - 1)))
+        except (OSError, AttributeError):
+            return False
+        threading.Thread(target=self._read_events, args=(sock,), daemon=True).start()
+        self.events = True
+        return True
+
+    def _read_events(self, sock):
+        while True:
+            try:
+                data = sock.recv(1 << 16)
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    continue  # events were dropped, live flows are still seen by the next scan
+                self.events = False
+                return
+            offset = 0
+            while offset + 20 <= len(data):
+                length, msg_type = struct.unpack_from('=LH', data, offset)
+                if length < 20:
+                    break
+                if msg_type == CT_DELETE_MSG:
+                    try:
+                        # 16 byte nlmsghdr + 4 byte nfgenmsg, then attributes
+                        attrs = netlink_attrs(data, offset + 20, offset + length)
+                        orig = parse_ct_tuple(data, *attrs[CTA_TUPLE_ORIG])
+                        reply_src = parse_ct_tuple(data, *attrs[CTA_TUPLE_REPLY])[1]
+                        up = parse_ct_counters(data, *attrs[CTA_COUNTERS_ORIG]) if CTA_COUNTERS_ORIG in attrs else (0, 0)
+                        down = parse_ct_counters(data, *attrs[CTA_COUNTERS_REPLY]) if CTA_COUNTERS_REPLY in attrs else (0, 0)
+                        self.destroyed.append((orig, reply_src, up, down))
+                    except (KeyError, IndexError, struct.error, OSError):
+                        pass
+                offset += (length + 3) & ~3
+
+    def _client(self, orig_src, reply_src):
+        """(LAN client, client opened the flow) or None for flows not forwarded for the LAN"""
+        if orig_src in self._local or reply_src in self._local:
+            return None
+        net, mask = self._net
+        for address, outbound in ((orig_src, True), (reply_src, False)):
+            try:
+                if int.from_bytes(socket.inet_aton(address), 'big') & mask == net:
+                    return address, outbound
+            except OSError:
+                pass  # IPv6 flow
+        return None
+
+    def _count(self, deltas, client, up, down, packets):
+        total = self.totals.setdefault(client, [0, 0, 0, 0])
+        total[0] += up
+        total[1] += down
+        total[2] += packets
+        delta = deltas.setdefault(client, [0, 0])
+        delta[0] += up
+        delta[1] += down
+
+    def _parse_flow(self, proto, text):
+        """(key, client, up bytes, down bytes, packets) of one conntrack line, False if not LAN"""
+        match = FLOW_RE.search(text)
+        if not match:
+            return False
+        src, dst, sport, dport, icmp_id, opackets, obytes, reply_src, rpackets, rbytes = match.groups()
+        found = self._client(src, reply_src)
+        if not found:
+            return False
+        client, outbound = found
+        key = (int(proto), src, dst, int(sport or icmp_id or 0), int(dport or 0))
+        obytes, rbytes = int(obytes or 0), int(rbytes or 0)
+        up, down = (obytes, rbytes) if outbound else (rbytes, obytes)
+        return key, client, up, down, int(opackets or 0) + int(rpackets or 0)
+
+    def scan(self, lan_cidr, now, local=()):
+        """Read the conntrack table, return (top clients, LAN flows); local are the router's addresses"""
+        network = ipaddress.ip_network(lan_cidr, strict=False)
+        local = frozenset(local)
+        if network != self.network:
+            self.network, self._parsed, self.flows, self.totals = network, {}, {}, {}
+            self.vanished = {}
+            self._net = (int(network.network_address), int(network.netmask))
+        if local != self._local:
+            self._local, self._parsed = local, {}  # a new WAN address keeps the totals
+        deltas = {}
+
+        # Flows that ended since the last scan, with their final counters
+        while self.destroyed:
+            (proto, src, dst, sport, dport), reply_src, orig, reply = self.destroyed.popleft()
+            found = self._client(src, reply_src)
+            if not found:
+                continue
+            client, outbound = found
+            up, down = (orig, reply) if outbound else (reply, orig)
+            key = (proto, src, dst, sport, dport)
+            old = self.flows.pop(key, None) or self.vanished.pop(key, None) or (client, 0, 0, 0)
+            self._count(deltas, client, max(0, up[1] - old[1]), max(0, down[1] - old[2]),
+                        max(0, up[0] + down[0] - old[3]))
+
+        flows = {}
+        flow_counts = {}
+        parsed = {}
+        with open(self.path) as f:
+            for line in f:
+                # ipv4 2 tcp 6 431999 ESTABLISHED src=... dst=..., only the timeout
+                # changes on an idle flow so the rest of the line is a cache key
+                fields = line.split(None, 5)
+                if len(fields) < 6:
+                    continue
+                flow = self._parsed.get(fields[5])
+                if flow is None:
+                    flow = self._parse_flow(fields[3], fields[5])
+                parsed[fields[5]] = flow
+                if not flow:
+                    continue
+                key, client, up, down, packets = flow
+                flows[key] = (client, up, down, packets)
+                flow_counts[client] = flow_counts.get(client, 0) + 1
+                old = self.flows.get(key)
+                if old is None:
+                    self._count(deltas, client, up, down, packets)
+                elif up >= old[1] and down >= old[2]:
+                    self._count(deltas, client, up - old[1], down - old[2], max(0, packets - old[3]))
+                # A flow whose counters went backwards was replaced, its new counts start next scan
+        if self.events:
+            for key in self.flows.keys() - flows.keys():
+                self.vanished[key] = self.flows[key] + (now,)
+            for key in [k for k, old in self.vanished.items() if now - old[4] > FLOW_TOMBSTONE]:
+                del self.vanished[key]
+        self.flows = flows
+        self._parsed = parsed
+        for client in flow_counts.keys() | deltas.keys():
+            self.totals.setdefault(client, [0, 0, 0, 0])[3] = now
+        for client in [c for c, total in self.totals.items() if now - total[3] > CLIENT_RETENTION]:
+            del self.totals[client]
+
+        elapsed = now - self.last_scan if self.last_scan else 0
+        self.last_scan = now
+        stats = []
+        for client, (bytes_up, bytes_down, packets, _) in self.totals.items():
+            up, down = deltas.get(client, (0, 0))
+            stats.append({
+                'ip': client,
+                'up_bps': up * 8 / elapsed if elapsed > 0 else 0.0,
+                'down_bps': down * 8 / elapsed if elapsed > 0 else 0.0,
+                'bytes_up': bytes_up, 'bytes_down': bytes_down, 'packets': packets,
+                'flows': flow_counts.get(client, 0),
+            })
+        top = heapq.nlargest(self.top, stats,
+                             key=lambda c: (c['up_bps'] + c['down_bps'], c['flows'], c['bytes_down']))
+        return top, len(flows)
+
+conntrack = ConntrackAccounting()
+
+def format_uptime(start_time):
+    uptime = datetime.now() - datetime.fromtimestamp(start_time)
+    hours, remainder = divmod(uptime.seconds, 3600)
+    minutes, _ = divmod(remainder, 60)
+    return f"{uptime.days}d {hours}h {minutes}m"
+
+def probe_service(data):
+    """Service state and run mode"""
+    result = {}
+    service_status = run_command(f"systemctl is-active {SERVICE_UNIT} 2>/dev/null")
+    result['service_active'] = service_status == "active"
+    result['service_status_raw'] = service_status
 
-    # Service status
-    service_status = run_command("systemctl is-active dynamic-router.service 2>/dev/null")
-    data['service_active'] = service_status == "active"
-    data['service_status_raw'] = service_status
-    
     # Check if running in --run mode (not as service)
-    run_mode_check = run_command("pgrep -f 'dynamic-router.sh --run' | wc -l")
-    data['run_mode_active'] = int(run_mode_check) > 0 if run_mode_check else False
-    
-    # Overall running status
-    data['is_running'] = data['service_active'] or data['run_mode_active']
-    
-    # Determine run mode
-    if data['service_active']:
-        data['run_mode'] = "service"
-    elif data['run_mode_active']:
-        data['run_mode'] = "manual"
+    result['run_mode_active'] = len(collector.find_processes(ROUTER_RUN_PATTERN)) > 0
+    result['is_running'] = result['service_active'] or result['run_mode_active']
+
+    if result['service_active']:
+        result['run_mode'] = "service"
+    elif result['run_mode_active']:
+        result['run_mode'] = "manual"
     else:
-        data['run_mode'] = "stopped"
+        result['run_mode'] = "stopped"
 
-    # Check if VPN routing is enabled in the service
-    exec_start = run_command("systemctl show dynamic-router.service -p ExecStart --value 2>/dev/null")
-    data['vpn_routing_enabled'] = '--vpn' in exec_start
-    
-    # Get VPN subnets file location
+    result['service_started'] = None
+    if result['service_active']:
+        timestamp = run_command(f"systemctl show {SERVICE_UNIT} -p ActiveEnterTimestamp --value")
+        try:
+            result['service_started'] = datetime.strptime(timestamp, "%a %Y-%m-%d %H:%M:%S %Z").timestamp()
+        except ValueError:
+            pass
+    return result
+
+def probe_unit(data):
+    """Options the service was installed with"""
+    exec_start = run_command(f"systemctl show {SERVICE_UNIT} -p ExecStart --value 2>/dev/null")
+    subnets_file = DEFAULT_SUBNETS_FILE
     if '--subnets' in exec_start:
         # Extract custom subnets file path
-        parts = exec_start.split('--subnets')
-        if len(parts) > 1:
-            data['vpn_subnets_file'] = parts[1].strip().split()[0]
-        else:
-            data['vpn_subnets_file'] = '/etc/router/vpn-subnets.txt'
+        parts = exec_start.split('--subnets')[1].strip().split()
+        if parts:
+            subnets_file = parts[0]
+    return {
+        'exec_start': exec_start,
+        'vpn_routing_enabled': '--vpn' in exec_start,
+        'vpn_subnets_file': subnets_file,
+    }
+
+def read_compiled_subnets(path):
+    """(prefixes, source entry count) written by router-rules.py, None if it has not run"""
+    prefixes = []
+    source_count = 0
+    try:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('# source-entries:'):
+                    source_count = int(line.split(':', 1)[1])
+                elif line and not line.startswith('#'):
+                    prefixes.append(line)
+    except (OSError, ValueError):
+        return None
+    return prefixes, source_count
+
+def probe_subnets(data):
+    """VPN subnets, as aggregated into the router-vpn ipset when available"""
+    result = {'vpn_subnets': [], 'vpn_subnets_source': 0, 'vpn_subnets_compiled': False}
+    if not data['vpn_routing_enabled']:
+        return result
+    compiled = read_compiled_subnets(COMPILED_SUBNETS_FILE)
+    if compiled is not None:
+        result['vpn_subnets'], result['vpn_subnets_source'] = compiled
+        result['vpn_subnets_compiled'] = True
+        return result
+    # Older router scripts: read the raw subnets file
+    try:
+        with open(data['vpn_subnets_file'], 'r') as f:
+            for line in f:
+                line = line.split('#')[0].strip()
+                if line and '/' in line:
+                    result['vpn_subnets'].append(line)
+    except OSError:
+        pass
+    result['vpn_subnets_source'] = len(result['vpn_subnets'])
+    return result
+
+def probe_dnsmasq(data):
+    """LAN interface and upstream DNS from the dnsmasq config"""
+    lan_iface, lan_dns = read_dnsmasq_conf(DNSMASQ_CONF)
+    if not lan_iface:
+        match = re.search(r'ens\d+|enp\d+s\d+', data['exec_start'])
+        lan_iface = match.group(0) if match else ""
+    return {'lan_iface': lan_iface, 'lan_dns': lan_dns}
+
+def probe_links(data):
+    """WAN detection, interface addresses and VPN interfaces"""
+    result = {}
+    result['wan_iface'] = collector.default_route_iface()
+    result['wan_ip'] = collector.iface_address(result['wan_iface']) if result['wan_iface'] else "N/A"
+    result['lan_ip'] = collector.iface_address(data['lan_iface'], prefix=True) if data['lan_iface'] else "N/A"
+    result['vpn_interfaces'] = [name for name in collector.link_names() if VPN_IFACE_RE.match(name)]
+    result['vpn_active'] = len(result['vpn_interfaces']) > 0
+    result['vpn_up'] = {iface: collector.link_up(iface) for iface in result['vpn_interfaces']}
+    return result
+
+def probe_wan_dns(data):
+    """Upstream DNS NetworkManager handed to the WAN interface"""
+    if not data['wan_iface']:
+        return {'wan_dns': []}
+    wan_dns_output = run_command(f"nmcli dev show {data['wan_iface']} | awk '/IP4.DNS/ {{print $2}}'")
+    return {'wan_dns': wan_dns_output.split() if wan_dns_output else []}
+
+COUNTER_NAMES = ('rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets')
+
+def probe_counters(data):
+    """Traffic counters and rates of every router interface, plus established connections"""
+    result = {}
+    now = time.time()
+    roles = [('wan', data['wan_iface']), ('lan', data['lan_iface'])]
+    roles += [('vpn', iface) for iface in data['vpn_interfaces']]
+    rates = {}
+    raw = {}
+    for role, iface in roles:
+        if not iface or iface in rates:
+            continue
+        counters = collector.iface_counters(iface, COUNTER_NAMES)
+        raw[iface] = dict(counters, role=role)
+        if role == 'wan':
+            result['rx_bytes'] = get_human_readable_bytes(counters['rx_bytes'])
+            result['tx_bytes'] = get_human_readable_bytes(counters['tx_bytes'])
+        history = traffic.sample(iface, now, counters['rx_bytes'], counters['tx_bytes'])
+        rates[iface] = history.summary(role)
+    traffic.prune(now, keep=rates)
+    if not data['wan_iface']:
+        result['rx_bytes'] = "0 B"
+        result['tx_bytes'] = "0 B"
+    result['rates'] = rates
+    result['counters'] = raw
+    result['connections'] = collector.established_connections()
+    return result
+
+def probe_conntrack(data):
+    """Top LAN clients by forwarded traffic"""
+    empty = {'client_stats': [], 'forwarded_flows': 0, 'conntrack_source': ''}
+    if data['lan_ip'] in ('', 'N/A'):
+        return empty
+    if conntrack.last_scan is None and not conntrack.events:
+        conntrack.start_events()
+    try:
+        local = [address for address in (data['lan_ip'].split('/')[0], data['wan_ip']) if address != 'N/A']
+        top, flows = conntrack.scan(data['lan_ip'], time.time(), local)
+    except (OSError, ValueError):
+        return empty
+    return {'client_stats': top, 'forwarded_flows': flows,
+            'conntrack_source': 'proc+events' if conntrack.events else 'proc'}
+
+def probe_clients(data):
+    """Reachable neighbours on the LAN interface"""
+    clients = collector.neighbours(data['lan_iface']) if data['lan_iface'] else []
+    return {'clients': clients, 'lan_clients': len(clients)}
+
+profiler = ProbeProfiler(os.environ[PROFILE_ENV]) if os.environ.get(PROFILE_ENV) else None
+
+def build_scheduler(profiler=None):
+    # Probes run in insertion order, later probes may use earlier fields
+    scheduler = RefreshScheduler(profiler)
+    scheduler.add('service', probe_service, interval=5)
+    scheduler.add('unit', probe_unit, watch=lambda d: [UNIT_FILE])
+    scheduler.add('subnets', probe_subnets, watch=lambda d: [d['vpn_subnets_file'], COMPILED_SUBNETS_FILE],
+                  key=lambda d: d['vpn_routing_enabled'])
+    scheduler.add('dnsmasq', probe_dnsmasq, watch=lambda d: [DNSMASQ_CONF], key=lambda d: d['exec_start'])
+    scheduler.add('links', probe_links, interval=3, key=lambda d: d['lan_iface'])
+    scheduler.add('wan_dns', probe_wan_dns, interval=60, key=lambda d: d['wan_iface'])
+    scheduler.add('counters', probe_counters, interval=1,
+                  key=lambda d: (d['wan_iface'], d['lan_iface'], tuple(d['vpn_interfaces'])))
+    scheduler.add('clients', probe_clients, interval=3, key=lambda d: d['lan_iface'])
+    scheduler.add('conntrack', probe_conntrack, interval=3, key=lambda d: (d['lan_ip'], d['wan_ip']))
+    return scheduler
+
+scheduler = build_scheduler(profiler)
+
+def add_derived_fields(data):
+    """Fields computed from others at snapshot time rather than probed"""
+    if data['service_active']:
+        data['uptime'] = format_uptime(data['service_started']) if data['service_started'] else "Unknown"
+    elif data['run_mode_active']:
+        data['uptime'] = "Running (manual mode)"
     else:
-        data['vpn_subnets_file'] = '/etc/router/vpn-subnets.txt'
+        data['uptime'] = "Not running"
+    return data
+
+def get_router_status():
+    """Gather all router status information"""
+    return add_derived_fields(dict(scheduler.refresh()))
+
+# === Background collection ===
+# The curses loop never runs a probe itself. StatusWorker schedules due probes
+# onto a thread pool, so independent probes run concurrently and a hung
+# nmcli/systemctl only delays its own fields. After every completed probe a
+# fresh snapshot is published; the UI always draws the latest one together
+# with per-field ages and the set of fields that are stale.
+
+WORKER_TICK = 0.2
+SLOW_PROBE = 2.0
+UI_TIMEOUT_MS = 50
+
+class StatusWorker(threading.Thread):
+    """Runs the scheduler's probes off the UI thread"""
+
+    def __init__(self, scheduler):
+        super().__init__(daemon=True)
+        self.scheduler = scheduler
+        self.pool = ThreadPoolExecutor(max_workers=len(scheduler.probes) + 2,
+                                       thread_name_prefix="probe")
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = {}  # probe name -> start time
+        self.version = 0
+        self.changed = threading.Event()  # set on every publish, for the hub
+        self._snapshot = self._build_snapshot(time.time())
+        self._stopped = False
+
+    def snapshot(self):
+        """Latest complete snapshot, never blocks on a probe"""
+        return self._snapshot
+
+    def invalidate(self, *names):
+        with self.lock:
+            self.scheduler.invalidate(*names)
+        self.wakeup.set()
+
+    def submit(self, fn, *args):
+        """Run a one-off blocking call (service action, journal read) on the pool"""
+        return self.pool.submit(fn, *args)
+
+    def stop(self):
+        self._stopped = True
+        self.wakeup.set()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.scheduler.profiler and self.scheduler.profiler.path:
+            self.scheduler.profiler.dump()
+
+    def run(self):
+        while not self._stopped:
+            now = time.time()
+            with self.lock:
+                due = self.scheduler.due(now, skip=self.running)
+                jobs = []
+                for probe, signature, generation in due:
+                    self.running[probe.name] = now
+                    jobs.append((probe, signature, generation, dict(self.scheduler.data)))
+                stale = self._stale_fields(now)
+                if stale != self._snapshot['_stale']:
+                    self._publish(now)
+            # Outside the lock: a callback runs inline if its probe already finished
+            for probe, signature, generation, data in jobs:
+                try:
+                    future = self.pool.submit(probe.fn, data)
+                except RuntimeError:
+                    return  # pool shut down
+                future.add_done_callback(
+                    lambda f, p=probe, s=signature, g=generation: self._finished(p, s, g, f))
+            self.wakeup.wait(WORKER_TICK)
+            self.wakeup.clear()
+
+    def _finished(self, probe, signature, generation, future):
+        now = time.time()
+        with self.lock:
+            self.running.pop(probe.name, None)
+            try:
+                result = future.result()
+            except Exception:
+                # Leave the old values in place, they show up as stale
+                result = None
+            if result is not None:
+                self.scheduler.complete(probe, signature, generation, result, now)
+            self._publish(now)
+        # Dependent probes may be due now
+        self.wakeup.set()
+
+    def _stale_fields(self, now):
+        stale_probes = {name for name, probe in self.scheduler.probes.items() if probe.is_stale(now)}
+        stale_probes.update(name for name, started in self.running.items() if now - started > SLOW_PROBE)
+        owners = self.scheduler.owners
+        return sorted(field for field in STATUS_DEFAULTS
+                      if field not in owners or owners[field] in stale_probes)
+
+    def _build_snapshot(self, now):
+        data = add_derived_fields(dict(self.scheduler.data))
+        data['_updated'] = dict(self.scheduler.updated)
+        data['_stale'] = self._stale_fields(now)
+        return data
+
+    def _publish(self, now):
+        self.version += 1
+        self._snapshot = self._build_snapshot(now)
+        self.changed.set()
+
+def field_age(status_data, field, now=None):
+    """Seconds since field was last refreshed, None if it never was"""
+    updated = status_data.get('_updated', {}).get(field)
+    if updated is None:
+        return None
+    return (time.time() if now is None else now) - updated
+
+def stale_attr(status_data, field):
+    """Dim fields whose probe is overdue or still running"""
+    return curses.A_DIM if field in status_data.get('_stale', ()) else 0
+
+# === Collector hub ===
+# `router-dashboard.py --hub` runs the StatusWorker without a screen and
+# publishes its snapshots on a Unix socket, so any number of dashboards share
+# one set of probes. The protocol is one JSON object per line:
+#   hub -> client  {"type": "full", "version": N, "data": {...}} on connect,
+#                  then {"type": "delta", "version": N, "base": M, "changed": {...}, "removed": [...]}
+#   client -> hub  {"cmd": "invalidate", "probes": [...]}   ([] = every probe)
+#                  {"cmd": "full"}                           (resend a full snapshot)
+# Deltas are encoded once per version no matter how many clients listen.
+# Messages are queued per client and sent without blocking outside the hub
+# lock, so a stalled viewer never delays the others. The rest of a partial
+# send goes out with the next update. A viewer more than HUB_CLIENT_BUFFER
+# bytes behind is dropped and reconnects for a full snapshot.
+# `socat - UNIX-CONNECT:/run/router-dashboard.sock` is enough to watch it.
+
+HUB_SOCKET = "/run/router-dashboard.sock"
+HUB_CLIENT_BUFFER = 1 << 20  # bytes
+HUB_RECONNECT = 2.0
+
+def encode_message(message):
+    return (json.dumps(message, separators=(',', ':'), default=str) + "\n").encode()
 
-    # Read VPN subnets from file
-    data['vpn_subnets'] = []
-    if data['vpn_routing_enabled'] and os.path.exists(data['vpn_subnets_file']):
+def snapshot_delta(old, new):
+    changed = {key: value for key, value in new.items() if old.get(key) != value}
+    removed = [key for key in old if key not in new]
+    return changed, removed
+
+class HubSubscriber:
+    """A hub client's socket with its queue of unsent messages"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.pending = bytearray()
+        self.lock = threading.Lock()
+
+    def queue(self, message):
+        """False when the client has fallen too far behind"""
+        with self.lock:
+            self.pending += message
+            return len(self.pending) <= HUB_CLIENT_BUFFER
+
+    def flush(self):
+        """Send what the socket takes without blocking, False on a broken connection"""
+        with self.lock:
+            try:
+                while self.pending:
+                    del self.pending[:self.sock.send(self.pending, socket.MSG_DONTWAIT)]
+            except BlockingIOError:
+                pass
+            except OSError:
+                return False
+            return True
+
+    def close(self):
         try:
-            with open(data['vpn_subnets_file'], 'r') as f:
-                for line in f:
-                    line = line.split('#')[0].strip()
-                    if line and '/' in line:
-                        data['vpn_subnets'].append(line)
-        except:
+            self.sock.shutdown(socket.SHUT_RDWR)  # wakes the thread reading its commands
+        except OSError:
             pass
+        self.sock.close()
 
-    # Uptime
-    if data['service_active']:
-        uptime_output = run_command("systemctl show dynamic-router.service -p ActiveEnterTimestamp --value")
-        if uptime_output:
+class StatusHub:
+    """Serves a StatusWorker's snapshots to subscribers on a Unix socket"""
+
+    def __init__(self, worker, path):
+        self.worker = worker
+        self.path = path
+        self.clients = []
+        self.lock = threading.Lock()
+        self.version = worker.version
+        self.snapshot = worker.snapshot()
+
+    def serve(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        os.chmod(self.path, 0o660)
+        server.listen(16)
+        threading.Thread(target=self._accept, args=(server,), daemon=True).start()
+        try:
+            while True:
+                self.worker.changed.wait()
+                self.worker.changed.clear()
+                self._broadcast()
+        finally:
+            server.close()
+            os.unlink(self.path)
+
+    def _broadcast(self):
+        # Queue in version order under the lock, send outside it
+        with self.lock:
+            version, snapshot = self.worker.version, self.worker.snapshot()
+            if version == self.version:
+                return
+            changed, removed = snapshot_delta(self.snapshot, snapshot)
+            message = encode_message({'type': 'delta', 'version': version, 'base': self.version,
+                                      'changed': changed, 'removed': removed})
+            self.version, self.snapshot = version, snapshot
+            clients = list(self.clients)
+            queued = [client.queue(message) for client in clients]
+        for client, ok in zip(clients, queued):
+            self._flush(client, ok)
+
+    def _flush(self, client, queued=True):
+        if not (queued and client.flush()):
+            # A viewer that cannot keep up is dropped, it reconnects for a full snapshot
+            self._drop(client)
+
+    def _drop(self, client):
+        with self.lock:
+            if client not in self.clients:
+                return
+            self.clients.remove(client)
+        client.close()
+
+    def _send_full(self, client):
+        with self.lock:
+            queued = client.queue(encode_message({'type': 'full', 'version': self.version, 'data': self.snapshot}))
+        self._flush(client, queued)
+
+    def _accept(self, server):
+        while True:
+            sock, _ = server.accept()
+            client = HubSubscriber(sock)
+            with self.lock:
+                self.clients.append(client)
+            self._send_full(client)
+            threading.Thread(target=self._read_commands, args=(client,), daemon=True).start()
+
+    def _read_commands(self, client):
+        try:
+            for line in client.sock.makefile('rb'):
+                try:
+                    command = json.loads(line)
+                except ValueError:
+                    continue
+                if command.get('cmd') == 'invalidate':
+                    probes = [name for name in command.get('probes', []) if name in self.worker.scheduler.probes]
+                    self.worker.invalidate(*probes)
+                elif command.get('cmd') == 'full':
+                    self._send_full(client)
+        except OSError:
+            pass
+        self._drop(client)
+
+class HubClient(threading.Thread):
+    """Drop-in for StatusWorker that follows a hub instead of probing"""
+
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.path = path
+        self.pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="action")
+        self.version = 0
+        self.connected = False
+        self._sock = None
+        self._data = dict(STATUS_DEFAULTS, _updated={}, _stale=sorted(STATUS_DEFAULTS))
+        self._remote_version = None
+        self._stopped = False
+
+    def connect(self):
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self.connected = True
+
+    def snapshot(self):
+        return self._data
+
+    def invalidate(self, *names):
+        self._command({'cmd': 'invalidate', 'probes': list(names)})
+
+    def submit(self, fn, *args):
+        return self.pool.submit(fn, *args)
+
+    def stop(self):
+        self._stopped = True
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self._sock:
+            self._sock.close()
+
+    def _command(self, command):
+        try:
+            self._sock.sendall(encode_message(command))
+        except (OSError, AttributeError):
+            pass
+
+    def run(self):
+        while not self._stopped:
             try:
-                start_time = datetime.strptime(uptime_output, "%a %Y-%m-%d %H:%M:%S %Z")
-                uptime = datetime.now() - start_time
-                days = uptime.days
-                hours, remainder = divmod(uptime.seconds, 3600)
-                minutes, _ = divmod(remainder, 60)
-                data['uptime'] = f"{days}d {hours}h {minutes}m"
-            except:
-                data['uptime'] = "Unknown"
-    elif data['run_mode_active']:
-        # For --run mode, try to get process start time
-        pid = run_command("pgrep -f 'dynamic-router.sh --run' | head -1")
-        if pid:
-            start_time_epoch = run_command(f"ps -p {pid} -o lstart= 2>/dev/null")
-            if start_time_epoch:
-                data['uptime'] = "Running (manual mode)"
-            else:
-                data['uptime'] = "Running"
+                if not self.connected:
+                    self.connect()
+                for line in self._sock.makefile('rb'):
+                    self._apply(json.loads(line))
+            except (OSError, ValueError):
+                pass
+            if self._stopped:
+                return
+            # Hub gone: keep the last data, marked stale, until it is back
+            self.connected = False
+            self._publish(dict(self._data, _stale=sorted(STATUS_DEFAULTS)))
+            time.sleep(HUB_RECONNECT)
+
+    def _apply(self, message):
+        if message.get('type') == 'full':
+            data = message['data']
+        elif message.get('type') == 'delta' and message.get('base') == self._remote_version:
+            data = dict(self._data)
+            data.update(message['changed'])
+            for key in message['removed']:
+                data.pop(key, None)
         else:
-            data['uptime'] = "Running"
-    else:
-        data['uptime'] = "Not running"
+            self._command({'cmd': 'full'})
+            return
+        self._remote_version = message['version']
+        self._publish(data)
 
-    # Network interfaces
-    data['wan_iface'] = run_command("ip route | awk '/^default/ {print $5; exit}'")
-    if data['wan_iface']:
-        data['wan_ip'] = run_command(f"ip addr show {data['wan_iface']} | grep 'inet ' | awk '{{print $2}}' | cut -d'/' -f1")
-        wan_dns_output = run_command(f"nmcli dev show {data['wan_iface']} | awk '/IP4.DNS/ {{print $2}}'")
-        data['wan_dns'] = wan_dns_output.split() if wan_dns_output else []
-    else:
-        data['wan_ip'] = "N/A"
-        data['wan_dns'] = []
-
-    data['lan_iface'] = run_command("grep 'interface=' /etc/dnsmasq.d/lan.conf 2>/dev/null | cut -d'=' -f2")
-    if not data['lan_iface']:
-        data['lan_iface'] = run_command("systemctl show dynamic-router.service -p ExecStart --value | grep -oP 'ens\\d+|enp\\d+s\\d+' | head -1")
-    if data['lan_iface']:
-        data['lan_ip'] = run_command(f"ip addr show {data['lan_iface']} 2>/dev/null | grep 'inet ' | awk '{{print $2}}'")
-    else:
-        data['lan_ip'] = "N/A"
-
-    lan_dns_output = run_command("grep '^server=' /etc/dnsmasq.d/lan.conf 2>/dev/null | cut -d'=' -f2")
-    # Remove duplicates while preserving order
-    if lan_dns_output:
-        seen = set()
-        unique_dns = []
-        for dns in lan_dns_output.split():
-            if dns not in seen:
-                seen.add(dns)
-                unique_dns.append(dns)
-        data['lan_dns'] = unique_dns
-    else:
-        data['lan_dns'] = []
-
-    # VPN detection - detect all VPN interfaces
-    vpn_output = run_command("ip link show | grep -oP '(tun|wg|tap|ppp|ipsec)\\d+'")
-    data['vpn_interfaces'] = vpn_output.split() if vpn_output else []
-    data['vpn_active'] = len(data['vpn_interfaces']) > 0
-
-    # Traffic stats
-    if data['wan_iface']:
-        rx = run_command(f"cat /sys/class/net/{data['wan_iface']}/statistics/rx_bytes 2>/dev/null")
-        tx = run_command(f"cat /sys/class/net/{data['wan_iface']}/statistics/tx_bytes 2>/dev/null")
-        data['rx_bytes'] = get_human_readable_bytes(rx)
-        data['tx_bytes'] = get_human_readable_bytes(tx)
-    else:
-        data['rx_bytes'] = "0 B"
-        data['tx_bytes'] = "0 B"
+    def _publish(self, data):
+        self._data = data
+        self.version += 1
 
-    # Connections
-    conns = run_command("ss -t state established | wc -l")
+def open_status_source(args):
+    """Subscribe to a running hub, or collect in-process when there is none"""
+    if not args.standalone:
+        client = HubClient(args.socket)
+        try:
+            client.connect()
+            return client
+        except OSError:
+            client.stop()
+    return StatusWorker(scheduler)
+
+def run_hub(path):
+    worker = StatusWorker(scheduler)
+    worker.start()
+    print(f"Publishing router status on {path}", flush=True)
     try:
-        data['connections'] = max(0, int(conns) - 1)
-    except:
-        data['connections'] = 0
+        StatusHub(worker, path).serve()
+    finally:
+        worker.stop()
 
-    # LAN clients
-    if data['lan_iface']:
-        clients_output = run_command(f"ip neigh show dev {data['lan_iface']}")
-        clients = []
-        for line in clients_output.split('\n'):
-            if line and any(state in line for state in ['REACHABLE', 'STALE', 'DELAY']):
-                ip = line.split()[0]
-                if not ip.startswith('169.254.'):
-                    clients.append(ip)
-        data['clients'] = clients
-        data['lan_clients'] = len(clients)
-    else:
-        data['clients'] = []
-        data['lan_clients'] = 0
+# === Metrics export ===
+# `router-dashboard.py --export` runs without curses and serves the latest
+# snapshot in Prometheus text format on http://<listen>/metrics, and/or
+# appends it as JSON lines to a file. Like the dashboard it follows a running
+# hub, or collects in-process otherwise. Scrapes only format the cached
+# snapshot, so scraping more often does not collect more often.
 
-    return data
+EXPORT_LISTEN = "127.0.0.1:9469"
+
+def prometheus_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_metrics(status_data, now=None):
+    """Snapshot in Prometheus exposition format"""
+    now = time.time() if now is None else now
+    families = []
+
+    def family(name, kind, help_text, samples):
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{prometheus_label(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        families.append("\n".join(lines))
+
+    family("router_running", "gauge", "Router script running (service or manual mode)",
+           [({'mode': status_data.get('run_mode', 'unknown')}, int(bool(status_data.get('is_running'))))])
+    family("router_service_active", "gauge", "systemd service state is active",
+           [({'state': status_data.get('service_status_raw', 'unknown')}, int(bool(status_data.get('service_active'))))])
+    if status_data.get('service_started'):
+        family("router_service_start_time_seconds", "gauge", "Unix time the service entered the active state",
+               [({}, status_data['service_started'])])
+
+    counters = status_data.get('counters', {})
+    for counter, name, help_text in (
+            ('rx_bytes', 'router_interface_receive_bytes_total', "Bytes received"),
+            ('tx_bytes', 'router_interface_transmit_bytes_total', "Bytes transmitted"),
+            ('rx_packets', 'router_interface_receive_packets_total', "Packets received"),
+            ('tx_packets', 'router_interface_transmit_packets_total', "Packets transmitted")):
+        family(name, "counter", help_text,
+               [({'interface': iface, 'role': values['role']}, values.get(counter, 0))
+                for iface, values in counters.items()])
+    rates = status_data.get('rates', {})
+    for direction, name in (('rx', 'receive'), ('tx', 'transmit')):
+        family(f"router_interface_{name}_bits_per_second", "gauge", f"Last one-second {name} rate",
+               [({'interface': iface, 'role': rate['role']}, rate[direction]) for iface, rate in rates.items()])
+
+    family("router_vpn_interface_up", "gauge", "VPN interface is administratively up",
+           [({'interface': iface}, int(up)) for iface, up in status_data.get('vpn_up', {}).items()])
+    family("router_vpn_routing_enabled", "gauge", "Selective VPN routing is configured",
+           [({}, int(bool(status_data.get('vpn_routing_enabled'))))])
+    family("router_vpn_subnets", "gauge", "VPN subnet prefixes routed",
+           [({}, len(status_data.get('vpn_subnets', [])))])
+    family("router_established_connections", "gauge", "Established TCP connections on the router",
+           [({}, status_data.get('connections', 0))])
+    family("router_lan_clients", "gauge", "Reachable neighbours on the LAN interface",
+           [({}, status_data.get('lan_clients', 0))])
+    if status_data.get('conntrack_source'):
+        client_stats = status_data.get('client_stats', [])
+        family("router_forwarded_flows", "gauge", "Conntrack flows involving a LAN client",
+               [({}, status_data.get('forwarded_flows', 0))])
+        for direction, key, help_text in (('receive', 'bytes_down', "Bytes forwarded to"),
+                                          ('transmit', 'bytes_up', "Bytes forwarded from")):
+            family(f"router_client_{direction}_bytes_total", "counter", f"{help_text} the top LAN clients",
+                   [({'client': client['ip']}, client[key]) for client in client_stats])
+        family("router_client_flows", "gauge", "Conntrack flows of the top LAN clients",
+               [({'client': client['ip']}, client['flows']) for client in client_stats])
+    family("router_stale_fields", "gauge", "Status fields whose probe is overdue",
+           [({}, len(status_data.get('_stale', [])))])
+    updated = status_data.get('_updated', {})
+    family("router_field_age_seconds", "gauge", "Seconds since each status field was refreshed",
+           [({'field': field}, round(now - when, 3)) for field, when in sorted(updated.items())])
+    return "\n".join(families) + "\n"
+
+def json_record(status_data, now=None):
+    """One JSON lines record: the metric values of a snapshot"""
+    return {
+        'time': round(time.time() if now is None else now, 3),
+        'running': bool(status_data.get('is_running')),
+        'run_mode': status_data.get('run_mode'),
+        'service_active': bool(status_data.get('service_active')),
+        'interfaces': {iface: dict(values, rx_bps=status_data.get('rates', {}).get(iface, {}).get('rx', 0.0),
+                                   tx_bps=status_data.get('rates', {}).get(iface, {}).get('tx', 0.0))
+                       for iface, values in status_data.get('counters', {}).items()},
+        'vpn_up': status_data.get('vpn_up', {}),
+        'connections': status_data.get('connections', 0),
+        'lan_clients': status_data.get('lan_clients', 0),
+        'client_stats': status_data.get('client_stats', []),
+        'stale': status_data.get('_stale', []),
+    }
+
+def make_metrics_handler(source):
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = prometheus_metrics(source.snapshot()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+    return MetricsHandler
+
+def run_export(args):
+    source = open_status_source(args)
+    source.start()
+    server = None
+    if args.listen:
+        host, _, port = args.listen.rpartition(':')
+        server = http.server.ThreadingHTTPServer((host or '127.0.0.1', int(port)), make_metrics_handler(source))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Serving metrics on http://{args.listen}/metrics", flush=True)
+    try:
+        while True:
+            if args.json_lines:
+                with open(args.json_lines, 'a') as f:
+                    f.write(json.dumps(json_record(source.snapshot())) + "\n")
+            time.sleep(args.json_interval)
+    finally:
+        if server:
+            server.shutdown()
+        source.stop()
+
+# === Journal ===
+# The log view follows `journalctl -o json --follow` on a thread started the
+# first time it is opened, and keeps following after it is closed. Entries go
+# into a fixed-size ring, and every entry has a sequence number. Filters are
+# Postings lists of sequence numbers: one per level, always maintained, and
+# one per searched keyword (alone or with a level), built by a single scan
+# the first time and then extended as entries arrive. Scrolling and filtering
+# never re-run journalctl. Postings are trimmed as the ring overwrites
+# entries, so they never hold more than the ring. If journalctl exits
+# (journald restart), it is restarted after the last cursor, so nothing is
+# read twice or skipped.
+
+JOURNAL_LINES = 200000
+JOURNAL_QUERIES = 16   # keyword filters kept up to date, oldest dropped first
+JOURNAL_RETRY = 2
+LOG_LEVELS = ('ERROR', 'WARNING', 'INFO')
+
+def journal_level(message, priority):
+    """ERROR/WARNING/INFO from the router's [LEVEL] prefixes, else from the syslog priority"""
+    for level in LOG_LEVELS:
+        if level in message:
+            return level
+    if priority.isdigit() and int(priority) <= 3:
+        return 'ERROR'
+    return 'WARNING' if priority == '4' else 'INFO'
+
+class Postings:
+    """Ascending sequence numbers of the entries matching one filter"""
+
+    def __init__(self):
+        self.items = array('q')
+        self.start = 0
+        self.dropped = 0  # entries trimmed so far, lets a view keep its scroll position
+
+    def append(self, seq):
+        self.items.append(seq)
+
+    def trim(self, first):
+        """Drop sequence numbers the ring has already overwritten"""
+        start = self.start
+        while start < len(self.items) and self.items[start] < first:
+            start += 1
+        self.dropped += start - self.start
+        if start > 4096 and start * 2 > len(self.items):
+            del self.items[:start]
+            start = 0
+        self.start = start
+
+    def __len__(self):
+        return len(self.items) - self.start
+
+    def __getitem__(self, i):
+        return self.items[self.start + i]
+
+class RingView:
+    """Every entry still in the ring, with the same interface as Postings"""
+
+    def __init__(self, journal):
+        self.journal = journal
+
+    @property
+    def dropped(self):
+        return self.journal.first
+
+    def __len__(self):
+        return self.journal.next - self.journal.first
+
+    def __getitem__(self, i):
+        return self.journal.first + i
+
+class JournalBuffer:
+    """Ring of (timestamp, level, message) with incremental level and keyword filters"""
+
+    def __init__(self, capacity=JOURNAL_LINES):
+        self.capacity = capacity
+        self.entries = [None] * capacity
+        self.first = 0   # oldest sequence number still in the ring
+        self.next = 0
+        self.lock = threading.Lock()
+        self.version = 0
+        self.cursor = None
+        self.queries = {(level, ''): Postings() for level in LOG_LEVELS}
+
+    def append(self, timestamp, level, message, cursor):
+        with self.lock:
+            seq = self.next
+            if seq - self.first >= self.capacity:
+                self.first += 1
+                # Every filter loses the evicted entry now, postings stay as bounded as the ring
+                for postings in self.queries.values():
+                    postings.trim(self.first)
+            self.entries[seq % self.capacity] = (timestamp, level, message)
+            self.next += 1
+            self.cursor = cursor
+            lowered = None
+            for (query_level, keyword), postings in self.queries.items():
+                if query_level and query_level != level:
+                    continue
+                if keyword:
+                    if lowered is None:
+                        lowered = message.lower()
+                    if keyword not in lowered:
+                        continue
+                postings.append(seq)
+            self.version += 1
+
+    def entry(self, seq):
+        return self.entries[seq % self.capacity]
+
+    def view(self, level='', keyword=''):
+        """Postings (or RingView) of the entries matching level and keyword; call with the lock held"""
+        keyword = keyword.lower()
+        if not level and not keyword:
+            return RingView(self)
+        key = (level, keyword)
+        postings = self.queries.get(key)
+        if postings is None:
+            base = self.view(level) if level else RingView(self)
+            postings = Postings()
+            for i in range(len(base)):
+                seq = base[i]
+                if keyword in self.entries[seq % self.capacity][2].lower():
+                    postings.append(seq)
+            searches = [query for query in self.queries if query[1]]
+            if len(searches) >= JOURNAL_QUERIES:
+                del self.queries[searches[0]]
+            self.queries[key] = postings
+        postings.trim(self.first)
+        return postings
+
+class JournalFollower(threading.Thread):
+    """Feeds a JournalBuffer from `journalctl -o json --follow`"""
+
+    def __init__(self, unit, journal):
+        super().__init__(daemon=True)
+        self.unit = unit
+        self.journal = journal
+        self.process = None
+        self.error = None
+        self._stopped = False
+
+    def run(self):
+        while not self._stopped:
+            command = ['journalctl', '-u', self.unit, '-o', 'json', '--output-fields=MESSAGE,PRIORITY',
+                       '--no-pager', '--follow']
+            if self.journal.cursor:
+                command.append(f'--after-cursor={self.journal.cursor}')
+            else:
+                command += ['-n', str(self.journal.capacity)]
+            try:
+                self.process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                                text=True, errors='replace')
+            except OSError as e:
+                self.error = f"journalctl: {e.strerror}"
+                return
+            for line in self.process.stdout:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                message = record.get('MESSAGE', '')
+                if isinstance(message, list):  # non-UTF-8 messages come as byte arrays
+                    message = bytes(message).decode('utf-8', 'replace')
+                message = str(message).replace('\n', ' ')
+                timestamp = int(record.get('__REALTIME_TIMESTAMP', 0)) / 1e6
+                self.journal.append(timestamp, journal_level(message, str(record.get('PRIORITY', ''))),
+                                    message, record.get('__CURSOR'))
+            if self.process.wait() != 0 and self.journal.next == 0:
+                self.error = f"journalctl exited with status {self.process.returncode}"
+            if not self._stopped:
+                time.sleep(JOURNAL_RETRY)
+
+    def stop(self):
+        self._stopped = True
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+journal_follower = None
+
+def open_journal():
+    """The running journal follower, started on first use"""
+    global journal_follower
+    if journal_follower is None:
+        journal_follower = JournalFollower(SERVICE_UNIT, JournalBuffer())
+        journal_follower.start()
+    return journal_follower
+
+# === Rendering ===
+# Screens are drawn into a Screen, which keeps the rows of the last frame and
+# only rewrites rows whose text or attributes changed, then pushes them out
+# with one noutrefresh/doupdate. Curses itself still sends only the changed
+# cells, but nothing is cleared and repainted wholesale, so the terminal does
+# not flicker and a one-second tick over SSH costs a few short lines. Long
+# lists go through a ListView, which formats only the rows that fit on screen.
+
+class Screen:
+    """Row-diffing frame buffer in front of stdscr"""
+
+    def __init__(self, stdscr):
+        self.stdscr = stdscr
+        self.rows = {}     # y -> [(x, text, attr)] of the frame being drawn
+        self.shown = None  # y -> ((x, text, attr), ...) on the terminal, None to repaint everything
+        self.size = None
+
+    def __getattr__(self, name):
+        # getch, timeout, ... go straight to the window
+        return getattr(self.stdscr, name)
+
+    def erase(self):
+        """Start a new frame"""
+        self.rows = {}
+
+    def clear(self):
+        """Start a new frame and repaint every row on the next refresh"""
+        self.rows = {}
+        self.shown = None
+
+    def addstr(self, y, x, text, attr=0):
+        self.rows.setdefault(y, []).append((x, text, attr))
+
+    def refresh(self):
+        size = self.stdscr.getmaxyx()
+        if size != self.size:
+            self.size, self.shown = size, None
+        if self.shown is None:
+            self.stdscr.erase()
+            old = {}
+        else:
+            old = self.shown
+        frame = {y: tuple(row) for y, row in self.rows.items()}
+        for y in frame.keys() | old.keys():
+            row = frame.get(y, ())
+            if row == old.get(y):
+                continue
+            try:
+                self.stdscr.move(y, 0)
+                self.stdscr.clrtoeol()
+                for x, text, attr in row:
+                    self.stdscr.addstr(y, x, text, attr)
+            except curses.error:
+                pass  # off screen or the bottom-right cell
+        self.shown = frame
+        self.stdscr.noutrefresh()
+        curses.doupdate()
+
+SCROLL_KEYS = {curses.KEY_UP: -1, curses.KEY_DOWN: 1, curses.KEY_PPAGE: -2, curses.KEY_NPAGE: 2,
+               curses.KEY_HOME: -3, curses.KEY_END: 3}
+
+class ListView:
+    """Scroll position over a list, rows are only formatted when visible"""
+
+    def __init__(self):
+        self.offset = 0
+        self.page = 1
+
+    def scroll(self, key):
+        """Apply an arrow/page/home/end key, False for other keys"""
+        step = SCROLL_KEYS.get(key)
+        if step is None:
+            return False
+        if abs(step) == 1:
+            self.offset += step
+        elif abs(step) == 2:
+            self.offset += self.page * (step // 2)
+        else:
+            self.offset = 0 if step < 0 else sys.maxsize
+        self.offset = max(0, self.offset)  # the upper bound is applied at draw time
+        return True
+
+    def draw(self, screen, y, x, height, width, count, row):
+        """Draw rows offset..offset+height, row(i) gives (text, attr); returns a position label or ''"""
+        self.page = max(1, height)
+        self.offset = max(0, min(self.offset, count - height))
+        end = min(count, self.offset + height)
+        for i in range(self.offset, end):
+            text, attr = row(i)
+            screen.addstr(y + i - self.offset, x, text[:width], attr)
+        if count <= height:
+            return ""
+        return f" {self.offset+1}-{end}/{count} "
 
 def draw_box(stdscr, y, x, height, width, title=""):
     stdscr.addstr(y, x, "┌" + "─"*(width-2) + "┐")
@@ -189,105 +1825,170 @@ def draw_box(stdscr, y, x, height, width, title=""):
     if title:
         stdscr.addstr(y, x+2, f" {title} ", curses.A_BOLD)
 
+LEVEL_KEYS = {ord('e'): 'ERROR', ord('w'): 'WARNING', ord('i'): 'INFO'}
+
 def show_logs(stdscr):
-    stdscr.clear()
-    stdscr.nodelay(0)
-    stdscr.timeout(-1)
-    height, width = stdscr.getmaxyx()
-    logs = run_command("journalctl -u dynamic-router.service -n 100 --no-pager")
-    lines = logs.split('\n')
-    title = "═ ROUTER LOGS (Press Q to return) ═"
-    stdscr.addstr(0, (width-len(title))//2, title, curses.A_BOLD | curses.color_pair(3))
-    start_line = max(0, len(lines)-(height-3))
-    for i, line in enumerate(lines[start_line:]):
-        if i >= height-2: break
-        color = curses.color_pair(1)
-        if 'ERROR' in line: color = curses.color_pair(2)
-        elif 'WARNING' in line: color = curses.color_pair(4)
-        elif 'INFO' in line and '✓' in line: color = curses.color_pair(3)
-        stdscr.addstr(i+2, 0, line[:width-1], color)
-    stdscr.refresh()
-    
+    follower = open_journal()
+    journal = follower.journal
+    lines = ListView()
+    level, keyword = '', ''
+    prompt = None     # search text being typed
+    following = True  # stay on the newest entry as new ones arrive
+    dropped = None
+    drawn = None
+    stdscr.timeout(UI_TIMEOUT_MS)
     while True:
+        frame = (journal.version, level, keyword, prompt, lines.offset, follower.error)
+        if frame != drawn:
+            drawn = frame
+            stdscr.erase()
+            height, width = stdscr.getmaxyx()
+            title = "═ ROUTER LOGS (Press Q to return) ═"
+            stdscr.addstr(0, (width-len(title))//2, title, curses.A_BOLD | curses.color_pair(3))
+            with journal.lock:
+                view = journal.view(level, keyword)
+                # Entries evicted from the ring shift the view, keep the same lines on screen
+                if dropped is not None and not following:
+                    lines.offset = max(0, lines.offset - (view.dropped - dropped))
+                dropped = view.dropped
+                if following:
+                    lines.offset = max(0, len(view) - (height-4))
+
+                def log_row(i):
+                    timestamp, entry_level, message = journal.entry(view[i])
+                    color = curses.color_pair(1)
+                    if entry_level == 'ERROR': color = curses.color_pair(2)
+                    elif entry_level == 'WARNING': color = curses.color_pair(4)
+                    elif '✓' in message: color = curses.color_pair(3)
+                    return f"{time.strftime('%b %d %H:%M:%S', time.localtime(timestamp))} {message}", color
+
+                position = lines.draw(stdscr, 2, 0, height-4, width-1, len(view), log_row)
+                total = journal.next - journal.first
+                counts = ", ".join(f"{len(journal.view(name))} {name.lower()}" for name in LOG_LEVELS[:2])
+            status = f"{total} lines ({counts})"
+            if level or keyword:
+                status += f", showing {level or 'all'}" + (f" matching '{keyword}'" if keyword else "")
+            status += "  [following]" if following else "  [paused]"
+            if follower.error:
+                status = follower.error
+            elif not total:
+                status = "Loading logs..." if follower.is_alive() else "No log entries"
+            stdscr.addstr(1, 2, status[:width-4], curses.color_pair(5))
+            if position:
+                stdscr.addstr(1, width-len(position)-2, position, curses.color_pair(5))
+            if prompt is not None:
+                stdscr.addstr(height-1, 0, f"/{prompt}"[:width-1], curses.A_BOLD)
+            else:
+                hint = "↑↓ PgUp PgDn scroll  End follow  E/W/I level  A all  / search  Q back"
+                stdscr.addstr(height-1, 0, hint[:width-1], curses.color_pair(5))
+            stdscr.refresh()
+
         key = stdscr.getch()
+        if key == -1:
+            continue
+        if prompt is not None:
+            if key in (10, 13, curses.KEY_ENTER):
+                keyword, prompt = prompt.strip(), None
+                following, dropped = True, None
+            elif key == 27:
+                prompt = None
+            elif key in (curses.KEY_BACKSPACE, 127, 8):
+                prompt = prompt[:-1]
+            elif 32 <= key < 127:
+                prompt += chr(key)
+            continue
         if key in [ord('q'), ord('Q'), 27]:
             break
-    
-    stdscr.nodelay(1)
-    stdscr.timeout(1000)
+        elif key == ord('/'):
+            prompt = keyword
+        elif key in (ord('a'), ord('A')):
+            level, keyword, following, dropped = '', '', True, None
+        elif key in LEVEL_KEYS or key + 32 in LEVEL_KEYS:
+            chosen = LEVEL_KEYS.get(key) or LEVEL_KEYS[key + 32]
+            level = '' if level == chosen else chosen
+            following, dropped = True, None
+        elif key == curses.KEY_RESIZE:
+            drawn = None
+        elif lines.scroll(key):
+            # Following resumes at the end, any other scroll pauses it
+            following = key == curses.KEY_END
 
 def show_vpn_details(stdscr, status_data):
     """Show detailed VPN configuration with routing rules"""
-    stdscr.clear()
-    stdscr.nodelay(0)
-    stdscr.timeout(-1)
-    height, width = stdscr.getmaxyx()
-    title = "═ VPN ROUTING DETAILS (Press Q to return) ═"
-    stdscr.addstr(0, (width-len(title))//2, title, curses.A_BOLD | curses.color_pair(6))
-    
-    y = 2
-    stdscr.addstr(y, 2, "VPN Routing Status:", curses.A_BOLD)
-    if status_data.get('vpn_routing_enabled'):
-        stdscr.addstr(y, 25, "ENABLED", curses.color_pair(3) | curses.A_BOLD)
-    else:
-        stdscr.addstr(y, 25, "DISABLED", curses.color_pair(4) | curses.A_BOLD)
-    
-    y += 2
-    stdscr.addstr(y, 2, "Subnets File:", curses.A_BOLD)
-    stdscr.addstr(y, 25, status_data.get('vpn_subnets_file', 'N/A'), curses.color_pair(1))
-    
-    y += 2
-    stdscr.addstr(y, 2, "Active VPN Interfaces:", curses.A_BOLD)
     vpn_ifaces = status_data.get('vpn_interfaces', [])
-    if vpn_ifaces:
-        for i, iface in enumerate(vpn_ifaces):
-            stdscr.addstr(y+i, 25, f"● {iface}", curses.color_pair(3))
-            y += 1
-        y -= 1
-    else:
-        stdscr.addstr(y, 25, "None", curses.color_pair(4))
-    
-    y += 2
-    stdscr.addstr(y, 2, "All Configured Subnets:", curses.A_BOLD)
-    y += 1
     subnets = status_data.get('vpn_subnets', [])
-    if subnets:
-        for i, subnet in enumerate(subnets):
-            if y + i >= height - 3:
-                stdscr.addstr(y+i, 4, f"... and {len(subnets)-i} more", curses.color_pair(5))
-                break
-            stdscr.addstr(y+i, 4, f"• {subnet}", curses.color_pair(1))
-    else:
-        stdscr.addstr(y, 4, "No subnets configured", curses.color_pair(4))
-    
-    # Show routing rules if VPN is active
-    if status_data.get('vpn_active') and vpn_ifaces:
-        y = height - 10
-        stdscr.addstr(y, 2, "Active Routing Rules:", curses.A_BOLD | curses.color_pair(6))
-        y += 1
-        
-        # Check for routing rules
-        for iface in vpn_ifaces[:2]:
-            routes = run_command(f"ip route show dev {iface} 2>/dev/null | head -3")
-            if routes:
-                stdscr.addstr(y, 4, f"{iface}:", curses.color_pair(3))
-                y += 1
-                for route_line in routes.split('\n')[:2]:
-                    if y >= height - 3:
-                        break
-                    stdscr.addstr(y, 6, route_line[:width-8], curses.color_pair(1))
-                    y += 1
-    
-    stdscr.addstr(height-2, 2, "Press Q to return...", curses.color_pair(5))
-    stdscr.refresh()
-    
+    routes = []
+    if status_data.get('vpn_active'):
+        routes = [(iface, line) for iface in vpn_ifaces for line in collector.routes(iface)]
+    lists = [ListView(), ListView()]
+    focus = 0
+    drawn = False
+
     while True:
+        if not drawn:
+            drawn = True
+            stdscr.erase()
+            height, width = stdscr.getmaxyx()
+            title = "═ VPN ROUTING DETAILS (Press Q to return) ═"
+            stdscr.addstr(0, (width-len(title))//2, title, curses.A_BOLD | curses.color_pair(6))
+
+            y = 2
+            stdscr.addstr(y, 2, "VPN Routing Status:", curses.A_BOLD)
+            if status_data.get('vpn_routing_enabled'):
+                stdscr.addstr(y, 25, "ENABLED", curses.color_pair(3) | curses.A_BOLD)
+            else:
+                stdscr.addstr(y, 25, "DISABLED", curses.color_pair(4) | curses.A_BOLD)
+
+            y += 2
+            stdscr.addstr(y, 2, "Subnets File:", curses.A_BOLD)
+            stdscr.addstr(y, 25, status_data.get('vpn_subnets_file', 'N/A'), curses.color_pair(1))
+
+            y += 2
+            stdscr.addstr(y, 2, "Active VPN Interfaces:", curses.A_BOLD)
+            if vpn_ifaces:
+                stdscr.addstr(y, 25, "  ".join(f"● {iface}" for iface in vpn_ifaces)[:width-27], curses.color_pair(3))
+            else:
+                stdscr.addstr(y, 25, "None", curses.color_pair(4))
+
+            # Subnets take the space above the routes, both scroll independently
+            routes_height = min(len(routes), 6) if routes else 0
+            subnets_bottom = height - 3 - (routes_height + 2 if routes else 0)
+            y += 2
+            marker = "▸ " if focus == 0 and routes else ""
+            stdscr.addstr(y, 2, marker + "All Configured Subnets:", curses.A_BOLD)
+            if status_data.get('vpn_subnets_compiled'):
+                stdscr.addstr(y, 27, f"{len(subnets)} prefixes in ipset (from {status_data.get('vpn_subnets_source', 0)} entries)",
+                              curses.color_pair(5))
+            y += 1
+            if subnets:
+                position = lists[0].draw(stdscr, y, 4, subnets_bottom - y, width-6, len(subnets),
+                                         lambda i: (f"• {subnets[i]}", curses.color_pair(1)))
+                if position:
+                    stdscr.addstr(y-1, width-len(position)-2, position, curses.color_pair(5))
+            else:
+                stdscr.addstr(y, 4, "No subnets configured", curses.color_pair(4))
+
+            if routes:
+                y = subnets_bottom + 1
+                marker = "▸ " if focus == 1 else ""
+                stdscr.addstr(y, 2, marker + "Active Routing Rules:", curses.A_BOLD | curses.color_pair(6))
+                position = lists[1].draw(stdscr, y+1, 4, routes_height, width-6, len(routes),
+                                         lambda i: (f"{routes[i][0]}: {routes[i][1]}", curses.color_pair(1)))
+                if position:
+                    stdscr.addstr(y, width-len(position)-2, position, curses.color_pair(5))
+
+            hint = "Press Q to return, ↑↓/PgUp/PgDn to scroll" + (", Tab to switch list" if routes else "")
+            stdscr.addstr(height-2, 2, hint[:width-4], curses.color_pair(5))
+            stdscr.refresh()
+
         key = stdscr.getch()
         if key in [ord('q'), ord('Q'), 27]:
             break
-    
-    stdscr.nodelay(1)
-    stdscr.timeout(1000)
+        elif key == ord('\t') and routes:
+            focus = 1 - focus
+            drawn = False
+        elif key == curses.KEY_RESIZE or lists[focus].scroll(key):
+            drawn = False
 
 def confirm_action(stdscr, message):
     height, width = stdscr.getmaxyx()
@@ -311,6 +2012,7 @@ def show_message(stdscr, message, color=1):
     stdscr.refresh()
 
 def main(stdscr):
+    stdscr = Screen(stdscr)
     curses.start_color()
     curses.init_pair(1, curses.COLOR_CYAN, curses.COLOR_BLACK)
     curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)
@@ -321,180 +2023,290 @@ def main(stdscr):
 
     curses.curs_set(0)
     stdscr.nodelay(1)
-    stdscr.timeout(1000)
+    stdscr.timeout(UI_TIMEOUT_MS)
 
-    last_update = 0
-    status_data = {}
+    worker = open_status_source(args)
+    worker.start()
+    drawn = None
+    message = None  # (text, color, expires)
+    pending_action = None  # (future, done text, color)
 
     while True:
-        now = time.time()
-        if now - last_update >= 1:
-            status_data = get_router_status()
-            last_update = now
-
-        stdscr.clear()
-        height, width = stdscr.getmaxyx()
-        stdscr.addstr(0, (width-33)//2, "═══ DYNAMIC VM ROUTER DASHBOARD ═══", curses.A_BOLD | curses.color_pair(1))
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        stdscr.addstr(0, width-len(timestamp)-2, timestamp, curses.color_pair(5))
-
-        y = 2
-        status_color = curses.color_pair(3) if status_data.get('is_running') else curses.color_pair(2)
-        status_text = "● RUNNING" if status_data.get('is_running') else "● STOPPED"
-        stdscr.addstr(y, 2, status_text, status_color | curses.A_BOLD)
-        
-        run_mode = status_data.get('run_mode', 'unknown')
-        if run_mode == "service":
-            mode_text = "(systemd service)"
-        elif run_mode == "manual":
-            mode_text = "(manual --run mode)"
-        else:
-            mode_text = f"({status_data.get('service_status_raw','unknown')})"
-        stdscr.addstr(y, 15, mode_text, curses.color_pair(5))
-        stdscr.addstr(y, 45, f"Uptime: {status_data.get('uptime','N/A')}", curses.color_pair(5))
-
-        # NETWORK box - now taller to accommodate VPN info
-        y += 2
-        box_height = 13 if status_data.get('vpn_routing_enabled') else 9
-        draw_box(stdscr, y, 2, box_height, width-4, "NETWORK INTERFACES")
-        y += 1
-        
-        stdscr.addstr(y, 4, "WAN:", curses.A_BOLD)
-        stdscr.addstr(y, 10, f"{status_data.get('wan_iface','N/A')} ({status_data.get('wan_ip','N/A')})", curses.color_pair(3))
-        stdscr.addstr(y, 45, "DNS:", curses.A_BOLD)
-        stdscr.addstr(y, 50, ", ".join(status_data.get('wan_dns',[])[:2]), curses.color_pair(1))
+        if pending_action and pending_action[0].done():
+            future, text, color = pending_action
+            worker.invalidate()
+            message = (text, color, time.time() + 2)
+            pending_action = None
+        if message and time.time() >= message[2]:
+            message = None
+
+        # Only redraw for new data, a new second on the clock, or a changed message
+        frame = (worker.version, int(time.time()), message, pending_action is not None)
+        if frame != drawn:
+            drawn = frame
+            status_data = worker.snapshot()
+            draw_dashboard(stdscr, status_data)
+            if message:
+                show_message(stdscr, message[0], message[1])
+            elif pending_action:
+                show_message(stdscr, "… working", 5)
+            stdscr.refresh()
+
+        key = stdscr.getch()
+        if key in [ord('r'), ord('R')]:
+            if confirm_action(stdscr, "Restart router service?"):
+                pending_action = (worker.submit(run_command, f"systemctl restart {SERVICE_UNIT}"),
+                                  "✓ Router service restarted", 3)
+            drawn = None
+        elif key in [ord('s'), ord('S')]:
+            if confirm_action(stdscr, "Stop router service?"):
+                pending_action = (worker.submit(run_command, f"systemctl stop {SERVICE_UNIT}"),
+                                  "✓ Router service stopped", 4)
+            drawn = None
+        elif key in [ord('v'), ord('V')]:
+            show_vpn_details(stdscr, status_data)
+            drawn = None
+        elif key in [ord('q'), ord('Q')]:
+            break
+        elif key in [ord('l'), ord('L')]:
+            show_logs(stdscr)
+            drawn = None
+        elif key in [ord('h'), ord('H')]:
+            show_help(stdscr)
+            drawn = None
+        elif key == curses.KEY_RESIZE or client_list.scroll(key):
+            drawn = None
+
+    worker.stop()
+    if journal_follower:
+        journal_follower.stop()
+
+client_list = ListView()
+
+def draw_dashboard(stdscr, status_data):
+    stdscr.erase()
+    height, width = stdscr.getmaxyx()
+    stdscr.addstr(0, (width-33)//2, "═══ DYNAMIC VM ROUTER DASHBOARD ═══", curses.A_BOLD | curses.color_pair(1))
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    stdscr.addstr(0, width-len(timestamp)-2, timestamp, curses.color_pair(5))
+
+    y = 2
+    status_color = curses.color_pair(3) if status_data.get('is_running') else curses.color_pair(2)
+    status_text = "● RUNNING" if status_data.get('is_running') else "● STOPPED"
+    stdscr.addstr(y, 2, status_text, status_color | curses.A_BOLD)
+    
+    run_mode = status_data.get('run_mode', 'unknown')
+    if run_mode == "service":
+        mode_text = "(systemd service)"
+    elif run_mode == "manual":
+        mode_text = "(manual --run mode)"
+    else:
+        mode_text = f"({status_data.get('service_status_raw','unknown')})"
+    stdscr.addstr(y, 15, mode_text, curses.color_pair(5))
+    stdscr.addstr(y, 45, f"Uptime: {status_data.get('uptime','N/A')}", curses.color_pair(5))
+    freshness, freshness_color = describe_freshness(status_data)
+    freshness = freshness[:max(0, width-72)]
+    if freshness:
+        stdscr.addstr(y, width-len(freshness)-2, freshness, curses.color_pair(freshness_color))
+
+    # NETWORK box - now taller to accommodate VPN info
+    y += 2
+    box_height = 13 if status_data.get('vpn_routing_enabled') else 9
+    draw_box(stdscr, y, 2, box_height, width-4, "NETWORK INTERFACES")
+    y += 1
+    
+    stdscr.addstr(y, 4, "WAN:", curses.A_BOLD)
+    stdscr.addstr(y, 10, f"{status_data.get('wan_iface','N/A')} ({status_data.get('wan_ip','N/A')})", curses.color_pair(3) | stale_attr(status_data, 'wan_ip'))
+    stdscr.addstr(y, 45, "DNS:", curses.A_BOLD)
+    stdscr.addstr(y, 50, ", ".join(status_data.get('wan_dns',[])[:2]), curses.color_pair(1) | stale_attr(status_data, 'wan_dns'))
+
+    y += 1
+    stdscr.addstr(y, 4, "LAN:", curses.A_BOLD)
+    stdscr.addstr(y, 10, f"{status_data.get('lan_iface','N/A')} ({status_data.get('lan_ip','N/A')})", curses.color_pair(3) | stale_attr(status_data, 'lan_ip'))
+    stdscr.addstr(y, 45, "DNS:", curses.A_BOLD)
+    stdscr.addstr(y, 50, ", ".join(status_data.get('lan_dns',[])[:2]), curses.color_pair(3) | stale_attr(status_data, 'lan_dns'))
 
+    # VPN Routing section - expanded on main dashboard
+    y += 2
+    stdscr.addstr(y, 4, "VPN Routing:", curses.A_BOLD)
+    if status_data.get('vpn_routing_enabled'):
+        stdscr.addstr(y, 18, "ENABLED", curses.color_pair(3) | curses.A_BOLD)
+    else:
+        stdscr.addstr(y, 18, "DISABLED", curses.color_pair(4))
+    
+    stdscr.addstr(y, 35, "Active VPN Interfaces:", curses.A_BOLD)
+    vpn_ifaces = status_data.get('vpn_interfaces', [])
+    if vpn_ifaces:
+        iface_text = ", ".join(vpn_ifaces[:2])
+        if len(vpn_ifaces) > 2:
+            iface_text += f" +{len(vpn_ifaces)-2}"
+        stdscr.addstr(y, 60, iface_text, curses.color_pair(3))
+    else:
+        stdscr.addstr(y, 60, "None", curses.color_pair(4))
+    
+    # Show VPN subnets on dashboard
+    if status_data.get('vpn_routing_enabled'):
         y += 1
-        stdscr.addstr(y, 4, "LAN:", curses.A_BOLD)
-        stdscr.addstr(y, 10, f"{status_data.get('lan_iface','N/A')} ({status_data.get('lan_ip','N/A')})", curses.color_pair(3))
-        stdscr.addstr(y, 45, "DNS:", curses.A_BOLD)
-        stdscr.addstr(y, 50, ", ".join(status_data.get('lan_dns',[])[:2]), curses.color_pair(3))
-
-        # VPN Routing section - expanded on main dashboard
-        y += 2
-        stdscr.addstr(y, 4, "VPN Routing:", curses.A_BOLD)
-        if status_data.get('vpn_routing_enabled'):
-            stdscr.addstr(y, 18, "ENABLED", curses.color_pair(3) | curses.A_BOLD)
-        else:
-            stdscr.addstr(y, 18, "DISABLED", curses.color_pair(4))
-        
-        stdscr.addstr(y, 35, "Active VPN Interfaces:", curses.A_BOLD)
-        vpn_ifaces = status_data.get('vpn_interfaces', [])
-        if vpn_ifaces:
-            iface_text = ", ".join(vpn_ifaces[:2])
-            if len(vpn_ifaces) > 2:
-                iface_text += f" +{len(vpn_ifaces)-2}"
-            stdscr.addstr(y, 60, iface_text, curses.color_pair(3))
+        stdscr.addstr(y, 4, "VPN Subnets:", curses.A_BOLD)
+        subnets = status_data.get('vpn_subnets', [])
+        if subnets:
+            # Show first 2 subnets inline
+            subnet_display = ", ".join(subnets[:2])
+            if len(subnets) > 2:
+                subnet_display += f" +{len(subnets)-2} more"
+            stdscr.addstr(y, 18, subnet_display[:width-25], curses.color_pair(1))
+            
+            # If there are more subnets, show them on additional lines
+            if len(subnets) > 2:
+                y += 1
+                remaining = subnets[2:5]  # Show up to 3 more
+                for subnet in remaining:
+                    if y >= box_height - 2:
+                        break
+                    stdscr.addstr(y, 18, subnet, curses.color_pair(1))
+                    y += 1
+                
+                if len(subnets) > 5:
+                    stdscr.addstr(y, 18, f"... {len(subnets)-5} more", curses.color_pair(5))
         else:
-            stdscr.addstr(y, 60, "None", curses.color_pair(4))
+            stdscr.addstr(y, 18, "None configured", curses.color_pair(4))
         
-        # Show VPN subnets on dashboard
-        if status_data.get('vpn_routing_enabled'):
-            y += 1
-            stdscr.addstr(y, 4, "VPN Subnets:", curses.A_BOLD)
-            subnets = status_data.get('vpn_subnets', [])
-            if subnets:
-                # Show first 2 subnets inline
-                subnet_display = ", ".join(subnets[:2])
-                if len(subnets) > 2:
-                    subnet_display += f" +{len(subnets)-2} more"
-                stdscr.addstr(y, 18, subnet_display[:width-25], curses.color_pair(1))
-                
-                # If there are more subnets, show them on additional lines
-                if len(subnets) > 2:
-                    y += 1
-                    remaining = subnets[2:5]  # Show up to 3 more
-                    for subnet in remaining:
-                        if y >= box_height - 2:
-                            break
-                        stdscr.addstr(y, 18, subnet, curses.color_pair(1))
-                        y += 1
-                    
-                    if len(subnets) > 5:
-                        stdscr.addstr(y, 18, f"... {len(subnets)-5} more", curses.color_pair(5))
-            else:
-                stdscr.addstr(y, 18, "None configured", curses.color_pair(4))
-            
-            # Add hint to view more details
-            y += 1
-            stdscr.addstr(y, 4, "[Press V for full VPN details]", curses.color_pair(5))
-
-        # Statistics
-        y = 2 + box_height + 1
-        draw_box(stdscr, y, 2, 6, width//2-3, "STATISTICS")
-        y += 1
-        stdscr.addstr(y, 4, f"Downloaded:  {status_data.get('rx_bytes','0 B')}", curses.color_pair(1))
-        y += 1
-        stdscr.addstr(y, 4, f"Uploaded:    {status_data.get('tx_bytes','0 B')}", curses.color_pair(1))
-        y += 1
-        stdscr.addstr(y, 4, f"Connections: {status_data.get('connections',0)}", curses.color_pair(1))
-
-        # LAN Clients
-        clients_y = 2 + box_height + 1
-        draw_box(stdscr, clients_y, width//2+1, 6, width//2-3, "LAN CLIENTS")
-        clients_y += 1
-        stdscr.addstr(clients_y, width//2+3, f"Total: {status_data.get('lan_clients',0)}", curses.color_pair(6)|curses.A_BOLD)
-        clients_y += 1
-        clients = status_data.get('clients',[])
-        for i, ip in enumerate(clients[:2]):
-            stdscr.addstr(clients_y+i, width//2+3, f"• {ip}", curses.color_pair(3))
-        if len(clients)>2:
-            stdscr.addstr(clients_y+2, width//2+3, f"... and {len(clients)-2} more", curses.color_pair(5))
-
-        # Controls
-        y = height-4
-        stdscr.addstr(y, 2, "─"*(width-4), curses.color_pair(5))
+        # Add hint to view more details
         y += 1
-        controls = "[Q]uit  [R]estart  [S]top  [L]ogs  [V]PN Details  [H]elp"
-        stdscr.addstr(y, (width-len(controls))//2, controls, curses.A_BOLD|curses.color_pair(6))
+        stdscr.addstr(y, 4, "[Press V for full VPN details]", curses.color_pair(5))
 
-        stdscr.refresh()
+    # Statistics and LAN clients share a row, as tall as the longer of the two allows
+    stats_lines = build_statistics_lines(status_data)
+    stats_y = 2 + box_height + 1
+    client_rows = len(status_data.get('client_stats', [])) + len(status_data.get('clients', [])) + 1
+    stats_height = max(6, min(max(len(stats_lines), client_rows) + 2, height - 4 - stats_y))
+    draw_box(stdscr, stats_y, 2, stats_height, width//2-3, "STATISTICS")
+    inner_width = width//2-7
+    for i, (text, attr, spark) in enumerate(stats_lines[:stats_height-2]):
+        text = text[:inner_width]
+        stdscr.addstr(stats_y+1+i, 4, text, attr | stale_attr(status_data, 'rates'))
+        if spark is not None and inner_width - len(text) > 2:
+            stdscr.addstr(stats_y+1+i, 5+len(text), sparkline(spark, inner_width-len(text)-1), curses.color_pair(3))
 
-        try:
-            key = stdscr.getch()
-            if key in [ord('q'), ord('Q')]:
-                break
-            elif key in [ord('r'), ord('R')]:
-                if confirm_action(stdscr, "Restart router service?"):
-                    run_command("systemctl restart dynamic-router.service")
-                    show_message(stdscr,"✓ Router service restarted",3)
-                    time.sleep(2)
-            elif key in [ord('s'), ord('S')]:
-                if confirm_action(stdscr, "Stop router service?"):
-                    run_command("systemctl stop dynamic-router.service")
-                    show_message(stdscr,"✓ Router service stopped",4)
-                    time.sleep(2)
-            elif key in [ord('l'), ord('L')]:
-                show_logs(stdscr)
-            elif key in [ord('v'), ord('V')]:
-                show_vpn_details(stdscr, status_data)
-            elif key in [ord('h'), ord('H')]:
-                stdscr.clear()
-                stdscr.nodelay(0)
-                stdscr.timeout(-1)
-                help_text = ["═══ HELP ═══","","Q - Quit","R - Restart router service","S - Stop router service",
-                             "L - View full logs","V - View detailed VPN configuration","H - Show this help","","Dashboard refreshes every second.","",
-                             "Press Q to return..."]
-                for i,line in enumerate(help_text):
-                    attr = curses.A_BOLD if i==0 else curses.A_NORMAL
-                    stdscr.addstr(i+2,(width-len(line))//2,line,attr)
-                stdscr.refresh()
-                
-                while True:
-                    key = stdscr.getch()
-                    if key in [ord('q'), ord('Q'), 27]:
-                        break
-                
-                stdscr.nodelay(1)
-                stdscr.timeout(1000)
-        except KeyboardInterrupt:
+    # LAN Clients
+    clients_y = stats_y
+    draw_box(stdscr, clients_y, width//2+1, stats_height, width//2-3, "LAN CLIENTS")
+    clients_y += 1
+    stdscr.addstr(clients_y, width//2+3, f"Total: {status_data.get('lan_clients',0)}", curses.color_pair(6)|curses.A_BOLD|stale_attr(status_data, 'clients'))
+    clients_y += 1
+    # Busiest clients first with their forwarded rates, then every neighbour
+    client_stats = status_data.get('client_stats', [])
+    clients = status_data.get('clients', [])
+
+    def client_row(i):
+        if i < len(client_stats):
+            client = client_stats[i]
+            return (f"• {client['ip']:<15} ↓{get_human_readable_rate(client['down_bps'], compact=True):>5}"
+                    f" ↑{get_human_readable_rate(client['up_bps'], compact=True):>5} {client['flows']}f",
+                    curses.color_pair(3) | stale_attr(status_data, 'client_stats'))
+        return f"• {clients[i - len(client_stats)]}", curses.color_pair(3)
+
+    position = client_list.draw(stdscr, clients_y, width//2+3, stats_height-3, width//2-7,
+                                len(client_stats) + len(clients), client_row)
+    if position:
+        stdscr.addstr(stats_y+stats_height-1, width-len(position)-4, position, curses.color_pair(5))
+
+    # Controls
+    y = height-4
+    stdscr.addstr(y, 2, "─"*(width-4), curses.color_pair(5))
+    y += 1
+    controls = "[Q]uit  [R]estart  [S]top  [L]ogs  [V]PN Details  [H]elp"
+    stdscr.addstr(y, (width-len(controls))//2, controls, curses.A_BOLD|curses.color_pair(6))
+
+def build_statistics_lines(status_data):
+    """(text, attr, sparkline values) rows for the STATISTICS box, most important first"""
+    lines = [
+        (f"Downloaded:  {status_data.get('rx_bytes','0 B')}", curses.color_pair(1) | stale_attr(status_data, 'rx_bytes'), None),
+        (f"Uploaded:    {status_data.get('tx_bytes','0 B')}", curses.color_pair(1) | stale_attr(status_data, 'tx_bytes'), None),
+        (f"Connections: {status_data.get('connections',0)}", curses.color_pair(1) | stale_attr(status_data, 'connections'), None),
+    ]
+    if status_data.get('conntrack_source'):
+        lines.append((f"Forwarded:   {status_data.get('forwarded_flows',0)} flows",
+                      curses.color_pair(1) | stale_attr(status_data, 'forwarded_flows'), None))
+    rates = status_data.get('rates', {})
+    for iface, rate in rates.items():
+        text = (f"{iface[:6]:<6} ↓{get_human_readable_rate(rate['rx'], compact=True):>5}"
+                f" ↑{get_human_readable_rate(rate['tx'], compact=True):>5}")
+        lines.append((text, curses.color_pair(6 if rate['role'] == 'vpn' else 1), rate['spark_rx']))
+    wan = rates.get(status_data.get('wan_iface'))
+    if wan:
+        # avg/peak per window for the WAN link
+        for label, avg_index in (("↓", 0), ("↑", 2)):
+            parts = [f"{name} {get_human_readable_rate(values[avg_index], compact=True)}/"
+                     f"{get_human_readable_rate(values[avg_index+1], compact=True)}"
+                     for name, values in wan['windows'].items()]
+            lines.append((f"{label} avg/pk " + " ".join(parts), curses.color_pair(5), None))
+    return lines
+
+def show_help(stdscr):
+    height, width = stdscr.getmaxyx()
+    stdscr.erase()
+    help_text = ["═══ HELP ═══","","Q - Quit","R - Restart router service","S - Stop router service",
+                 "L - Follow and search the logs","V - View detailed VPN configuration","H - Show this help",
+                 "↑↓ PgUp PgDn Home End - Scroll the LAN clients list","",
+                 "Dashboard refreshes every second.","Dimmed values are stale or still loading.","",
+                 "Press Q to return..."]
+    for i,line in enumerate(help_text):
+        attr = curses.A_BOLD if i==0 else curses.A_NORMAL
+        stdscr.addstr(i+2,(width-len(line))//2,line,attr)
+    stdscr.refresh()
+
+    while True:
+        key = stdscr.getch()
+        if key in [ord('q'), ord('Q'), 27]:
             break
-        except:
-            pass
+
+def describe_freshness(status_data):
+    """Header text and colour pair describing how current the snapshot is"""
+    stale = status_data.get('_stale', [])
+    if not stale:
+        age = field_age(status_data, 'connections')
+        return (f"data {age:.1f}s" if age is not None else "loading…"), 5
+    parts = []
+    for field in stale[:3]:
+        age = field_age(status_data, field)
+        parts.append(f"{field} {age:.0f}s" if age is not None else field)
+    if len(stale) > 3:
+        parts.append(f"+{len(stale)-3}")
+    return "⚠ stale: " + ", ".join(parts), 4
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Dynamic Router Terminal UI")
+    parser.add_argument('--collector', choices=sorted(COLLECTORS), default='native',
+                        help="where kernel facts come from (default: native /proc and /sys reads)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--hub', action='store_true',
+                      help="collect without a UI and publish snapshots on --socket for dashboards")
+    mode.add_argument('--standalone', action='store_true',
+                      help="always collect in-process, even when a hub is running")
+    parser.add_argument('--socket', default=HUB_SOCKET, help=f"hub socket path (default: {HUB_SOCKET})")
+    parser.add_argument('--export', action='store_true',
+                        help="no UI: serve Prometheus metrics on --listen and/or write --json-lines")
+    parser.add_argument('--listen', default=EXPORT_LISTEN,
+                        help=f"metrics address with --export, empty to disable (default: {EXPORT_LISTEN})")
+    parser.add_argument('--json-lines', metavar='FILE', help="append a JSON record to FILE with --export")
+    parser.add_argument('--json-interval', type=float, default=10.0,
+                        help="seconds between JSON records (default: 10)")
+    args = parser.parse_args()
+    if args.export and args.hub:
+        parser.error("--export and --hub are separate processes, start the hub first")
+    return args
 
 if __name__=='__main__':
+    args = parse_args()
+    collector = COLLECTORS[args.collector]()
     try:
-        curses.wrapper(main)
+        if args.hub:
+            run_hub(args.socket)
+        elif args.export:
+            run_export(args)
+        else:
+            curses.wrapper(main)
     except KeyboardInterrupt:
         print("\nExiting...")
         sys.exit(0)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Dynamic Router network monitor
+Subscribes to rtnetlink link, address and route events and prints one line
+whenever the state the router cares about changes: the WAN interface (default
+route), the set of VPN interfaces, or the LAN interface address.
+dynamic-router.sh reads these lines and reconfigures, replacing its 10-second
+polling loop.
+Usage: python3 router-netmon.py --lan <LAN_IFACE> [--debounce 0.3] [--heartbeat 60]
+Output: CHANGE wan=<iface> vpn=<iface:up|down,...> lan=<ip/cidr> reason=<events>
+Exits with status 2 if rtnetlink is unavailable so the caller can fall back to polling.
+"""
+
+import argparse
+import errno
+import fcntl
+import select
+import socket
+import struct
+import sys
+import time
+
+from router_ifaces import default_route_iface, iface_up, vpn_interfaces
+
+# rtnetlink multicast groups (linux/rtnetlink.h)
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+
+NLMSG_HEADER = struct.Struct('=LHHLL')  # len, type, flags, seq, pid
+RTM_NAMES = {
+    16: 'link', 17: 'link',
+    20: 'addr', 21: 'addr',
+    24: 'route', 25: 'route',
+}
+
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891b
+
+def open_rtnetlink():
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+    # Large buffer so a burst of VPN routes does not overflow it
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+    sock.setblocking(False)
+    return sock
+
+def drain_events(sock):
+    """Read every queued datagram, return the kinds of events seen"""
+    kinds = set()
+    while True:
+        try:
+            data = sock.recv(65536)
+        except BlockingIOError:
+            return kinds
+        except OSError as e:
+            # ENOBUFS: events were dropped, the state has to be re-read anyway
+            kinds.add('overrun' if e.errno == errno.ENOBUFS else 'error')
+            return kinds
+        offset = 0
+        while offset + NLMSG_HEADER.size <= len(data):
+            length, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+            if length < NLMSG_HEADER.size:
+                break
+            if msg_type in RTM_NAMES:
+                kinds.add(RTM_NAMES[msg_type])
+            offset += (length + 3) & ~3
+
+def iface_cidr(sock, iface):
+    ifreq = struct.pack('256s', iface[:15].encode())
+    try:
+        address = socket.inet_ntoa(fcntl.ioctl(sock.fileno(), SIOCGIFADDR, ifreq)[20:24])
+        netmask = fcntl.ioctl(sock.fileno(), SIOCGIFNETMASK, ifreq)[20:24]
+    except OSError:
+        return ""
+    return f"{address}/{bin(int.from_bytes(netmask, 'big')).count('1')}"
+
+def read_state(inet_sock, lan_iface):
+    # A VPN link going up or down changes which routes can be installed
+    vpn = tuple(f"{name}:{'up' if iface_up(name) else 'down'}" for name in vpn_interfaces())
+    return (default_route_iface(), vpn, iface_cidr(inet_sock, lan_iface))
+
+def emit(state, reasons):
+    wan, vpn, lan = state
+    print(f"CHANGE wan={wan or '-'} vpn={','.join(vpn) or '-'} lan={lan or '-'} "
+          f"reason={','.join(sorted(reasons))}", flush=True)
+
+def monitor(lan_iface, debounce, max_delay, heartbeat):
+    try:
+        nl_sock = open_rtnetlink()
+    except OSError as e:
+        print(f"[ERROR] rtnetlink unavailable: {e}", file=sys.stderr)
+        sys.exit(2)
+    inet_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    last_state = read_state(inet_sock, lan_iface)
+    pending = set()
+    first_event = last_event = 0.0
+    last_emit = time.monotonic()
+
+    while True:
+        now = time.monotonic()
+        if pending:
+            # Wait for the burst to go quiet, but never longer than max_delay in total
+            timeout = max(0.0, min(last_event + debounce, first_event + max_delay) - now)
+        else:
+            timeout = max(0.0, last_emit + heartbeat - now)
+        readable, _, _ = select.select([nl_sock], [], [], timeout)
+        now = time.monotonic()
+
+        if readable:
+            kinds = drain_events(nl_sock)
+            if kinds:
+                if not pending:
+                    first_event = now
+                pending |= kinds
+                last_event = now
+            continue
+
+        if pending:
+            state = read_state(inet_sock, lan_iface)
+            # A flap that ends where it started needs no reconfiguration
+            if state != last_state or pending & {'overrun', 'error'}:
+                emit(state, pending)
+                last_state = state
+                last_emit = now
+            pending = set()
+        elif now - last_emit >= heartbeat:
+            # Safety net for anything netlink did not tell us about
+            last_state = read_state(inet_sock, lan_iface)
+            emit(last_state, {'heartbeat'})
+            last_emit = now
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Print router network state changes from rtnetlink")
+    parser.add_argument('--lan', required=True, help="LAN interface whose address is watched")
+    parser.add_argument('--debounce', type=float, default=0.3,
+                        help="seconds without events before reporting a change (default: 0.3)")
+    parser.add_argument('--max-delay', type=float, default=2.0,
+                        help="report a continuous burst after this many seconds (default: 2)")
+    parser.add_argument('--heartbeat', type=float, default=60.0,
+                        help="report the state this often even without events (default: 60)")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    try:
+        monitor(args.lan, args.debounce, args.max_delay, args.heartbeat)
+    except (KeyboardInterrupt, BrokenPipeError):
+        sys.exit(0)
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Dynamic Router firewall compiler
+Builds the complete desired filter and nat rules for the router from the LAN,
+WAN, VPN interfaces and VPN subnets, diffs them against the live ruleset from
+iptables-save and applies the difference as one `iptables-restore --noflush`
+transaction. Running it again with the same state changes nothing, no matter
+how many WAN failovers happened before.
+The router's rules live in its own ROUTER-* chains, jumped to from the
+builtin chains, so rules added by Docker, fail2ban, libvirt or an admin are
+left alone.
+VPN subnets are read once, overlapping and adjacent prefixes are collapsed,
+and the result is loaded into a hash:net ipset that a fixed number of rules
+match against. Routes for the prefixes are added with one `ip -batch`. The
+aggregated list is written to vpn-subnets.compiled for the dashboard.
+Usage: sudo python3 router-rules.py --lan <LAN_IFACE> [--wan <WAN_IFACE>] [--vpn]
+                                    [--subnets <file>] [--save <rules.v4>] [--dry-run]
+"""
+
+import argparse
+import ipaddress
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+
+from router_ifaces import VPN_IFACE_RE, default_route_iface, vpn_interfaces
+
+CIDR_RE = re.compile(r'^[0-9]{1,3}(\.[0-9]{1,3}){3}/[0-9]{1,2}$')
+DEFAULT_SUBNETS_FILE = "/etc/router/vpn-subnets.txt"
+COMPILED_SUBNETS_FILE = "/etc/router/vpn-subnets.compiled"
+VPN_IPSET = "router-vpn"
+
+# Builtin chain -> chain owned by the router. Everything in an owned chain is
+# an ACCEPT/MASQUERADE rule, so rule order inside it does not change the
+# verdict and the diff can append missing rules and delete surplus ones in
+# place. The builtin chains only get one jump each from us.
+MANAGED_CHAINS = {
+    'filter': {'INPUT': 'ROUTER-INPUT', 'FORWARD': 'ROUTER-FORWARD', 'OUTPUT': 'ROUTER-OUTPUT'},
+    'nat': {'POSTROUTING': 'ROUTER-POSTROUTING'},
+}
+POLICIES = {
+    'filter': {'INPUT': 'DROP', 'FORWARD': 'DROP', 'OUTPUT': 'ACCEPT'},
+    'nat': {},
+}
+
+ESTABLISHED = "-m state --state RELATED,ESTABLISHED"
+
+# Rules that router.sh and router-rules.py put straight into the builtin chains
+# before the ROUTER-* chains existed ({lan} is the LAN interface). They are
+# removed once, when the ROUTER-* chain of that builtin is created. Until then
+# the old startup flush was the only cleanup, so rules for earlier WANs and
+# the per-subnet FORWARD rules restored from rules.v4 pile up otherwise.
+LEGACY_RULES = {
+    ('filter', 'INPUT'): (
+        r'-i (lo|{lan}|(tun|tap|ppp|wg|ipsec)\d*) -j ACCEPT',
+        rf'-i \S+ {ESTABLISHED} -j ACCEPT',
+        r'-p icmp -j ACCEPT',
+        rf'-p (tcp|udp) -m (tcp|udp) --sport 53 {ESTABLISHED} -j ACCEPT',
+    ),
+    ('filter', 'OUTPUT'): (
+        r'-o \S+ -j ACCEPT',
+        r'-p icmp -j ACCEPT',
+        r'-p (tcp|udp) -m (tcp|udp) --dport 53 -j ACCEPT',
+    ),
+    ('filter', 'FORWARD'): (
+        r'-i {lan} -o \S+ -j ACCEPT',
+        rf'-i \S+ -o {{lan}} {ESTABLISHED} -j ACCEPT',
+        r'-s \S+ -i \S+ -o {lan} -j ACCEPT',
+        r'-d \S+ -i {lan} -o \S+ -j ACCEPT',
+        rf'-i \S+ -o {{lan}} -m set --match-set {VPN_IPSET} src -j ACCEPT',
+        rf'-i {{lan}} -o \S+ -m set --match-set {VPN_IPSET} dst -j ACCEPT',
+    ),
+    ('nat', 'POSTROUTING'): (
+        r'-o \S+ -j MASQUERADE',
+    ),
+}
+
+def legacy_rule_re(table, builtin, lan):
+    patterns = [pattern.replace('{lan}', re.escape(lan)) for pattern in LEGACY_RULES[(table, builtin)]]
+    return re.compile(rf"-A {builtin} (?:{'|'.join(patterns)})$")
+
+def read_vpn_subnets(path):
+    """Valid CIDRs from the subnets file, like read_vpn_subnets in router.sh"""
+    subnets = []
+    try:
+        with open(path) as f:
+            for line in f:
+                line = line.split('#')[0].strip()
+                if not line:
+                    continue
+                try:
+                    if not CIDR_RE.match(line):
+                        raise ValueError(line)
+                    subnets.append(ipaddress.ip_network(line, strict=False))
+                except ValueError:
+                    print(f"[WARNING] Invalid CIDR, skipping: {line}", file=sys.stderr)
+    except OSError:
+        pass
+    return subnets
+
+def aggregate_subnets(subnets):
+    """Collapse overlapping and adjacent prefixes into the smallest equivalent list"""
+    return [str(net) for net in ipaddress.collapse_addresses(subnets)]
+
+def read_compiled_subnets(path):
+    try:
+        with open(path) as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    except OSError:
+        return None
+
+def write_compiled_subnets(path, source, source_count, prefixes):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(f"# Generated by router-rules.py from {source}\n")
+        f.write(f"# source-entries: {source_count}\n")
+        for prefix in prefixes:
+            f.write(f"{prefix}\n")
+    os.replace(tmp, path)
+
+def ipset_exists(name):
+    return subprocess.run(["ipset", "list", "-n", name], capture_output=True).returncode == 0
+
+def ipset_restore_script(name, prefixes):
+    """ipset restore input that atomically swaps name's content for prefixes"""
+    maxelem = max(65536, 2 * len(prefixes))
+    staging = f"{name}-new"
+    create = f"hash:net family inet hashsize 1024 maxelem {maxelem} -exist"
+    lines = [f"create {name} {create}", f"create {staging} {create}", f"flush {staging}"]
+    lines += [f"add {staging} {prefix}" for prefix in prefixes]
+    lines += [f"swap {staging} {name}", f"destroy {staging}"]
+    return "\n".join(lines) + "\n"
+
+def route_batch(prefixes, vpn_iface, stale=None):
+    """ip -batch input routing every prefix through vpn_iface and deleting the stale {prefix: dev} routes"""
+    lines = [f"route del {prefix} dev {dev}\n" for prefix, dev in (stale or {}).items()]
+    lines += [f"route replace {prefix} dev {vpn_iface}\n" for prefix in prefixes]
+    return "".join(lines)
+
+def vpn_routes(route_output):
+    """{prefix: dev} of the `ip -4 route show` routes that go through a VPN interface"""
+    routes = {}
+    for line in route_output.splitlines():
+        fields = line.split()
+        if 'dev' not in fields[:-1]:
+            continue
+        dev = fields[fields.index('dev') + 1]
+        if not VPN_IFACE_RE.match(dev):
+            continue
+        try:
+            routes[str(ipaddress.ip_network(fields[0], strict=False))] = dev
+        except ValueError:
+            continue  # default and other non-prefix routes
+    return routes
+
+def build_ruleset(lan, wan, vpn_ifaces, have_subnets):
+    """Desired rules per (table, builtin chain), written the way iptables-save prints them.
+    diff_ruleset moves them into the owned chains."""
+    rules = {(table, chain): [] for table, chains in MANAGED_CHAINS.items() for chain in chains}
+    inp = rules[('filter', 'INPUT')]
+    out = rules[('filter', 'OUTPUT')]
+    fwd = rules[('filter', 'FORWARD')]
+    nat = rules[('nat', 'POSTROUTING')]
+
+    # Loopback and LAN
+    inp += ["-A INPUT -i lo -j ACCEPT", f"-A INPUT -i {lan} -j ACCEPT"]
+    out += ["-A OUTPUT -o lo -j ACCEPT", f"-A OUTPUT -o {lan} -j ACCEPT"]
+
+    # ICMP and the router's own DNS
+    inp += ["-A INPUT -p icmp -j ACCEPT",
+            f"-A INPUT -p udp -m udp --sport 53 {ESTABLISHED} -j ACCEPT",
+            f"-A INPUT -p tcp -m tcp --sport 53 {ESTABLISHED} -j ACCEPT"]
+    out += ["-A OUTPUT -p icmp -j ACCEPT",
+            "-A OUTPUT -p udp -m udp --dport 53 -j ACCEPT",
+            "-A OUTPUT -p tcp -m tcp --dport 53 -j ACCEPT"]
+
+    # LAN -> WAN with NAT
+    if wan:
+        inp.append(f"-A INPUT -i {wan} {ESTABLISHED} -j ACCEPT")
+        out.append(f"-A OUTPUT -o {wan} -j ACCEPT")
+        fwd += [f"-A FORWARD -i {lan} -o {wan} -j ACCEPT",
+                f"-A FORWARD -i {wan} -o {lan} {ESTABLISHED} -j ACCEPT"]
+        nat.append(f"-A POSTROUTING -o {wan} -j MASQUERADE")
+
+    # LAN -> VPN with NAT, plus the configured subnets in both directions.
+    # The subnets live in an ipset, so this is two rules however many there are.
+    for vpn in vpn_ifaces:
+        inp.append(f"-A INPUT -i {vpn} -j ACCEPT")
+        out.append(f"-A OUTPUT -o {vpn} -j ACCEPT")
+        fwd += [f"-A FORWARD -i {lan} -o {vpn} -j ACCEPT",
+                f"-A FORWARD -i {vpn} -o {lan} {ESTABLISHED} -j ACCEPT"]
+        nat.append(f"-A POSTROUTING -o {vpn} -j MASQUERADE")
+        if have_subnets:
+            fwd += [f"-A FORWARD -i {vpn} -o {lan} -m set --match-set {VPN_IPSET} src -j ACCEPT",
+                    f"-A FORWARD -i {lan} -o {vpn} -m set --match-set {VPN_IPSET} dst -j ACCEPT"]
+    return rules
+
+def read_live_ruleset(save_output):
+    """Rules and chain headers per table from iptables-save output"""
+    rules = {}  # (table, chain) -> ['-A ...']
+    chains = {}  # (table, chain) -> (policy, counters)
+    table = None
+    for line in save_output.splitlines():
+        if line.startswith('*'):
+            table = line[1:]
+        elif line.startswith(':') and table:
+            name, policy, counters = line[1:].split()
+            chains[(table, name)] = (policy, counters)
+        elif line.startswith('-A ') and table:
+            rules.setdefault((table, line.split()[1]), []).append(line)
+    return rules, chains
+
+def diff_ruleset(desired, live, chains, lan):
+    """iptables-restore input that turns live into desired, None if they match"""
+    sections = []
+    for table, managed in MANAGED_CHAINS.items():
+        lines = []
+        for builtin, chain in managed.items():
+            policy = POLICIES[table].get(builtin)
+            live_policy, counters = chains.get((table, builtin), ('-', '[0:0]'))
+            if policy and policy != live_policy:
+                lines.append(f":{builtin} {policy} {counters}")
+            # Only a missing chain is declared, iptables-restore flushes a declared one
+            if (table, chain) not in chains:
+                lines.append(f":{chain} - [0:0]")
+        for builtin, chain in managed.items():
+            rules = [f"-A {chain}" + rule[len(f"-A {builtin}"):] for rule in desired[(table, builtin)]]
+            want = Counter(rules)
+            have = Counter(live.get((table, chain), []))
+            # Surplus and stale rules, including duplicates piled up by earlier runs
+            for rule, count in (have - want).items():
+                lines += ["-D" + rule[2:]] * count
+            for rule in rules:
+                if want[rule] > have[rule]:
+                    lines.append(rule)
+                    have[rule] += 1
+        for builtin, chain in managed.items():
+            builtin_rules = live.get((table, builtin), [])
+            jump = f"-A {builtin} -j {chain}"
+            jumps = builtin_rules.count(jump)
+            if jumps == 0:
+                lines.append(f"-I {builtin} 1 -j {chain}")
+            lines += ["-D" + jump[2:]] * max(0, jumps - 1)
+            if (table, chain) not in chains:
+                # First run with the owned chains: migrate away the old rules
+                legacy = legacy_rule_re(table, builtin, lan)
+                lines += ["-D" + rule[2:] for rule in builtin_rules if legacy.match(rule)]
+        if lines:
+            sections.append(f"*{table}\n" + "\n".join(lines) + "\nCOMMIT\n")
+    return "".join(sections) or None
+
+def run(cmd, stdin=None, check=True):
+    """stdout of cmd. A failure exits, or with check=False is only a warning and returns None."""
+    result = subprocess.run(cmd, input=stdin, capture_output=True, text=True)
+    if result.returncode != 0:
+        level = "ERROR" if check else "WARNING"
+        print(f"[{level}] {' '.join(cmd)} failed: {result.stderr.strip()}", file=sys.stderr)
+        if check:
+            sys.exit(1)
+        return None
+    return result.stdout
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compile and atomically apply the router firewall")
+    parser.add_argument('--lan', required=True, help="LAN interface")
+    parser.add_argument('--wan', help="WAN interface (default: interface of the default route)")
+    parser.add_argument('--vpn', action='store_true', help="route and NAT through detected VPN interfaces")
+    parser.add_argument('--subnets', default=DEFAULT_SUBNETS_FILE,
+                        help=f"VPN subnets file (default: {DEFAULT_SUBNETS_FILE})")
+    parser.add_argument('--compiled', default=COMPILED_SUBNETS_FILE,
+                        help=f"where the aggregated subnets are written (default: {COMPILED_SUBNETS_FILE})")
+    parser.add_argument('--save', metavar='FILE', help="write iptables-save output here after a change")
+    parser.add_argument('--dry-run', action='store_true', help="print the transaction instead of applying it")
+    return parser.parse_args()
+
+def sync_vpn_subnets(args):
+    """Aggregate the subnets file and load it into the ipset, returns (prefixes, previous prefixes)"""
+    source = read_vpn_subnets(args.subnets)
+    prefixes = aggregate_subnets(source)
+    if source:
+        print(f"[INFO] VPN subnets: {len(source)} entries aggregated into {len(prefixes)} prefixes")
+    else:
+        print(f"[WARNING] No VPN subnets configured in {args.subnets}")
+    previous = read_compiled_subnets(args.compiled) or []
+    if args.dry_run:
+        return prefixes, previous
+
+    # Reload the set only when the aggregated list changed or the set is gone
+    if prefixes != previous or not ipset_exists(VPN_IPSET):
+        run(["ipset", "restore"], stdin=ipset_restore_script(VPN_IPSET, prefixes))
+        os.makedirs(os.path.dirname(args.compiled), exist_ok=True)
+        write_compiled_subnets(args.compiled, args.subnets, len(source), prefixes)
+    return prefixes, previous
+
+def sync_vpn_routes(prefixes, previous, vpn_ifaces):
+    """Route the prefixes via the first VPN interface and drop routes of prefixes that left the list.
+    Failures are warnings like in the shell version: a VPN link that is down must not cost the firewall."""
+    live = vpn_routes(run(["ip", "-4", "route", "show"], check=False) or "")
+    current = set(prefixes)
+    stale = {prefix: live[prefix] for prefix in previous if prefix not in current and prefix in live}
+    # Same as the shell version: the first VPN interface carries the subnet routes
+    routed = prefixes if vpn_ifaces else []
+    if not routed and not stale:
+        return
+    # -force keeps going after a failed line instead of stopping the batch there
+    if run(["ip", "-force", "-batch", "-"], stdin=route_batch(routed, vpn_ifaces[0] if routed else None, stale),
+           check=False) is None:
+        print("[WARNING] Some VPN subnet routes could not be updated, retried on the next change")
+    elif routed:
+        print(f"[INFO] Routed {len(routed)} prefixes via {vpn_ifaces[0]}, removed {len(stale)} stale routes")
+    else:
+        print(f"[INFO] Removed {len(stale)} stale VPN subnet routes")
+
+def main():
+    args = parse_args()
+    wan = args.wan if args.wan is not None else default_route_iface()
+    vpn_ifaces = vpn_interfaces() if args.vpn else []
+    prefixes, previous = sync_vpn_subnets(args) if args.vpn else ([], [])
+
+    desired = build_ruleset(args.lan, wan, vpn_ifaces, bool(prefixes))
+    live, chains = read_live_ruleset(run(["iptables-save"]))
+    transaction = diff_ruleset(desired, live, chains, args.lan)
+
+    if transaction is None:
+        print("[INFO] Firewall already up to date")
+    elif args.dry_run:
+        print(transaction, end="")
+    else:
+        changes = sum(1 for line in transaction.splitlines() if line[:2] in ('-A', '-D', '-I', ':'))
+        run(["iptables-restore", "--noflush"], stdin=transaction)
+        print(f"[INFO] Firewall updated atomically ({changes} changes, "
+              f"WAN: {wan or 'none'}, VPN: {' '.join(vpn_ifaces) or 'none'})")
+        if args.save:
+            saved = run(["iptables-save"])
+            with open(args.save, 'w') as f:
+                f.write(saved)
+    # Routes last, so a VPN link that is down cannot hold back the firewall
+    if args.vpn and not args.dry_run:
+        sync_vpn_routes(prefixes, previous, vpn_ifaces)
+
+if __name__ == '__main__':
+    main()
@@ -19,11 +19,16 @@ ENABLE_VPN_ROUTING=false
 # Backup location for original DNS config
 DNS_BACKUP="/etc/router/resolv.conf.backup"
 
+# Helpers shipped next to this script: event-driven network monitor and firewall compiler
+SCRIPT_DIR="$(dirname "$(readlink -f "$0")")"
+NETMON="$SCRIPT_DIR/router-netmon.py"
+RULES="$SCRIPT_DIR/router-rules.py"
+
 # === Pre-flight check: Install requirements ===
 check_and_install_requirements() {
     echo "[INFO] Checking system requirements..."
     
-    REQUIRED_PKGS=(dnsmasq iptables iptables-persistent curl net-tools iproute2 dnsutils)
+    REQUIRED_PKGS=(dnsmasq iptables iptables-persistent curl net-tools iproute2 dnsutils python3 ipset)
     MISSING_PKGS=()
     
     for pkg in "${REQUIRED_PKGS[@]}"; do
@@ -140,6 +145,7 @@ if [ "$1" == "--reset" ]; then
     sudo iptables -P FORWARD ACCEPT
     sudo iptables -P OUTPUT ACCEPT
     sudo rm -f /etc/iptables/rules.v4
+    sudo ipset destroy router-vpn 2>/dev/null || true
     
     echo "[INFO] Stopping dnsmasq..."
     sudo systemctl stop dnsmasq 2>/dev/null || true
@@ -236,6 +242,20 @@ if [ "$MODE" == "--install-service" ]; then
     SCRIPT_PATH="$(readlink -f "$0")"
     sudo cp "$SCRIPT_PATH" /usr/local/bin/dynamic-router.sh
     sudo chmod +x /usr/local/bin/dynamic-router.sh
+    if [ -f "$NETMON" ]; then
+        sudo cp "$NETMON" /usr/local/bin/router-netmon.py
+        sudo chmod +x /usr/local/bin/router-netmon.py
+    else
+        echo "[WARNING] $NETMON not found, the service will poll for WAN/VPN changes"
+    fi
+    if [ ! -f "$RULES" ]; then
+        echo "[ERROR] $RULES not found, it is required to configure the firewall"
+        exit 1
+    fi
+    sudo cp "$RULES" /usr/local/bin/router-rules.py
+    sudo chmod +x /usr/local/bin/router-rules.py
+    # Interface helpers imported by router-rules.py and router-netmon.py
+    sudo cp "$SCRIPT_DIR/router_ifaces.py" /usr/local/bin/router_ifaces.py
     
     sudo mkdir -p /etc/router
     
@@ -372,143 +392,73 @@ fi
 # === Enable IP forwarding ===
 echo "[INFO] Enabling IP forwarding..."
 sudo sysctl -w net.ipv4.ip_forward=1
-echo "net.ipv4.ip_forward=1" | sudo tee /etc/sysctl.d/99-router.conf > /dev/null
+# Per-flow byte/packet counters, used by the dashboard's per-client accounting
+sudo modprobe nf_conntrack 2>/dev/null || true
+sudo sysctl -w net.netfilter.nf_conntrack_acct=1 2>/dev/null || true
+printf 'net.ipv4.ip_forward=1\nnet.netfilter.nf_conntrack_acct=1\n' | sudo tee /etc/sysctl.d/99-router.conf > /dev/null
 
 # === Detect VPN interfaces ===
 detect_vpn_interfaces() {
     ip link show | grep -E '^[0-9]+: (tun|tap|ppp|wg|ipsec)[0-9]*:' | awk -F': ' '{print $2}' | awk '{print $1}'
 }
 
-# === Read VPN subnets ===
-read_vpn_subnets() {
-    local subnets_file="$VPN_SUBNETS_FILE"
-    local line
-    local subnets=()
-    if [ -f "$subnets_file" ]; then
-        while IFS= read -r line; do
-            # Remove comments and whitespace
-            line=$(echo "$line" | sed 's/#.*//' | xargs)
-            if [ -n "$line" ]; then
-                if [[ "$line" =~ ^[0-9]{1,3}(\.[0-9]{1,3}){3}/[0-9]{1,2}$ ]]; then
-                    subnets+=("$line")
-                else
-                    echo "[WARNING] Invalid CIDR, skipping: $line"
-                fi
-            fi
-        done < "$subnets_file"
-    fi
-    # Output one subnet per line
-    for subnet in "${subnets[@]}"; do
-        echo "$subnet"
+# VPN interfaces with their admin state (tun0:up), so a VPN link coming up
+# re-applies its routes like a new interface does
+vpn_link_states() {
+    local iface flags
+    for iface in $(detect_vpn_interfaces); do
+        flags=$(cat "/sys/class/net/$iface/flags" 2>/dev/null || echo 0)
+        if (( flags & 1 )); then echo "$iface:up"; else echo "$iface:down"; fi
     done
 }
 
+# === Apply firewall ===
+# router-rules.py builds the full filter/nat ruleset for the current LAN, WAN,
+# VPN and subnet state, diffs it against the live rules and applies the
+# difference atomically with a single iptables-restore. Rules for a previous
+# WAN or a defunct VPN interface are removed in the same transaction.
+# The rules live in ROUTER-INPUT/FORWARD/OUTPUT/POSTROUTING, so rules and
+# chains of other tools (Docker, fail2ban, libvirt) and the mangle table are
+# not flushed any more; only --reset clears the whole firewall.
+# With --vpn it also refreshes the router-vpn ipset and the subnet routes.
+# Usage: apply_firewall [WAN], the WAN defaults to CURRENT_WAN. Returns
+# non-zero when the ruleset could not be applied.
+apply_firewall() {
+    local wan="${1:-$CURRENT_WAN}"
+    local vpn_args=()
+    if [ "$ENABLE_VPN_ROUTING" = true ]; then
+        vpn_args=(--vpn --subnets "$VPN_SUBNETS_FILE")
+    fi
+    sudo mkdir -p /etc/iptables
+    sudo python3 "$RULES" --lan "$LAN_IFACE" --wan "$wan" "${vpn_args[@]}" --save /etc/iptables/rules.v4
+}
+
 # === Configure VPN routing ===
+# The subnets file is aggregated, loaded into the router-vpn ipset and routed
+# via the first VPN interface by router-rules.py, as part of apply_firewall
 configure_vpn_routing() {
     echo "[DEBUG] Starting VPN routing configuration..."
     local vpn_ifaces=($(detect_vpn_interfaces))
-    local vpn_subnets=($(read_vpn_subnets))
     
     if [ ${#vpn_ifaces[@]} -eq 0 ]; then
         echo "[INFO] No VPN interfaces detected"
-        return
-    fi
-    
-    echo "[INFO] Detected VPN interfaces: ${vpn_ifaces[*]}"
-    
-    if [ ${#vpn_subnets[@]} -eq 0 ]; then
-        echo "[WARNING] No VPN subnets configured in $VPN_SUBNETS_FILE"
-        echo "[INFO] VPN routing will use automatic route detection only"
     else
-        echo "[INFO] Configured VPN subnets: ${vpn_subnets[*]}"
+        echo "[INFO] Detected VPN interfaces: ${vpn_ifaces[*]}"
     fi
     
-    for vpn_iface in "${vpn_ifaces[@]}"; do
-        echo "[INFO] Configuring routes for VPN interface: $vpn_iface"
-        sudo iptables -A FORWARD -i "$LAN_IFACE" -o "$vpn_iface" -j ACCEPT 2>/dev/null || true
-        sudo iptables -A FORWARD -i "$vpn_iface" -o "$LAN_IFACE" -m state --state ESTABLISHED,RELATED -j ACCEPT 2>/dev/null || true
-        sudo iptables -A INPUT -i "$vpn_iface" -j ACCEPT 2>/dev/null || true
-        sudo iptables -A OUTPUT -o "$vpn_iface" -j ACCEPT 2>/dev/null || true
-        sudo iptables -t nat -A POSTROUTING -o "$vpn_iface" -j MASQUERADE 2>/dev/null || true
-        
-        for subnet in "${vpn_subnets[@]}"; do
-            if ! ip route show "$subnet" | grep -q "$vpn_iface"; then
-                echo "[INFO] Adding route: $subnet via $vpn_iface"
-                sudo ip route add "$subnet" dev "$vpn_iface" 2>/dev/null || echo "[WARNING] Route may already exist"
-            fi
-            sudo iptables -A FORWARD -s "$subnet" -i "$vpn_iface" -o "$LAN_IFACE" -j ACCEPT 2>/dev/null || true
-            sudo iptables -A FORWARD -d "$subnet" -i "$LAN_IFACE" -o "$vpn_iface" -j ACCEPT 2>/dev/null || true
-        done
-    done
-    
-    sudo iptables-save | sudo tee /etc/iptables/rules.v4 > /dev/null
+    # Also drops the rules of VPN interfaces that went away
+    apply_firewall || return 1
     echo "[INFO] VPN routing configured"
 }
 
-# === Clean up old VPN rules ===
-cleanup_vpn_rules() {
-    local old_vpn_ifaces="$1"
-    if [ -z "$old_vpn_ifaces" ]; then
-        return
-    fi
-    echo "[INFO] Cleaning up old VPN routes..."
-    for vpn_iface in $old_vpn_ifaces; do
-        if ! ip link show "$vpn_iface" &> /dev/null; then
-            echo "[INFO] Removing rules for defunct VPN interface: $vpn_iface"
-            sudo iptables -D FORWARD -i "$LAN_IFACE" -o "$vpn_iface" -j ACCEPT 2>/dev/null || true
-            sudo iptables -D FORWARD -i "$vpn_iface" -o "$LAN_IFACE" -m state --state ESTABLISHED,RELATED -j ACCEPT 2>/dev/null || true
-            sudo iptables -D INPUT -i "$vpn_iface" -j ACCEPT 2>/dev/null || true
-            sudo iptables -D OUTPUT -o "$vpn_iface" -j ACCEPT 2>/dev/null || true
-            sudo iptables -t nat -D POSTROUTING -o "$vpn_iface" -j MASQUERADE 2>/dev/null || true
-        fi
-    done
-}
-
 # === Configure iptables ===
 echo "[INFO] Configuring iptables..."
-sudo iptables -F
-sudo iptables -t nat -F
-sudo iptables -t mangle -F
-sudo iptables -X
-sudo iptables -P INPUT DROP
-sudo iptables -P FORWARD DROP
-sudo iptables -P OUTPUT ACCEPT
-
-# Allow loopback
-sudo iptables -A INPUT -i lo -j ACCEPT
-sudo iptables -A OUTPUT -o lo -j ACCEPT
-
-# Allow all traffic on LAN interface
-sudo iptables -A INPUT -i $LAN_IFACE -j ACCEPT
-sudo iptables -A OUTPUT -o $LAN_IFACE -j ACCEPT
-
-# Allow established/related connections on WAN
-sudo iptables -A INPUT -i $WAN_IFACE -m state --state ESTABLISHED,RELATED -j ACCEPT
-sudo iptables -A OUTPUT -o $WAN_IFACE -j ACCEPT
-
-# Allow ICMP (ping)
-sudo iptables -A INPUT -p icmp -j ACCEPT
-sudo iptables -A OUTPUT -p icmp -j ACCEPT
-
-# Allow DNS queries from router itself to upstream
-sudo iptables -A OUTPUT -p udp --dport 53 -j ACCEPT
-sudo iptables -A OUTPUT -p tcp --dport 53 -j ACCEPT
-sudo iptables -A INPUT -p udp --sport 53 -m state --state ESTABLISHED,RELATED -j ACCEPT
-sudo iptables -A INPUT -p tcp --sport 53 -m state --state ESTABLISHED,RELATED -j ACCEPT
-
-# Forward LAN to WAN
-sudo iptables -A FORWARD -i $LAN_IFACE -o $WAN_IFACE -j ACCEPT
-sudo iptables -A FORWARD -i $WAN_IFACE -o $LAN_IFACE -m state --state ESTABLISHED,RELATED -j ACCEPT
-
-# NAT for WAN
-sudo iptables -t nat -A POSTROUTING -o $WAN_IFACE -j MASQUERADE
-
+CURRENT_WAN=$WAN_IFACE
 if [ "$ENABLE_VPN_ROUTING" = true ]; then
     configure_vpn_routing
+else
+    apply_firewall
 fi
-
-sudo mkdir -p /etc/iptables
-sudo iptables-save | sudo tee /etc/iptables/rules.v4 > /dev/null
 echo "[INFO] Iptables configured and saved"
 
 # === Get upstream DNS servers ===
@@ -689,8 +639,7 @@ update_dnsmasq_upstream() {
 }
 
 # === WAN and VPN monitoring ===
-CURRENT_WAN=$WAN_IFACE
-CURRENT_VPN_IFACES=""
+CURRENT_VPN_IFACES="$(vpn_link_states)"
 
 echo "[INFO] Performing initial DNS and routing setup..."
 update_dnsmasq_upstream
@@ -723,7 +672,7 @@ print_diagnostics() {
     sudo systemctl is-active dnsmasq && echo "  ✓ Running" || echo "  ✗ Not running"
     echo ""
     echo "[DIAGNOSTICS] Active NAT rules:"
-    sudo iptables -t nat -L POSTROUTING -n -v | grep MASQUERADE | head -3
+    sudo iptables -t nat -L ROUTER-POSTROUTING -n -v | grep MASQUERADE | head -3
     echo ""
     echo "[DIAGNOSTICS] Routing table:"
     ip route show | head -5
@@ -749,36 +698,52 @@ echo "[INFO]   ping google.com       # Test DNS"
 echo "[INFO] ============================================"
 echo "[INFO] Starting WAN and VPN interface monitor..."
 
-while true; do
-    sleep 10
+# === React to WAN, VPN and LAN address changes ===
+check_network_state() {
     ensure_lan_ip
 
     NEW_WAN=$(ip route | awk '/^default/ {print $5; exit}')
     if [ "$NEW_WAN" != "$CURRENT_WAN" ] && [ -n "$NEW_WAN" ]; then
         echo "[INFO] WAN interface changed: $CURRENT_WAN -> $NEW_WAN"
-        CURRENT_WAN="$NEW_WAN"
-        update_dnsmasq_upstream  # This also updates router's own DNS
-        
-        # Update NAT rule for new WAN interface
-        sudo iptables -t nat -D POSTROUTING -o "$CURRENT_WAN" -j MASQUERADE 2>/dev/null || true
-        sudo iptables -t nat -A POSTROUTING -o "$CURRENT_WAN" -j MASQUERADE
-        sudo iptables -A INPUT -i "$NEW_WAN" -m state --state ESTABLISHED,RELATED -j ACCEPT 2>/dev/null || true
-        sudo iptables -A OUTPUT -o "$NEW_WAN" -j ACCEPT 2>/dev/null || true
-        sudo iptables -A FORWARD -i "$LAN_IFACE" -o "$NEW_WAN" -j ACCEPT 2>/dev/null || true
-        sudo iptables -A FORWARD -i "$NEW_WAN" -o "$LAN_IFACE" -m state --state ESTABLISHED,RELATED -j ACCEPT 2>/dev/null || true
-        
-        sudo iptables-save | sudo tee /etc/iptables/rules.v4 > /dev/null
-        
-        print_diagnostics
+        # Swap the old WAN's NAT/forward rules for the new one in one transaction.
+        # CURRENT_WAN only moves on success, so a failure is retried on the next
+        # event (or netmon heartbeat / poll).
+        if apply_firewall "$NEW_WAN"; then
+            CURRENT_WAN="$NEW_WAN"
+            update_dnsmasq_upstream  # This also updates router's own DNS
+            print_diagnostics
+        else
+            echo "[ERROR] Firewall update failed, keeping the previous rules and retrying on the next check"
+        fi
     fi
 
     if [ "$ENABLE_VPN_ROUTING" = true ]; then
-        VPN_IFACES=$(detect_vpn_interfaces)
+        VPN_IFACES=$(vpn_link_states)
         if [ "$VPN_IFACES" != "$CURRENT_VPN_IFACES" ]; then
             echo "[INFO] VPN interfaces changed: $CURRENT_VPN_IFACES -> $VPN_IFACES"
-            cleanup_vpn_rules "$CURRENT_VPN_IFACES"
-            CURRENT_VPN_IFACES="$VPN_IFACES"
-            configure_vpn_routing
+            if configure_vpn_routing; then
+                CURRENT_VPN_IFACES="$VPN_IFACES"
+            else
+                echo "[ERROR] Firewall update failed, keeping the previous rules and retrying on the next check"
+            fi
         fi
     fi
-done
+}
+
+# Catch anything that changed between the initial setup and the monitor starting
+check_network_state
+
+# Event-driven: router-netmon.py prints one debounced line per relevant rtnetlink change
+if command -v python3 &> /dev/null && [ -f "$NETMON" ]; then
+    echo "[INFO] Watching rtnetlink for WAN/VPN/LAN changes"
+    while read -r event; do
+        echo "[DEBUG] Network event: $event"
+        check_network_state
+    done < <(python3 "$NETMON" --lan "$LAN_IFACE")
+    echo "[WARNING] Network monitor exited, falling back to polling every 10 seconds"
+fi
+
+while true; do
+    sleep 10
+    check_network_state
+done
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Dynamic Router interface helpers
+Shared by router-netmon.py and router-rules.py, which import it from their
+own directory (the repo, or /usr/local/bin once installed). The VPN pattern
+matches detect_vpn_interfaces in router.sh.
+"""
+
+import os
+import re
+
+VPN_IFACE_RE = re.compile(r'^(tun|tap|ppp|wg|ipsec)\d*$')
+
+def default_route_iface():
+    """Interface of the IPv4 default route with the lowest metric, "" if there is none"""
+    best = None
+    try:
+        with open('/proc/net/route') as f:
+            next(f, None)
+            for line in f:
+                row = line.split()
+                if len(row) < 8 or row[1] != '00000000' or row[7] != '00000000':
+                    continue
+                if not int(row[3], 16) & 0x1:
+                    continue
+                if best is None or int(row[6]) < best[0]:
+                    best = (int(row[6]), row[0])
+    except OSError:
+        pass
+    return best[1] if best else ""
+
+def iface_up(name):
+    """True when the interface is administratively up (IFF_UP)"""
+    try:
+        with open(f'/sys/class/net/{name}/flags') as f:
+            return bool(int(f.read(), 16) & 0x1)
+    except (OSError, ValueError):
+        return False
+
+def vpn_interfaces():
+    """VPN interfaces in ifindex order, like `ip link show` and detect_vpn_interfaces"""
+    found = []
+    for name in os.listdir('/sys/class/net'):
+        if VPN_IFACE_RE.match(name):
+            try:
+                with open(f'/sys/class/net/{name}/ifindex') as f:
+                    found.append((int(f.read()), name))
+            except (OSError, ValueError):
+                continue
+    return [name for _, name in sorted(found)]
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+import sys
+import os
+import json
+import time
+import random
+import struct
+import asyncio
+import argparse
+
+# Usage:
+#   python check-email-records.py <domains.txt> [--selector NAME] [--resolver IP[:PORT]] [--output FILE]
+# Examples:
+#   python check-email-records.py domains.txt                        # JSON lines on stdout
+#   python check-email-records.py domains.txt --selector google --selector selector1
+#   python check-email-records.py domains.txt --resolver 127.0.0.1:5353
+#
+# Input: one domain per line, optionally followed by DKIM selectors for that
+# domain ("example.com s1 s2"). '#' starts a comment.
+#
+# Queries go straight to one resolver (default: first nameserver in
+# /etc/resolv.conf) as raw DNS over UDP, retried over TCP when the answer is
+# truncated. Answers are cached in-process for their TTL and shared by all
+# domains, so the SPF include: chains that most domains have in common are
+# resolved once. Every domain gets one JSON line with its SPF record, the
+# expanded include tree, the DNS lookup count against the RFC 7208 limit of
+# 10, and its DMARC and DKIM records.
+
+SPF_LOOKUP_LIMIT = 10
+SPF_VOID_LIMIT = 2
+TYPE_TXT = 16
+TYPE_SOA = 6
+RCODE_NXDOMAIN = 3
+NEGATIVE_TTL = 300
+
+# --------------- DNS wire format --------------------------------
+
+class DNSError(Exception):
+    pass
+
+def encode_name(name):
+    try:
+        labels = [label.encode('idna') for label in name.rstrip('.').split('.')]
+    except UnicodeError:
+        raise DNSError(f"invalid name {name!r}")
+    # Labels are 1-63 bytes and the whole name at most 255 bytes on the wire
+    if not all(0 < len(label) < 64 for label in labels) or sum(len(label) + 1 for label in labels) > 254:
+        raise DNSError(f"invalid name {name!r}")
+    return b''.join(bytes([len(label)]) + label for label in labels) + b'\0'
+
+def build_query(query_id, name, qtype):
+    # Header with RD set, one question, one additional record: EDNS0 OPT with a 1232 byte UDP size
+    header = struct.pack('>HHHHHH', query_id, 0x0100, 1, 0, 0, 1)
+    opt = b'\0' + struct.pack('>HHIH', 41, 1232, 0, 0)
+    return header + encode_name(name) + struct.pack('>HH', qtype, 1) + opt
+
+def skip_name(data, pos):
+    while True:
+        length = data[pos]
+        if length == 0:
+            return pos + 1
+        if length & 0xc0 == 0xc0:  # compression pointer
+            return pos + 2
+        pos += length + 1
+
+def parse_response(data, query_id):
+    """Return (rcode, truncated, [(type, ttl, rdata)] answers, negative ttl)"""
+    rid, flags, qdcount, ancount, nscount, _ = struct.unpack_from('>HHHHHH', data)
+    if rid != query_id:
+        raise ValueError("response id mismatch")
+    pos = 12
+    for _ in range(qdcount):
+        pos = skip_name(data, pos) + 4
+    records = []
+    for _ in range(ancount + nscount):
+        pos = skip_name(data, pos)
+        rtype, _, ttl, length = struct.unpack_from('>HHIH', data, pos)
+        pos += 10
+        records.append((rtype, ttl, data[pos:pos + length]))
+        pos += length
+    answers = records[:ancount]
+    negative_ttl = NEGATIVE_TTL
+    for rtype, ttl, rdata in records[ancount:]:
+        if rtype == TYPE_SOA and len(rdata) >= 4:
+            # Negative answers live for min(SOA TTL, SOA minimum), RFC 2308
+            negative_ttl = min(ttl, struct.unpack('>I', rdata[-4:])[0])
+    return flags & 0xf, bool(flags & 0x0200), answers, negative_ttl
+
+def txt_strings(rdata):
+    """Character strings of a TXT record joined together, as SPF and DKIM expect"""
+    parts, pos = [], 0
+    while pos < len(rdata):
+        length = rdata[pos]
+        parts.append(rdata[pos + 1:pos + 1 + length])
+        pos += 1 + length
+    return b''.join(parts).decode('utf-8', 'replace')
+
+# --------------- Resolver ---------------------------------------
+
+class UDPQuery(asyncio.DatagramProtocol):
+    def __init__(self, future):
+        self.future = future
+
+    def datagram_received(self, data, addr):
+        if not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+class Resolver:
+    """Raw DNS client with a TTL cache shared by every lookup"""
+    def __init__(self, server, port, timeout, retries, concurrency):
+        self.server = server
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.limit = asyncio.Semaphore(concurrency)
+        self.cache = {}
+        self.inflight = {}
+        self.stats = {'queries': 0, 'cache_hits': 0, 'tcp': 0}
+
+    async def query_udp(self, packet):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: UDPQuery(future), remote_addr=(self.server, self.port))
+        try:
+            transport.sendto(packet)
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            transport.close()
+
+    async def query_tcp(self, packet):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.server, self.port), self.timeout)
+        try:
+            writer.write(struct.pack('>H', len(packet)) + packet)
+            length = struct.unpack('>H', await asyncio.wait_for(reader.readexactly(2), self.timeout))[0]
+            return await asyncio.wait_for(reader.readexactly(length), self.timeout)
+        finally:
+            writer.close()
+
+    async def exchange(self, name, qtype):
+        encode_name(name)  # a bad name fails at once, it is not worth retrying
+        for attempt in range(self.retries + 1):
+            query_id = random.getrandbits(16)
+            try:
+                packet = build_query(query_id, name, qtype)
+                async with self.limit:
+                    self.stats['queries'] += 1
+                    result = parse_response(await self.query_udp(packet), query_id)
+                    if result[1]:
+                        self.stats['tcp'] += 1
+                        result = parse_response(await self.query_tcp(packet), query_id)
+                return result
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError, struct.error):
+                if attempt == self.retries:
+                    raise DNSError(f"no answer for {name} from {self.server}")
+
+    async def lookup(self, name, qtype):
+        """Return (rcode, [rdata]) for name, from the cache while the TTL lasts"""
+        key = (name.lower().rstrip('.'), qtype)
+        cached = self.cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self.stats['cache_hits'] += 1
+            return cached[1], cached[2]
+        # Concurrent lookups of the same name share one query
+        if key in self.inflight:
+            self.stats['cache_hits'] += 1
+            return await asyncio.shield(self.inflight[key])
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            rcode, _, answers, negative_ttl = await self.exchange(name, qtype)
+            records = [rdata for rtype, _, rdata in answers if rtype == qtype]
+            ttl = min((ttl for rtype, ttl, _ in answers if rtype == qtype), default=negative_ttl)
+            self.cache[key] = (time.monotonic() + ttl, rcode, records)
+            future.set_result((rcode, records))
+            return rcode, records
+        except DNSError as e:
+            future.set_exception(e)
+            future.exception()  # the waiters re-raise it, do not log it as unretrieved
+            raise
+        finally:
+            if not future.done():
+                # Cancelled or failed unexpectedly, the waiters must not hang on it
+                future.set_exception(DNSError(f"lookup of {name} aborted"))
+                future.exception()
+            del self.inflight[key]
+
+    async def txt(self, name):
+        rcode, records = await self.lookup(name, TYPE_TXT)
+        if rcode not in (0, RCODE_NXDOMAIN):
+            raise DNSError(f"{name}: rcode {rcode}")
+        return [txt_strings(rdata) for rdata in records]
+
+def default_resolver():
+    try:
+        with open('/etc/resolv.conf') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == 'nameserver':
+                    return parts[1]
+    except OSError:
+        pass
+    return '8.8.8.8'
+
+# --------------- Checks -----------------------------------------
+
+async def check_spf(resolver, domain, chain=()):
+    """SPF record of domain with its include:/redirect= targets expanded"""
+    node = {'domain': domain, 'record': None, 'lookups': 0, 'void_lookups': 0, 'includes': [], 'errors': []}
+    try:
+        records = [r for r in await resolver.txt(domain) if r.lower().startswith('v=spf1')]
+    except DNSError as e:
+        node['errors'].append(str(e))
+        return node
+    if not records:
+        node['void_lookups'] = 1
+        return node
+    if len(records) > 1:
+        node['errors'].append(f"{domain}: {len(records)} SPF records, only one is allowed")
+    node['record'] = records[0]
+
+    targets = []
+    for term in records[0].split()[1:]:
+        mechanism = term.lstrip('+-~?').lower()
+        name = mechanism.split(':', 1)[0].split('=', 1)[0].split('/', 1)[0]
+        if name in ('a', 'mx', 'ptr', 'exists'):
+            node['lookups'] += 1
+        elif name in ('include', 'redirect'):
+            node['lookups'] += 1
+            target = term.split(':' if name == 'include' else '=', 1)[-1]
+            if '%' in target:
+                node['errors'].append(f"{domain}: macro in {term} not expanded")
+            elif target.lower() in chain + (domain.lower(),):
+                node['errors'].append(f"{domain}: include loop via {target}")
+            else:
+                targets.append(target)
+
+    children = await asyncio.gather(*(check_spf(resolver, target, chain + (domain.lower(),)) for target in targets))
+    for child in children:
+        node['includes'].append(child)
+        node['lookups'] += child['lookups']
+        node['void_lookups'] += child['void_lookups']
+        node['errors'] += child['errors']
+        if child['record'] is None and not child['errors']:
+            node['errors'].append(f"{domain}: {child['domain']} has no SPF record")
+    return node
+
+def parse_tags(record):
+    tags = {}
+    for part in record.split(';'):
+        key, sep, value = part.strip().partition('=')
+        if sep:
+            tags[key.strip().lower()] = value.strip()
+    return tags
+
+async def check_dmarc(resolver, domain):
+    try:
+        records = [r for r in await resolver.txt(f"_dmarc.{domain}") if r.startswith('v=DMARC1')]
+    except DNSError as e:
+        return {'record': None, 'error': str(e)}
+    if not records:
+        return {'record': None}
+    tags = parse_tags(records[0])
+    return {'record': records[0], 'policy': tags.get('p'), 'subdomain_policy': tags.get('sp'),
+            'rua': tags.get('rua'), 'pct': tags.get('pct', '100')}
+
+async def check_dkim(resolver, domain, selector):
+    try:
+        records = await resolver.txt(f"{selector}._domainkey.{domain}")
+    except DNSError as e:
+        return {'selector': selector, 'record': None, 'error': str(e)}
+    record = next((r for r in records if 'p=' in r), None)
+    result = {'selector': selector, 'record': record}
+    if record is not None:
+        # An empty p= means the key was revoked
+        result['revoked'] = parse_tags(record).get('p', '') == ''
+    return result
+
+async def check_domain(resolver, domain, selectors):
+    spf, dmarc, dkim = await asyncio.gather(
+        check_spf(resolver, domain),
+        check_dmarc(resolver, domain),
+        asyncio.gather(*(check_dkim(resolver, domain, selector) for selector in selectors)))
+    if spf['lookups'] > SPF_LOOKUP_LIMIT:
+        spf['errors'].append(f"{spf['lookups']} DNS lookups, the limit is {SPF_LOOKUP_LIMIT}")
+    if spf['void_lookups'] > SPF_VOID_LIMIT:
+        spf['errors'].append(f"{spf['void_lookups']} void lookups, the limit is {SPF_VOID_LIMIT}")
+    spf['valid'] = spf['record'] is not None and not spf['errors']
+    return {'domain': domain, 'spf': spf, 'dmarc': dmarc, 'dkim': list(dkim)}
+
+# --------------- Main -------------------------------------------
+
+def read_domains(path, selectors):
+    with open(path) as f:
+        for line in f:
+            parts = line.split('#', 1)[0].split()
+            if parts:
+                yield parts[0], parts[1:] or selectors
+
+async def run(args):
+    resolver = Resolver(args.server, args.port, args.timeout, args.retries, args.queries)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    domains_limit = asyncio.Semaphore(args.concurrency)
+    started = time.monotonic()
+    count = 0
+
+    async def one(domain, selectors):
+        async with domains_limit:
+            return await check_domain(resolver, domain, selectors)
+
+    try:
+        tasks = [asyncio.ensure_future(one(domain, selectors))
+                 for domain, selectors in read_domains(args.input_file, args.selector)]
+        for task in asyncio.as_completed(tasks):
+            output.write(json.dumps(await task) + "\n")
+            count += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    stats = resolver.stats
+    print(f"{count} domains in {time.monotonic() - started:.1f}s: {stats['queries']} queries "
+          f"({stats['tcp']} over TCP), {stats['cache_hits']} answered from cache", file=sys.stderr)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Audit SPF, DMARC and DKIM records of many domains")
+    parser.add_argument('input_file', help="one domain per line, optionally followed by DKIM selectors")
+    parser.add_argument('--selector', action='append', default=[],
+                        help="DKIM selector checked for domains that list none (repeatable)")
+    parser.add_argument('--resolver', default=default_resolver(),
+                        help="DNS server as IP or IP:PORT (default: first nameserver in /etc/resolv.conf)")
+    parser.add_argument('--concurrency', type=int, default=100, help="domains checked at once (default: 100)")
+    parser.add_argument('--queries', type=int, default=200, help="DNS queries in flight (default: 200)")
+    parser.add_argument('--timeout', type=float, default=2.0, help="seconds per DNS query (default: 2)")
+    parser.add_argument('--retries', type=int, default=2, help="retries per DNS query (default: 2)")
+    parser.add_argument('--output', help="write JSON lines to this file instead of stdout")
+    args = parser.parse_args()
+    if not os.path.isfile(args.input_file):
+        parser.error(f"file '{args.input_file}' not found")
+    server, sep, port = args.resolver.rpartition(':')
+    if sep and '.' in server:
+        args.server, args.port = server, int(port)
+    else:
+        args.server, args.port = args.resolver, 53
+    return args
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(run(parse_args()))
+    except KeyboardInterrupt:
+        sys.exit(130)
+    except BrokenPipeError:
+        sys.exit(0)
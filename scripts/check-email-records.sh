@@ -1,6 +1,8 @@
 #!/usr/bin/env bash
 # check_mail_dns.sh
 # Usage: ./check_mail_dns.sh <domain> [selector]
+#        ./check_mail_dns.sh <domains.txt> [check-email-records.py options]
+# A domains file is audited in bulk by check-email-records.py (JSON lines output).
 
 domain=$1
 selector=$2
@@ -12,10 +14,14 @@ YELLOW="\e[33m"
 RESET="\e[0m"
 
 if [ -z "$domain" ]; then
-  echo -e "${YELLOW}Usage:${RESET} $0 <domain> [selector]"
+  echo -e "${YELLOW}Usage:${RESET} $0 <domain|domains.txt> [selector]"
   exit 1
 fi
 
+if [ -f "$domain" ]; then
+  exec python3 "$(dirname "$0")/check-email-records.py" "$@"
+fi
+
 echo -e "=== Checking DNS records for: ${YELLOW}$domain${RESET} ==="
 echo
 
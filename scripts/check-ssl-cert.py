@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+import sys
+import os
+import ssl
+import json
+import time
+import socket
+import hashlib
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Usage:
+#   python check-ssl-cert.py <domain_list_file> [--json results.jsonl] [--concurrency 200]
+# Examples:
+#   python check-ssl-cert.py domains.txt                  # coloured text, like check-ssl-cert.sh
+#   python check-ssl-cert.py domains.txt --json -         # JSON lines on stdout
+#   python check-ssl-cert.py domains.txt --max-age 0      # ignore the cache, check every host
+#
+# Up to --concurrency TLS handshakes run at once. Name resolution and the
+# connection with its handshake are each limited to --timeout seconds. The
+# resolver has one thread per handshake, so lookups never queue. The peer
+# certificate is parsed in-process (common name, SANs, notAfter and issuer).
+# The certificate chain is not verified, so expired certificates are still
+# reported.
+#
+# Results are cached in ~/.cache/check-ssl-cert.json. A domain checked
+# within --max-age hours is not contacted again. When a recheck returns a
+# certificate with the same SHA-256 fingerprint, the cached fields are reused.
+# Expiry status is always computed against the current time. Domains not
+# checked for CACHE_RETENTION days, e.g. ones removed from the list, are
+# dropped from the cache.
+
+RED = '\033[0;31m'
+GREEN = '\033[0;32m'
+NC = '\033[0m'
+
+DEFAULT_CACHE = os.path.expanduser("~/.cache/check-ssl-cert.json")
+CACHE_RETENTION = 30  # days
+
+# --------------- Certificate parsing (DER) ----------------------
+
+OID_NAMES = {
+    bytes([0x55, 0x04, 0x03]): 'CN',
+    bytes([0x55, 0x04, 0x06]): 'C',
+    bytes([0x55, 0x04, 0x0a]): 'O',
+    bytes([0x55, 0x04, 0x0b]): 'OU',
+}
+OID_SUBJECT_ALT_NAME = bytes([0x55, 0x1d, 0x11])
+
+def der_item(data, pos):
+    """Return (tag, content start, content end) of the DER item at pos"""
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        count = length & 0x7f
+        length = int.from_bytes(data[pos:pos + count], 'big')
+        pos += count
+    return tag, pos, pos + length
+
+def der_children(data, start, end):
+    while start < end:
+        tag, content, next_pos = der_item(data, start)
+        yield tag, content, next_pos
+        start = next_pos
+
+def der_string(tag, value):
+    if tag == 0x1e:  # BMPString
+        return value.decode('utf-16-be', 'replace')
+    try:
+        return value.decode('utf-8')
+    except UnicodeDecodeError:
+        return value.decode('latin-1')
+
+def der_time(tag, value):
+    text = value.decode('ascii').rstrip('Z')
+    if tag == 0x17:  # UTCTime, two-digit year
+        year = int(text[:2])
+        text = str(1900 + year if year >= 50 else 2000 + year) + text[2:]
+    return datetime.strptime(text[:14], '%Y%m%d%H%M%S').replace(tzinfo=timezone.utc)
+
+def parse_name(data, start, end):
+    """X.501 Name as a list of (short name, value)"""
+    attributes = []
+    for _, set_start, set_end in der_children(data, start, end):
+        for _, seq_start, seq_end in der_children(data, set_start, set_end):
+            (_, oid_start, oid_end), (value_tag, value_start, value_end) = list(der_children(data, seq_start, seq_end))[:2]
+            name = OID_NAMES.get(data[oid_start:oid_end])
+            if name:
+                attributes.append((name, der_string(value_tag, data[value_start:value_end])))
+    return attributes
+
+def parse_certificate(der):
+    """Common name, SANs, notAfter and issuer of a DER certificate"""
+    _, cert_start, cert_end = der_item(der, 0)
+    _, tbs_start, tbs_end = der_item(der, cert_start)
+    fields = list(der_children(der, tbs_start, tbs_end))
+    if fields[0][0] == 0xa0:  # explicit version
+        fields = fields[1:]
+    # serial, signature algorithm, issuer, validity, subject, public key, extensions...
+    issuer = parse_name(der, fields[2][1], fields[2][2])
+    validity = list(der_children(der, fields[3][1], fields[3][2]))
+    subject = parse_name(der, fields[4][1], fields[4][2])
+
+    sans = []
+    for tag, start, end in fields[6:]:
+        if tag != 0xa3:
+            continue
+        _, ext_start, ext_end = der_item(der, start)
+        for _, seq_start, seq_end in der_children(der, ext_start, ext_end):
+            parts = list(der_children(der, seq_start, seq_end))
+            if der[parts[0][1]:parts[0][2]] != OID_SUBJECT_ALT_NAME:
+                continue
+            _, value_start, value_end = parts[-1]
+            _, names_start, names_end = der_item(der, value_start)
+            for name_tag, name_start, name_end in der_children(der, names_start, names_end):
+                if name_tag == 0x82:  # dNSName
+                    sans.append(der[name_start:name_end].decode('ascii', 'replace'))
+                elif name_tag == 0x87 and name_end - name_start == 4:  # iPAddress (IPv4)
+                    sans.append('.'.join(str(b) for b in der[name_start:name_end]))
+
+    not_after_tag, not_after_start, not_after_end = validity[1]
+    return {
+        'common_name': next((value for name, value in subject if name == 'CN'), ''),
+        'sans': sans,
+        'not_after': der_time(not_after_tag, der[not_after_start:not_after_end]).isoformat(),
+        'issuer': ', '.join(f"{name}={value}" for name, value in issuer),
+    }
+
+# --------------- Checking ---------------------------------------
+
+def load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def prune_cache(cache, max_age):
+    """Drop entries older than CACHE_RETENTION days and than max_age hours"""
+    oldest = time.time() - max(CACHE_RETENTION * 86400, max_age * 3600)
+    for domain in [d for d, entry in cache.items() if entry.get('checked', 0) < oldest]:
+        del cache[domain]
+
+def save_cache(path, cache):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(cache, f)
+    os.replace(path + '.tmp', path)
+
+def read_domains(path):
+    with open(path) as f:
+        for line in f:
+            domain = line.strip()
+            if domain and not domain.startswith('#'):
+                yield domain
+
+async def fetch_certificate(domain, port, timeout, context):
+    """DER certificate presented by domain:port"""
+    loop = asyncio.get_running_loop()
+    infos = await asyncio.wait_for(loop.getaddrinfo(domain, port, type=socket.SOCK_STREAM), timeout)
+
+    async def connect():
+        # Addresses in resolver order, like open_connection does with a host name
+        error = OSError(f"no address for {domain}")
+        for *_, sockaddr in infos:
+            try:
+                return await asyncio.open_connection(sockaddr[0], sockaddr[1], ssl=context, server_hostname=domain)
+            except ssl.SSLError:
+                raise
+            except OSError as e:
+                error = e
+        raise error
+
+    _, writer = await asyncio.wait_for(connect(), timeout)
+    try:
+        return writer.get_extra_info('ssl_object').getpeercert(binary_form=True)
+    finally:
+        writer.close()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), timeout)
+        except (OSError, asyncio.TimeoutError, ssl.SSLError):
+            pass  # the certificate is already read
+
+async def check_domain(domain, args, context, cache):
+    entry = cache.get(domain)
+    if entry and time.time() - entry['checked'] < args.max_age * 3600:
+        return dict(entry, cached=True)
+
+    result = {'domain': domain, 'checked': int(time.time())}
+    try:
+        der = await fetch_certificate(domain, args.port, args.timeout, context)
+        if not der:
+            raise ssl.SSLError("no certificate presented")
+        fingerprint = hashlib.sha256(der).hexdigest()
+        if entry and entry.get('fingerprint') == fingerprint:
+            fields = {key: entry[key] for key in ('common_name', 'sans', 'not_after', 'issuer')}
+        else:
+            fields = parse_certificate(der)
+        result.update(fields, fingerprint=fingerprint)
+    except (OSError, asyncio.TimeoutError, ssl.SSLError, ValueError, IndexError) as e:
+        # Failures are not cached, the next run tries the host again
+        result['error'] = str(e) or type(e).__name__
+        return dict(result, cached=False)
+    cache[domain] = result
+    return dict(result, cached=False)
+
+def add_status(result):
+    if 'error' in result:
+        result['status'] = 'error'
+    elif datetime.fromisoformat(result['not_after']) < datetime.now(timezone.utc):
+        result['status'] = 'expired'
+    else:
+        result['status'] = 'valid'
+    return result
+
+def format_text(result, color):
+    red, green, nc = (RED, GREEN, NC) if color else ('', '', '')
+    domain = result['domain']
+    if result['status'] == 'error':
+        return f"{red}{domain} --> Certificate not found{nc}"
+    # Same date format as `openssl x509 -enddate`
+    end = datetime.fromisoformat(result['not_after'])
+    expires = f"{end:%b} {end.day:2d} {end:%H:%M:%S %Y} GMT"
+    if result['status'] == 'expired':
+        return f"{red}{domain} --> Certificate found: {{CommonName: {result['common_name']}, Expires: {expires}, Status: EXPIRED}}{nc}"
+    return f"{green}{domain} --> Certificate found: {{CommonName: {result['common_name']}, Expires: {expires}}}{nc}"
+
+async def run_checks(args):
+    context = ssl.create_default_context()
+    # Expired and self-signed certificates must still be read
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+
+    # getaddrinfo runs on the default executor, sized so no lookup waits for a thread
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.concurrency))
+
+    cache = load_cache(args.cache)
+    json_out = None
+    if args.json == '-':
+        json_out = sys.stdout
+    elif args.json:
+        json_out = open(args.json, 'w')
+    show_text = args.json != '-'
+    color = sys.stdout.isatty() and not args.no_color
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def check(domain):
+        async with semaphore:
+            return await check_domain(domain, args, context, cache)
+
+    try:
+        tasks = [asyncio.ensure_future(check(domain)) for domain in read_domains(args.input_file)]
+        for task in asyncio.as_completed(tasks):
+            result = add_status(await task)
+            if show_text:
+                print(format_text(result, color), flush=True)
+            if json_out:
+                json_out.write(json.dumps(result) + "\n")
+    finally:
+        if json_out and json_out is not sys.stdout:
+            json_out.close()
+        prune_cache(cache, args.max_age)
+        save_cache(args.cache, cache)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check the TLS certificates of a list of domains")
+    parser.add_argument('input_file', help="file with one domain per line, # for comments")
+    parser.add_argument('--port', type=int, default=443, help="TLS port (default: 443)")
+    parser.add_argument('--concurrency', type=int, default=200,
+                        help="handshakes in flight at once (default: 200)")
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help="seconds allowed per host (default: 5)")
+    parser.add_argument('--json', metavar='FILE',
+                        help="write results as JSON lines to FILE, - for stdout instead of text")
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help=f"result cache (default: {DEFAULT_CACHE})")
+    parser.add_argument('--max-age', type=float, default=12,
+                        help="hours before a cached domain is checked again (default: 12)")
+    parser.add_argument('--no-color', action='store_true', help="plain text output")
+    args = parser.parse_args()
+    if not os.path.isfile(args.input_file):
+        print(f"Error: file '{args.input_file}' not found.")
+        sys.exit(1)
+    return args
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(run_checks(parse_args()))
+    except KeyboardInterrupt:
+        sys.exit(130)
+    except BrokenPipeError:
+        sys.exit(0)
@@ -1,14 +1,10 @@
 #!/usr/bin/env bash
 
-# Usage: ./check_ssl.sh domains.txt
+# Usage: ./check_ssl.sh domains.txt [check-ssl-cert.py options]
+# The domains are checked concurrently by check-ssl-cert.py, see its --help.
 
 input_file="$1"
 
-# ANSI colors
-RED='\033[0;31m'
-GREEN='\033[0;32m'
-NC='\033[0m' # No Color
-
 if [ -z "$input_file" ]; then
     echo "Usage: $0 <domain_list_file>"
     exit 1
@@ -19,29 +15,4 @@ if [ ! -f "$input_file" ]; then
     exit 1
 fi
 
-while read -r domain; do
-    [[ -z "$domain" || "$domain" =~ ^# ]] && continue
-
-    cert_data=$(timeout 5 openssl s_client -connect "${domain}:443" -servername "$domain" </dev/null 2>/dev/null | openssl x509 -noout -subject -enddate 2>/dev/null)
-
-    if [ $? -ne 0 ] || [ -z "$cert_data" ]; then
-        echo -e "${RED}${domain} --> Certificate not found${NC}"
-        continue
-    fi
-
-    cn=$(echo "$cert_data" | sed -n 's/.*CN=\(.*\)/\1/p')
-    end_date=$(echo "$cert_data" | grep 'notAfter=' | cut -d'=' -f2-)
-    end_epoch=$(date -d "$end_date" +%s 2>/dev/null)
-    now_epoch=$(date +%s)
-
-    if [ -z "$end_epoch" ]; then
-        echo -e "${RED}${domain} --> Could not parse certificate date${NC}"
-        continue
-    fi
-
-    if [ "$end_epoch" -lt "$now_epoch" ]; then
-        echo -e "${RED}${domain} --> Certificate found: {CommonName: $cn, Expires: $end_date, Status: EXPIRED}${NC}"
-    else
-        echo -e "${GREEN}${domain} --> Certificate found: {CommonName: $cn, Expires: $end_date}${NC}"
-    fi
-done < "$input_file"
+exec python3 "$(dirname "$0")/check-ssl-cert.py" "$@"
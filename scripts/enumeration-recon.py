@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+import sys
+import os
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import argparse
+
+# Usage:
+#   python enumeration-recon.py <domain|domains.txt> [--jobs 4] [--limit nmap=1] [--tool nmap=/path/to/nmap]
+# Examples:
+#   python enumeration-recon.py example.com
+#   python enumeration-recon.py domains.txt --jobs 8 --limit httprobe=8
+#   python enumeration-recon.py domains.txt --tool assetfinder=./stubs/assetfinder --refresh
+#   python enumeration-recon.py example.com --max-age 168   # reuse results up to a week old
+#
+# Runs the same stages as enumeration-recon.sh (assetfinder, httprobe, subjack,
+# nmap, waybackurls, wayback-classify.py) and writes the same <domain>/recon/ tree,
+# but for several domains at once:
+#   * --jobs domains are processed concurrently, and every tool has its own limit
+#     of processes running across all domains (--limit TOOL=N).
+#   * httprobe and waybackurls are fed while assetfinder is still running.
+#     subjack starts when the subdomain list is complete, nmap when the alive list is.
+#   * Every stage's output files are stored under their SHA-256 in
+#     <domain>/recon/.cache/, keyed by the hash of the stage's input. A re-run with
+#     the same input restores the outputs and skips the tool. Subdomains, alive hosts,
+#     ports and wayback data change over time, so results older than --max-age
+#     hours (default 24) are redone. --refresh ignores the cache.
+#   * --tool TOOL=PATH replaces an executable, e.g. with a local stub for testing.
+
+TOOL_NAMES = ('assetfinder', 'httprobe', 'subjack', 'nmap', 'waybackurls')
+DEFAULT_LIMITS = {'assetfinder': 8, 'httprobe': 4, 'subjack': 2, 'nmap': 2, 'waybackurls': 4}
+DEFAULT_MAX_AGE = 24  # hours a cached stage result is reused
+SUBJACK_FINGERPRINTS = os.path.expanduser("~/go/src/github.com/haccer/subjack/fingerprints.json")
+CLASSIFIER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wayback-classify.py")
+
+# --------------- Stage cache ------------------------------------
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    except OSError:
+        return 'missing'
+    return digest.hexdigest()
+
+class StageCache:
+    """Stage outputs stored by content hash, found through the hash of the stage input"""
+    def __init__(self, recon_dir, refresh, max_age=DEFAULT_MAX_AGE):
+        self.recon_dir = recon_dir
+        self.path = os.path.join(recon_dir, '.cache')
+        self.refresh = refresh
+        self.max_age = max_age * 3600
+
+    def key(self, stage, *parts):
+        digest = hashlib.sha256(stage.encode())
+        for part in parts:
+            digest.update(b'\0' + str(part).encode())
+        return digest.hexdigest()[:32]
+
+    def restore(self, stage, key):
+        """Put the cached outputs back in place, False if the stage has to run"""
+        if self.refresh:
+            return False
+        manifest_path = os.path.join(self.path, f"{stage}-{key}.json")
+        try:
+            # The same input gives other results later, e.g. new subdomains
+            if time.time() - os.path.getmtime(manifest_path) >= self.max_age:
+                return False
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        objects = {rel: os.path.join(self.path, 'objects', digest) for rel, digest in manifest.items()}
+        if not all(os.path.exists(obj) for obj in objects.values()):
+            return False
+        for rel, obj in objects.items():
+            target = os.path.join(self.recon_dir, rel)
+            if file_hash(target) != manifest[rel]:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(obj, target)
+        return True
+
+    def store(self, stage, key, outputs):
+        os.makedirs(os.path.join(self.path, 'objects'), exist_ok=True)
+        manifest = {}
+        for rel in outputs:
+            source = os.path.join(self.recon_dir, rel)
+            digest = file_hash(source)
+            if digest == 'missing':
+                continue
+            obj = os.path.join(self.path, 'objects', digest)
+            if not os.path.exists(obj):
+                shutil.copyfile(source, obj + '.tmp')
+                os.replace(obj + '.tmp', obj)
+            manifest[rel] = digest
+        with open(os.path.join(self.path, f"{stage}-{key}.json"), 'w') as f:
+            json.dump(manifest, f)
+
+# --------------- Pipeline ---------------------------------------
+
+class LineQueue:
+    """Lines handed from one stage to a running downstream stage, None marks the end"""
+    def __init__(self):
+        self.queue = asyncio.Queue()
+
+    def put(self, line):
+        self.queue.put_nowait(line)
+
+    def close(self):
+        self.queue.put_nowait(None)
+
+    @classmethod
+    def from_file(cls, path):
+        lines = cls()
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        lines.put(line.strip())
+        except OSError:
+            pass
+        lines.close()
+        return lines
+
+    async def __aiter__(self):
+        while (line := await self.queue.get()) is not None:
+            yield line
+
+class Recon:
+    def __init__(self, domain, tools, limits, refresh, max_age=DEFAULT_MAX_AGE):
+        self.domain = domain
+        self.tools = tools
+        self.limits = limits
+        self.recon = os.path.join(domain, 'recon')
+        self.cache = StageCache(self.recon, refresh, max_age)
+        for sub in ('scans', 'httprobe', 'potential_takeovers', 'wayback/params', 'wayback/extensions'):
+            os.makedirs(os.path.join(self.recon, sub), exist_ok=True)
+
+    def path(self, rel):
+        return os.path.join(self.recon, rel)
+
+    def log(self, message):
+        print(f"[{self.domain}] {message}", flush=True)
+
+    async def tool(self, name, args, stdin=None, on_line=None):
+        """Run a tool under its concurrency limit, feeding stdin lines and handing stdout lines to on_line"""
+        executable = shutil.which(self.tools[name])
+        if not executable:
+            self.log(f"[-] {name} not found, skipping")
+            return False
+        async with self.limits[name]:
+            process = await asyncio.create_subprocess_exec(
+                executable, *args,
+                stdin=asyncio.subprocess.PIPE if stdin else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE if on_line else asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL)
+
+            async def feed():
+                try:
+                    async for line in stdin:
+                        process.stdin.write(line.encode() + b'\n')
+                        await process.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    process.stdin.close()
+
+            async def read():
+                async for raw in process.stdout:
+                    line = raw.decode(errors='replace').strip()
+                    if line:
+                        on_line(line)
+
+            await asyncio.gather(feed() if stdin else asyncio.sleep(0), read() if on_line else asyncio.sleep(0))
+            returncode = await process.wait()
+        if returncode != 0:
+            self.log(f"[-] {name} exited with status {returncode}")
+        return returncode == 0
+
+    async def run(self):
+        self.log("==> Starting recon")
+        asset_key = self.cache.key('assetfinder', self.domain, self.tools['assetfinder'])
+        if self.cache.restore('assetfinder', asset_key):
+            self.log("[+] Subdomains from cache")
+            await asyncio.gather(
+                self.probe(LineQueue.from_file(self.path('final.txt')), streamed=False),
+                self.wayback(LineQueue.from_file(self.path('final.txt')), streamed=False),
+                self.takeovers())
+        else:
+            to_probe, to_wayback = LineQueue(), LineQueue()
+            await asyncio.gather(
+                self.harvest(asset_key, (to_probe, to_wayback)),
+                self.probe(to_probe, streamed=True),
+                self.wayback(to_wayback, streamed=True))
+        self.log("==> Done")
+
+    async def harvest(self, key, consumers):
+        self.log("[+] Harvesting subdomains with assetfinder...")
+        seen = set()
+        with open(self.path('final.txt'), 'w') as final:
+            def on_line(line):
+                if self.domain not in line or line in seen:
+                    return
+                seen.add(line)
+                final.write(line + '\n')
+                final.flush()
+                for consumer in consumers:
+                    consumer.put(line)
+            ok = await self.tool('assetfinder', [self.domain], on_line=on_line)
+        for consumer in consumers:
+            consumer.close()
+        if ok:
+            self.cache.store('assetfinder', key, ['final.txt'])
+        self.log(f"[+] {len(seen)} subdomains")
+        await self.takeovers()
+
+    async def probe(self, hosts, streamed):
+        final_hash = None if streamed else file_hash(self.path('final.txt'))
+        if final_hash and self.cache.restore('httprobe', self.cache.key('httprobe', final_hash)):
+            self.log("[+] Alive hosts from cache")
+        else:
+            self.log("[+] Probing for alive domains...")
+            alive = set()
+
+            def on_line(line):
+                host = line.split('://', 1)[-1]
+                alive.add(host[:-4] if host.endswith(':443') else host)
+
+            ok = await self.tool('httprobe', ['-s', '-p', 'https:443'], stdin=hosts, on_line=on_line)
+            with open(self.path('httprobe/alive.txt'), 'w') as f:
+                f.writelines(f"{host}\n" for host in sorted(alive))
+            if ok:
+                final_hash = file_hash(self.path('final.txt'))
+                self.cache.store('httprobe', self.cache.key('httprobe', final_hash), ['httprobe/alive.txt'])
+        await self.scan()
+
+    async def takeovers(self):
+        key = self.cache.key('subjack', file_hash(self.path('final.txt')))
+        output = 'potential_takeovers/potential_takeovers.txt'
+        if self.cache.restore('subjack', key):
+            self.log("[+] Takeover check from cache")
+            return
+        self.log("[+] Checking for possible subdomain takeover...")
+        open(self.path(output), 'a').close()
+        if await self.tool('subjack', ['-w', self.path('final.txt'), '-t', '100', '-timeout', '30', '-ssl',
+                                       '-c', SUBJACK_FINGERPRINTS, '-v', '3', '-o', self.path(output)]):
+            self.cache.store('subjack', key, [output])
+
+    async def scan(self):
+        alive = self.path('httprobe/alive.txt')
+        if not os.path.exists(alive) or os.path.getsize(alive) == 0:
+            self.log("    No alive hosts for nmap scan.")
+            return
+        key = self.cache.key('nmap', file_hash(self.path('httprobe/alive.txt')))
+        outputs = [f"scans/scanned.txt.{ext}" for ext in ('nmap', 'gnmap', 'xml')]
+        if self.cache.restore('nmap', key):
+            self.log("[+] Port scan from cache")
+            return
+        self.log("[+] Scanning for open ports...")
+        if await self.tool('nmap', ['-iL', self.path('httprobe/alive.txt'), '-T4', '-oA', self.path('scans/scanned.txt')]):
+            self.cache.store('nmap', key, outputs)
+
+    async def wayback(self, hosts, streamed):
+        final_hash = None if streamed else file_hash(self.path('final.txt'))
+        output = 'wayback/wayback_output.txt'
+        if final_hash and self.cache.restore('waybackurls', self.cache.key('waybackurls', final_hash)):
+            self.log("[+] Wayback data from cache")
+        else:
+            self.log("[+] Scraping wayback data...")
+            urls = set()
+            ok = await self.tool('waybackurls', [], stdin=hosts, on_line=urls.add)
+            with open(self.path(output), 'w') as f:
+                f.writelines(f"{url}\n" for url in sorted(urls))
+            if ok:
+                final_hash = file_hash(self.path('final.txt'))
+                self.cache.store('waybackurls', self.cache.key('waybackurls', final_hash), [output])
+        await self.classify()
+
+    async def classify(self):
+        key = self.cache.key('classify', file_hash(self.path('wayback/wayback_output.txt')))
+        if self.cache.restore('classify', key):
+            self.log("[+] Wayback params and files from cache")
+            return
+        self.log("[+] Pulling params and js/jsp/json/php/aspx/html files from wayback output...")
+        for name in os.listdir(self.path('wayback/extensions')):
+            os.remove(os.path.join(self.path('wayback/extensions'), name))
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, CLASSIFIER, '--quiet', self.path('wayback/wayback_output.txt'), self.path('wayback'))
+        if await process.wait() == 0:
+            outputs = ['wayback/params/wayback_params.txt', 'wayback/params/param_names.txt']
+            outputs += [f"wayback/extensions/{name}" for name in os.listdir(self.path('wayback/extensions'))]
+            self.cache.store('classify', key, outputs)
+
+# --------------- Main -------------------------------------------
+
+def read_targets(target):
+    if not os.path.isfile(target):
+        return [target]
+    with open(target) as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+async def run_all(domains, args):
+    limits = {name: asyncio.Semaphore(limit) for name, limit in args.limits.items()}
+    jobs = asyncio.Semaphore(args.jobs)
+
+    async def one(domain):
+        async with jobs:
+            try:
+                await Recon(domain, args.tools, limits, args.refresh, args.max_age).run()
+            except OSError as e:
+                print(f"[{domain}] [-] Recon failed: {e}", flush=True)
+
+    await asyncio.gather(*(one(domain) for domain in domains))
+
+def parse_pairs(pairs, known, convert):
+    result = {}
+    for pair in pairs:
+        name, sep, value = pair.partition('=')
+        if not sep or name not in known:
+            sys.exit(f"Expected TOOL=VALUE with TOOL one of {', '.join(known)}, got {pair}")
+        result[name] = convert(value)
+    return result
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Subdomain, port and wayback recon for one or many domains")
+    parser.add_argument('target', help="a domain, or a file with one domain per line ('#' for comments)")
+    parser.add_argument('--jobs', type=int, default=4, help="domains processed at once (default: 4)")
+    parser.add_argument('--limit', action='append', default=[], metavar='TOOL=N',
+                        help="processes of TOOL running at once across all domains")
+    parser.add_argument('--tool', action='append', default=[], metavar='TOOL=PATH',
+                        help="executable used for TOOL, e.g. a stub for testing")
+    parser.add_argument('--refresh', action='store_true', help="ignore cached stage results")
+    parser.add_argument('--max-age', type=float, default=DEFAULT_MAX_AGE,
+                        help=f"hours a cached stage result is reused (default: {DEFAULT_MAX_AGE})")
+    args = parser.parse_args()
+    args.limits = dict(DEFAULT_LIMITS, **parse_pairs(args.limit, TOOL_NAMES, int))
+    args.tools = dict({name: name for name in TOOL_NAMES}, **parse_pairs(args.tool, TOOL_NAMES, str))
+    return args
+
+if __name__ == '__main__':
+    args = parse_args()
+    domains = read_targets(args.target)
+    if os.path.isfile(args.target):
+        print(f"[*] Input is a file. {len(domains)} domains from {args.target}")
+    try:
+        asyncio.run(run_all(domains, args))
+    except KeyboardInterrupt:
+        sys.exit(130)
@@ -12,8 +12,11 @@
 # 7. Extracts parameters and file types (e.g., .js, .php, .json) from Wayback data for further analysis.
 # ------------------------------------------------------------------------------------------------------
 # Usage: ./enumeration-recon.sh <domain|domains.txt>
+# A domains file is handed to enumeration-recon.py, which processes the domains in parallel.
 set -u
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
 run_recon() {
     local url="$1"
 
@@ -78,44 +81,10 @@ run_recon() {
     cat "$url/recon/final.txt" | waybackurls >> "$url/recon/wayback/wayback_output.txt" || true
     sort -u "$url/recon/wayback/wayback_output.txt" -o "$url/recon/wayback/wayback_output.txt" || true
 
-    echo "[+] Pulling and compiling all possible params found in wayback data..."
-    grep -E '\?.+=' "$url/recon/wayback/wayback_output.txt" | cut -d '=' -f 1 | sort -u >> "$url/recon/wayback/params/wayback_params.txt" || true
-    if [ -f "$url/recon/wayback/params/wayback_params.txt" ]; then
-        while IFS= read -r line; do
-            printf '%s=\n' "$line"
-        done < "$url/recon/wayback/params/wayback_params.txt"
-    fi
-
-    echo "[+] Pulling and compiling js/php/aspx/jsp/json files from wayback output..."
-    # reset tmp files
+    echo "[+] Pulling params and js/jsp/json/php/aspx/html files from wayback output..."
+    # One streaming pass over the wayback output writes params/ and extensions/
     rm -f "$url/recon/wayback/extensions/"*.txt || true
-    while IFS= read -r line; do
-        ext="${line##*.}"
-        case "$ext" in
-            js)
-                echo "$line" >> "$url/recon/wayback/extensions/js1.txt"
-                sort -u "$url/recon/wayback/extensions/js1.txt" > "$url/recon/wayback/extensions/js.txt" || true
-                ;;
-            html)
-                echo "$line" >> "$url/recon/wayback/extensions/jsp1.txt"
-                sort -u "$url/recon/wayback/extensions/jsp1.txt" > "$url/recon/wayback/extensions/jsp.txt" || true
-                ;;
-            json)
-                echo "$line" >> "$url/recon/wayback/extensions/json1.txt"
-                sort -u "$url/recon/wayback/extensions/json1.txt" > "$url/recon/wayback/extensions/json.txt" || true
-                ;;
-            php)
-                echo "$line" >> "$url/recon/wayback/extensions/php1.txt"
-                sort -u "$url/recon/wayback/extensions/php1.txt" > "$url/recon/wayback/extensions/php.txt" || true
-                ;;
-            aspx)
-                echo "$line" >> "$url/recon/wayback/extensions/aspx1.txt"
-                sort -u "$url/recon/wayback/extensions/aspx1.txt" > "$url/recon/wayback/extensions/aspx.txt" || true
-                ;;
-        esac
-    done < "$url/recon/wayback/wayback_output.txt"
-
-    rm -f "$url/recon/wayback/extensions/js1.txt" "$url/recon/wayback/extensions/jsp1.txt" "$url/recon/wayback/extensions/json1.txt" "$url/recon/wayback/extensions/php1.txt" "$url/recon/wayback/extensions/aspx1.txt" || true
+    python3 "$SCRIPT_DIR/wayback-classify.py" "$url/recon/wayback/wayback_output.txt" "$url/recon/wayback" || true
 
     echo "==> Done for: $url"
     echo
@@ -136,17 +105,8 @@ fi
 input="$1"
 
 if [ -f "$input" ]; then
-    echo "[*] Input is a file. Iterating domains in $input"
-    # read file, ignore blank lines and comments (lines starting with #)
-    while IFS= read -r line || [ -n "$line" ]; do
-        # trim whitespace
-        dom="$(echo "$line" | sed -e 's/^[[:space:]]*//' -e 's/[[:space:]]*$//')"
-        # skip empty or comment lines
-        if [ -z "$dom" ] || [[ "$dom" == \#* ]]; then
-            continue
-        fi
-        run_recon "$dom"
-    done < "$input"
+    # Many domains: run them concurrently with per-stage caching, see enumeration-recon.py --help
+    exec python3 "$SCRIPT_DIR/enumeration-recon.py" "$input"
 else
     # treat as single domain
     run_recon "$input"
@@ -1,16 +1,67 @@
 import sys
 import subprocess
 import re
+import argparse
+import ipaddress
+import time
+import os
+import heapq
+import shutil
+import random
+import tempfile
+import socket
+import struct
+import errno
+import asyncio
+from array import array
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Usage:
-#   python script.py <target_network>
+#   python script.py <target_network> [--stream] [--stats-every 5s]
 # Examples:
 #   python script.py 192.168.1.0/24      # scan a whole subnet in CIDR-format
 #   python script.py 10.0.0.5/32         # scan a single IP (CIDR /32)
+#   python script.py 10.0.0.0/16 --stream
+#                                        # write hosts as they are found, show progress
+#   python script.py 10.0.0.0/12 --shard 20 --workers 8 --max-rate 5000
+#                                        # split into /20 blocks, 8 nmap processes at once
+#   python script.py 10.0.0.0/16 --incremental
+#                                        # rescan, report new / gone / unchanged hosts
+#   python script.py 10.0.0.0/16 --backend tcp --ports 22,80,443 --max-rate 2000
+#                                        # built-in TCP connect sweep, no nmap or root needed
 #
 # Output:
 #   <target_network>.txt                # list with IP-addresses (sorted numerical)
 #   nmap-output-<target_network>.txt    # raw data from nmap
+#
+# --stream reads nmap's XML output (-oX -) while the scan runs instead of
+# waiting for it to finish. Live hosts are appended to <target_network>.txt
+# as soon as nmap reports them, so an interrupted scan keeps what it found,
+# and nmap writes the raw output file itself (-oN). Memory use does not grow
+# with the size of the range.
+#
+# --shard PREFIX splits the target into /PREFIX blocks and scans them with a
+# pool of nmap processes (--workers). --max-rate is the packet rate for the
+# whole sweep and is divided between the workers. Finished blocks are kept in
+# .nmap-shards-<target_network>/ until the sweep completes. Running the same
+# command again after an interruption skips the blocks that already finished.
+# A block that fails is retried (--retries).
+#
+# --incremental keeps the liveness history of the target in
+# nmap-state-<target_network>/, using one bit per address, so a /8 needs a
+# few MB. Each run re-probes every host that was alive last time and fully
+# sweeps every /24 block not swept within --max-age hours. The rest of the
+# range is only sampled (--sample). A sampled hit marks its block for a full
+# sweep on the next run. Besides <target_network>.txt, the run writes
+# <target_network>-new.txt, -gone.txt and -unchanged.txt.
+#
+# --backend tcp replaces nmap with a built-in asyncio sweep that connects to
+# --ports on every address. Any answer, including a refused connection, means
+# the host is up. The connect timeout follows the round-trip time measured
+# per /24, like TCP's retransmission timer: never below 1s, doubled after a
+# timeout and at most --timeout. --max-rate caps connection attempts per
+# second. The output files have the same layout as with nmap.
 # --------------- NMAP performance adjustments -------------------
 # * -T4 = (Use timing for good balance between speed and accuracy)
 # * --min-parallelism 10 --max-parallelism 100 = (Increate number of parallel probes sent)
@@ -49,12 +100,717 @@ def run_nmap_scan(target_network):
     print(f"Live IP addresses saved to {live_ips_filename}")
     print(f"Raw Nmap output saved to {raw_output_filename}")
 
-if __name__ == "__main__":
-    # Check if the correct number of arguments is provided
-    if len(sys.argv) != 2:
-        print("Usage: python script.py <target_network>")
+# --------------- Streaming mode ---------------------------------
+
+def ip_sort_key(ip):
+    return list(map(int, ip.split('.')))
+
+def count_targets(target_network):
+    # Number of addresses in the target, None for hostnames and nmap ranges
+    try:
+        return ipaddress.ip_network(target_network, strict=False).num_addresses
+    except ValueError:
+        return None
+
+def stream_nmap_events(command):
+    """Run nmap with -oX - and yield ('host', ip) and ('progress', percent, remaining) as they arrive"""
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    root = None
+    depth = 0
+    try:
+        # nmap writes XML line by line, so feeding lines keeps up with the scan
+        for line in process.stdout:
+            parser.feed(line)
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    depth += 1
+                    if root is None:
+                        root = elem
+                    continue
+                depth -= 1
+                if depth != 1:
+                    continue
+                # A direct child of <nmaprun> is complete
+                if elem.tag == 'host':
+                    status = elem.find('status')
+                    if status is not None and status.get('state') == 'up':
+                        for address in elem.iter('address'):
+                            if address.get('addrtype') == 'ipv4':
+                                yield ('host', address.get('addr'))
+                elif elem.tag == 'taskprogress':
+                    yield ('progress', float(elem.get('percent', 0)), int(elem.get('remaining', 0)))
+                # Drop finished elements so the tree never grows
+                del root[:]
+    finally:
+        process.stdout.close()
+        process.wait()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+
+def format_eta(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+def show_progress(hosts_up, total, percent, remaining, started):
+    elapsed = time.monotonic() - started
+    text = f"[{percent:5.1f}%] {hosts_up} hosts up"
+    if total:
+        text += f" of {total} addresses"
+    text += f", elapsed {format_eta(elapsed)}"
+    if remaining:
+        text += f", ETA {format_eta(remaining)}"
+    if sys.stderr.isatty():
+        sys.stderr.write(f"\r{text}\033[K")
+    else:
+        sys.stderr.write(text + "\n")
+    sys.stderr.flush()
+
+def sort_ip_file(filename):
+    with open(filename) as file:
+        ips = [line.strip() for line in file if line.strip()]
+    ips.sort(key=ip_sort_key)
+    with open(filename, 'w') as file:
+        file.writelines(f"{ip}\n" for ip in ips)
+
+def run_nmap_stream(target_network, stats_every):
+    live_ips_filename = f"{target_network.replace('/', '-')}.txt"
+    raw_output_filename = f"nmap-output-{target_network.replace('/', '-')}.txt"
+    command = ["nmap", "-sn", "-T4", "-n", "--stats-every", stats_every,
+               "-oN", raw_output_filename, "-oX", "-", target_network]
+
+    total = count_targets(target_network)
+    started = time.monotonic()
+    hosts_up = 0
+    last_ip = None
+    in_order = True
+    percent, remaining = 0.0, 0
+
+    try:
+        # Line buffered: every confirmed host is on disk straight away
+        with open(live_ips_filename, 'w', buffering=1) as live_file:
+            for event in stream_nmap_events(command):
+                if event[0] == 'host':
+                    ip = event[1]
+                    live_file.write(f"{ip}\n")
+                    hosts_up += 1
+                    if last_ip is not None and ip_sort_key(ip) < ip_sort_key(last_ip):
+                        in_order = False
+                    last_ip = ip
+                    # Off a terminal, only print nmap's periodic updates
+                    if not sys.stderr.isatty():
+                        continue
+                else:
+                    _, percent, remaining = event
+                show_progress(hosts_up, total, percent, remaining, started)
+    except subprocess.CalledProcessError as e:
+        print(f"\nError running Nmap scan: nmap exited with status {e.returncode}")
+        return
+    except KeyboardInterrupt:
+        print(f"\nInterrupted, {hosts_up} live IP addresses so far saved to {live_ips_filename}")
+        return
+
+    if sys.stderr.isatty():
+        show_progress(hosts_up, total, 100.0, 0, started)
+        sys.stderr.write("\n")
+    # nmap reports hosts in address order, sort only if it did not
+    if not in_order:
+        sort_ip_file(live_ips_filename)
+
+    print(f"Live IP addresses saved to {live_ips_filename}")
+    print(f"Raw Nmap output saved to {raw_output_filename}")
+
+# --------------- Sharded mode -----------------------------------
+
+MERGE_FAN_IN = 64  # shard files open at once while merging
+
+def ip_to_int(line):
+    return int(ipaddress.IPv4Address(line.strip()))
+
+def shard_network(target_network, prefix):
+    network = ipaddress.ip_network(target_network, strict=False)
+    if prefix <= network.prefixlen:
+        return [network]
+    return list(network.subnets(new_prefix=prefix))
+
+def scan_shard(shard, shard_dir, max_rate, retries):
+    """Scan one block into <shard_dir>/<block>.txt, return the number of live hosts"""
+    name = str(shard).replace('/', '-')
+    live_file = os.path.join(shard_dir, f"{name}.txt")
+    raw_file = os.path.join(shard_dir, f"{name}.nmap")
+    command = ["nmap", "-sn", "-T4", "-n", "-oN", raw_file, "-oX", "-"]
+    if max_rate:
+        command += ["--max-rate", str(max_rate)]
+    command.append(str(shard))
+
+    for attempt in range(retries + 1):
+        try:
+            ips = [event[1] for event in stream_nmap_events(command) if event[0] == 'host']
+            break
+        except (subprocess.CalledProcessError, ET.ParseError):
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+
+    # One block is small enough to sort in memory. The rename marks it finished.
+    ips.sort(key=ip_sort_key)
+    with open(live_file + ".tmp", 'w') as file:
+        file.writelines(f"{ip}\n" for ip in ips)
+    os.replace(live_file + ".tmp", live_file)
+    return len(ips)
+
+def merge_shards(shards, shard_dir, live_ips_filename, raw_output_filename):
+    names = [str(shard).replace('/', '-') for shard in shards]
+
+    # k-way numeric merge of the sorted per-block lists. Blocks come from
+    # subnets() in address order, so consecutive groups never overlap and
+    # the merge can run MERGE_FAN_IN files at a time.
+    with open(live_ips_filename, 'w') as out:
+        for start in range(0, len(names), MERGE_FAN_IN):
+            files = [open(os.path.join(shard_dir, f"{name}.txt")) for name in names[start:start + MERGE_FAN_IN]]
+            try:
+                out.writelines(heapq.merge(*files, key=ip_to_int))
+            finally:
+                for file in files:
+                    file.close()
+
+    with open(raw_output_filename, 'w') as out:
+        out.write("Raw Nmap Output:\n")
+        for name in names:
+            try:
+                with open(os.path.join(shard_dir, f"{name}.nmap")) as file:
+                    shutil.copyfileobj(file, out)
+            except OSError:
+                continue
+
+def run_nmap_sharded(target_network, prefix, workers, max_rate, retries):
+    target_name = target_network.replace('/', '-')
+    live_ips_filename = f"{target_name}.txt"
+    raw_output_filename = f"nmap-output-{target_name}.txt"
+    shard_dir = f".nmap-shards-{target_name}"
+
+    try:
+        shards = shard_network(target_network, prefix)
+    except ValueError:
+        print(f"--shard needs a target in CIDR format, got {target_network}")
         sys.exit(1)
+    os.makedirs(shard_dir, exist_ok=True)
+
+    pending = [shard for shard in shards
+               if not os.path.exists(os.path.join(shard_dir, f"{str(shard).replace('/', '-')}.txt"))]
+    if len(pending) < len(shards):
+        print(f"Resuming: {len(shards) - len(pending)} of {len(shards)} blocks already scanned")
+
+    workers = max(1, min(workers, len(pending) or 1))
+    per_worker_rate = max(1, max_rate // workers) if max_rate else None
+    started = time.monotonic()
+    finished = hosts_up = 0
+    failed = []
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(scan_shard, shard, shard_dir, per_worker_rate, retries): shard
+                   for shard in pending}
+        for future in as_completed(futures):
+            finished += 1
+            try:
+                hosts_up += future.result()
+            except subprocess.CalledProcessError as e:
+                failed.append(futures[future])
+                print(f"\nBlock {futures[future]} failed: nmap exited with status {e.returncode}")
+            except ET.ParseError as e:
+                # No .txt is written for the block, so the next run scans it again
+                failed.append(futures[future])
+                print(f"\nBlock {futures[future]} failed: unreadable nmap XML output ({e})")
+            elapsed = time.monotonic() - started
+            remaining = elapsed / finished * (len(pending) - finished)
+            show_progress(hosts_up, None, 100.0 * finished / len(pending), remaining, started)
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        print(f"\nInterrupted, finished blocks are kept in {shard_dir}/. Run the same command to resume.")
+        return
+    executor.shutdown()
+    if sys.stderr.isatty():
+        sys.stderr.write("\n")
+
+    if failed:
+        print(f"{len(failed)} blocks failed after {retries} retries. Run the same command to retry them.")
+        return
+
+    merge_shards(shards, shard_dir, live_ips_filename, raw_output_filename)
+    shutil.rmtree(shard_dir)
+
+    print(f"Live IP addresses saved to {live_ips_filename}")
+    print(f"Raw Nmap output saved to {raw_output_filename}")
+
+# --------------- Incremental mode -------------------------------
+
+BLOCK_SIZE = 256  # addresses per sweep block (/24)
+
+def iter_bits(bits):
+    """Offsets of the set bits, in address order"""
+    for index, byte in enumerate(bits):
+        if byte:
+            for bit in range(8):
+                if byte & (0x80 >> bit):
+                    yield index * 8 + bit
+
+class LivenessStore:
+    """Liveness history of one network, kept in nmap-state-<target_network>/
+
+    live.bits   one bit per address, set if the host answered when last probed
+    blocks.bin  time of the last full sweep of every block (uint32 epoch)
+    seen.bin    (offset, first seen, last seen) of every host ever seen alive
+    """
+    def __init__(self, target_network):
+        self.network = ipaddress.ip_network(target_network, strict=False)
+        self.size = self.network.num_addresses
+        self.block_size = min(BLOCK_SIZE, self.size)
+        self.path = f"nmap-state-{target_network.replace('/', '-')}"
+        self.live = bytearray((self.size + 7) // 8)
+        self.blocks = array('I', [0]) * (self.size // self.block_size)
+        self.seen = array('I')
+        self.load()
+
+    def load(self):
+        try:
+            with open(os.path.join(self.path, 'live.bits'), 'rb') as f:
+                live = f.read()
+            with open(os.path.join(self.path, 'blocks.bin'), 'rb') as f:
+                blocks = array('I', f.read())
+            with open(os.path.join(self.path, 'seen.bin'), 'rb') as f:
+                seen = array('I', f.read())
+        except (OSError, ValueError):
+            return
+        # A store written for a different network size is ignored
+        if len(live) == len(self.live) and len(blocks) == len(self.blocks):
+            self.live[:] = live
+            self.blocks = blocks
+            self.seen = seen
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        for name, data in (('live.bits', self.live), ('blocks.bin', self.blocks), ('seen.bin', self.seen)):
+            filename = os.path.join(self.path, name)
+            with open(filename + '.tmp', 'wb') as f:
+                f.write(bytes(data))
+            os.replace(filename + '.tmp', filename)
 
-    # Get the target network from the command-line argument
-    target_network = sys.argv[1]
-    run_nmap_scan(target_network)
+    def is_live(self, offset):
+        return self.live[offset >> 3] & (0x80 >> (offset & 7))
+
+    def set_live(self, offset, alive):
+        if alive:
+            self.live[offset >> 3] |= 0x80 >> (offset & 7)
+        else:
+            self.live[offset >> 3] &= ~(0x80 >> (offset & 7)) & 0xff
+
+    def block_bits(self, block):
+        start = block * self.block_size
+        if self.block_size % 8 == 0:
+            return self.live[start >> 3:(start + self.block_size) >> 3]
+        # Networks smaller than a byte: the whole network is one block
+        return self.live
+
+    def clear_block(self, block):
+        start = block * self.block_size
+        if self.block_size % 8 == 0:
+            self.live[start >> 3:(start + self.block_size) >> 3] = bytes(self.block_size >> 3)
+        else:
+            for offset in range(start, start + self.block_size):
+                self.set_live(offset, False)
+
+    def address(self, offset):
+        return str(self.network.network_address + offset)
+
+    def offset(self, ip):
+        return int(ipaddress.IPv4Address(ip)) - int(self.network.network_address)
+
+    def update_seen(self, now):
+        """Merge the live hosts into the (offset, first, last) records"""
+        merged = array('I')
+        old = self.seen
+        i = 0
+        for offset in iter_bits(self.live):
+            while i < len(old) and old[i] < offset:
+                merged.extend(old[i:i + 3])
+                i += 3
+            if i < len(old) and old[i] == offset:
+                merged.extend((offset, old[i + 1], now))
+                i += 3
+            else:
+                merged.extend((offset, now, now))
+        merged.extend(old[i:])
+        self.seen = merged
+
+def plan_incremental(store, max_age, sample, now):
+    """Write the nmap target list, return (filename, probed offsets, swept blocks, target count)"""
+    swept = [block for block, last in enumerate(store.blocks) if now - last > max_age]
+    swept_set = set(swept)
+    probed = []
+    count = 0
+
+    fd, targets_filename = tempfile.mkstemp(prefix='targets-', suffix='.txt', dir=store.path)
+    with os.fdopen(fd, 'w') as targets:
+        prefix = 32 - (store.block_size.bit_length() - 1)
+        for block in swept:
+            targets.write(f"{store.address(block * store.block_size)}/{prefix}\n")
+            count += store.block_size
+        for block in range(len(store.blocks)):
+            if block in swept_set:
+                continue
+            start = block * store.block_size
+            # Every previously live host plus a random sample of the rest
+            chosen = [start + offset for offset in iter_bits(store.block_bits(block))]
+            if sample > 0:
+                picks = random.sample(range(start, start + store.block_size), max(1, round(store.block_size * sample)))
+                chosen += [offset for offset in picks if not store.is_live(offset)]
+            for offset in sorted(chosen):
+                targets.write(f"{store.address(offset)}\n")
+            probed.extend(chosen)
+            count += len(chosen)
+    return targets_filename, probed, swept, count
+
+def write_diff(store, previous, target_name):
+    """Write the current live list and the new / gone / unchanged lists, return their sizes"""
+    filenames = {
+        'live': f"{target_name}.txt",
+        'new': f"{target_name}-new.txt",
+        'gone': f"{target_name}-gone.txt",
+        'unchanged': f"{target_name}-unchanged.txt",
+    }
+    files = {kind: open(filename, 'w') for kind, filename in filenames.items()}
+    counts = dict.fromkeys(filenames, 0)
+    try:
+        for index, (before, after) in enumerate(zip(previous, store.live)):
+            if not before | after:
+                continue
+            for bit in range(8):
+                mask = 0x80 >> bit
+                was, now = before & mask, after & mask
+                if not was | now:
+                    continue
+                ip = store.address(index * 8 + bit)
+                kinds = ('live', 'unchanged') if was and now else ('live', 'new') if now else ('gone',)
+                for kind in kinds:
+                    files[kind].write(f"{ip}\n")
+                    counts[kind] += 1
+    finally:
+        for file in files.values():
+            file.close()
+    return filenames, counts
+
+def run_nmap_incremental(target_network, max_age_hours, sample, stats_every):
+    target_name = target_network.replace('/', '-')
+    raw_output_filename = f"nmap-output-{target_name}.txt"
+    try:
+        store = LivenessStore(target_network)
+    except ValueError:
+        print(f"--incremental needs a target in CIDR format, got {target_network}")
+        sys.exit(1)
+    os.makedirs(store.path, exist_ok=True)
+
+    now = int(time.time())
+    targets_filename, probed, swept, count = plan_incremental(store, max_age_hours * 3600, sample, now)
+    print(f"Probing {count} of {store.size} addresses: {len(swept)} blocks in full, "
+          f"{len(probed)} previously live or sampled hosts")
+
+    command = ["nmap", "-sn", "-T4", "-n", "--stats-every", stats_every,
+               "-oN", raw_output_filename, "-oX", "-", "-iL", targets_filename]
+    started = time.monotonic()
+    up = []
+    percent, remaining = 0.0, 0
+    try:
+        for event in stream_nmap_events(command):
+            if event[0] == 'host':
+                up.append(store.offset(event[1]))
+                if not sys.stderr.isatty():
+                    continue
+            else:
+                _, percent, remaining = event
+            show_progress(len(up), count, percent, remaining, started)
+    except subprocess.CalledProcessError as e:
+        print(f"\nError running Nmap scan: nmap exited with status {e.returncode}")
+        return
+    except KeyboardInterrupt:
+        print("\nInterrupted, the liveness store was not changed")
+        return
+    finally:
+        os.remove(targets_filename)
+    if sys.stderr.isatty():
+        sys.stderr.write("\n")
+
+    previous = bytes(store.live)
+    for block in swept:
+        store.clear_block(block)
+        store.blocks[block] = now
+    for offset in probed:
+        store.set_live(offset, False)
+    swept_set = set(swept)
+    for offset in up:
+        if 0 <= offset < store.size:
+            store.set_live(offset, True)
+            block = offset // store.block_size
+            # A sampled hit outside the known hosts: sweep its block next time
+            if block not in swept_set and not previous[offset >> 3] & (0x80 >> (offset & 7)):
+                store.blocks[block] = 0
+    store.update_seen(now)
+    store.save()
+
+    filenames, counts = write_diff(store, previous, target_name)
+    print(f"{counts['new']} new, {counts['gone']} gone, {counts['unchanged']} unchanged")
+    for kind in ('live', 'new', 'gone', 'unchanged'):
+        print(f"{kind.capitalize()} IP addresses saved to {filenames[kind]}")
+    print(f"Raw Nmap output saved to {raw_output_filename}")
+
+# --------------- TCP connect backend ----------------------------
+
+DEFAULT_TCP_PORTS = "80,443,22,445,3389"
+FD_RETRY_DELAY = 0.05  # seconds to wait for a file descriptor when the limit is hit
+FD_RETRIES = 40
+MIN_CONNECT_TIMEOUT = 1.0  # seconds, the RFC 6298 floor; a busy host can take this long to SYN-ACK
+RTT_PREFIX = 24  # addresses in one /24 share a round-trip estimate
+
+class RateLimiter:
+    """Spaces connection attempts evenly to stay under a rate (per second)"""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(self.next_slot, now)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class RttEstimator:
+    """Connect timeout from smoothed RTT and its variance, as in RFC 6298"""
+    __slots__ = ('srtt', 'rttvar', 'backoff', 'minimum', 'maximum')
+
+    def __init__(self, minimum, maximum):
+        self.srtt = None
+        self.rttvar = 0.0
+        self.backoff = 1
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def sample(self, rtt):
+        self.backoff = 1
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def expired(self, timeout):
+        # Probes of one host share a timeout, back off once for all of them
+        if timeout >= self.timeout() and self.timeout() < self.maximum:
+            self.backoff *= 2
+
+    def timeout(self):
+        base = self.minimum if self.srtt is None else self.srtt + 4 * self.rttvar
+        return min(self.maximum, max(self.minimum, base) * self.backoff)
+
+class RttTable:
+    """One RttEstimator per /24, a slow or lossy subnet does not set the pace elsewhere"""
+    def __init__(self, maximum):
+        self.minimum = min(MIN_CONNECT_TIMEOUT, maximum)
+        self.maximum = maximum
+        self.estimators = {}
+
+    def get(self, address):
+        prefix = int(address) >> (32 - RTT_PREFIX)
+        rtt = self.estimators.get(prefix)
+        if rtt is None:
+            rtt = self.estimators[prefix] = RttEstimator(self.minimum, self.maximum)
+        return rtt
+
+    def timeouts(self):
+        return [rtt.timeout() for rtt in self.estimators.values()] or [self.minimum]
+
+async def tcp_probe(ip, port, timeout, limiter, rtt):
+    """Return ('open' or 'refused', rtt) if the host answered on this port, else None"""
+    await limiter.wait()
+    loop = asyncio.get_running_loop()
+    sock = None
+    try:
+        # Out of descriptors (EMFILE/ENFILE): other probes free theirs within a
+        # timeout, so wait for one instead of failing the whole sweep
+        for attempt in range(FD_RETRIES + 1):
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                break
+            except OSError as e:
+                if e.errno not in (errno.EMFILE, errno.ENFILE) or attempt == FD_RETRIES:
+                    return None
+                await asyncio.sleep(FD_RETRY_DELAY)
+        sock.setblocking(False)
+        # Reset instead of FIN on close so thousands of probes leave no TIME_WAIT
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        started = time.monotonic()
+        await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), timeout)
+        result = 'open'
+    except ConnectionRefusedError:
+        result = 'refused'
+    except asyncio.TimeoutError:
+        rtt.expired(timeout)
+        return None
+    except OSError:
+        return None
+    finally:
+        if sock is not None:
+            sock.close()
+    elapsed = time.monotonic() - started
+    rtt.sample(elapsed)
+    return result, elapsed
+
+async def tcp_probe_host(ip, ports, limiter, rtt):
+    """Probe all ports at once, return (port, state, rtt) of the first answer or None"""
+    timeout = rtt.timeout()
+    tasks = {asyncio.ensure_future(tcp_probe(ip, port, timeout, limiter, rtt)): port for port in ports}
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                port = tasks.pop(task)
+                if task.result():
+                    return (port,) + task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+    return None
+
+async def tcp_sweep(network, ports, concurrency, max_rate, timeout, on_result):
+    limiter = RateLimiter(max_rate)
+    rtts = RttTable(timeout)
+    # A fixed set of workers pull addresses, so a /8 never becomes millions of tasks
+    addresses = iter(sweep_addresses(network))
+
+    async def worker():
+        for address in addresses:
+            on_result(address, await tcp_probe_host(str(address), ports, limiter, rtts.get(address)))
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency // len(ports)))))
+    return rtts
+
+def sweep_addresses(network):
+    # Like nmap, skip the network and broadcast addresses of real subnets
+    return network.hosts() if network.num_addresses > 2 else network
+
+def raise_open_files_limit():
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        return hard
+    except (ImportError, ValueError, OSError):
+        return None
+
+def run_tcp_scan(target_network, ports, concurrency, max_rate, timeout):
+    target_name = target_network.replace('/', '-')
+    live_ips_filename = f"{target_name}.txt"
+    raw_output_filename = f"nmap-output-{target_name}.txt"
+    try:
+        network = ipaddress.ip_network(target_network, strict=False)
+        ports = [int(port) for port in ports.split(',')]
+    except ValueError as e:
+        print(f"Invalid target or port list: {e}")
+        sys.exit(1)
+
+    limit = raise_open_files_limit()
+    if limit and concurrency > limit - 64:
+        concurrency = limit - 64
+    total = network.num_addresses - 2 if network.num_addresses > 2 else network.num_addresses
+    live = array('I')
+    progress = {'done': 0, 'shown': 0.0}
+    started = time.monotonic()
+
+    with open(raw_output_filename, 'w') as raw:
+        raw.write(f"Raw TCP connect scan output (ports {','.join(map(str, ports))}):\n")
+
+        def on_result(address, answer):
+            progress['done'] += 1
+            if answer:
+                port, state, seconds = answer
+                live.append(int(address))
+                raw.write(f"Nmap scan report for {address}\n"
+                          f"Host is up ({seconds:.4f}s latency, tcp/{port} {state}).\n")
+            now = time.monotonic()
+            if now - progress['shown'] >= (0.2 if sys.stderr.isatty() else 5.0):
+                progress['shown'] = now
+                rate = progress['done'] / max(now - started, 1e-6)
+                show_progress(len(live), total, 100.0 * progress['done'] / total,
+                              (total - progress['done']) / rate, started)
+
+        try:
+            rtts = asyncio.run(tcp_sweep(network, ports, concurrency, max_rate, timeout, on_result))
+        except KeyboardInterrupt:
+            print(f"\nInterrupted after {progress['done']} of {total} addresses")
+            return
+
+    elapsed = time.monotonic() - started
+    if sys.stderr.isatty():
+        sys.stderr.write("\n")
+    # Workers finish out of order, the list is sorted once at the end (4 bytes per live host)
+    live = sorted(live)
+    with open(live_ips_filename, 'w') as file:
+        file.writelines(f"{ipaddress.IPv4Address(ip)}\n" for ip in live)
+
+    timeouts = rtts.timeouts()
+    print(f"Probed {progress['done']} addresses in {elapsed:.1f}s "
+          f"({progress['done'] / max(elapsed, 1e-6):.0f}/s), {len(live)} up, "
+          f"connect timeout {min(timeouts) * 1000:.0f}-{max(timeouts) * 1000:.0f}ms "
+          f"over {len(timeouts)} /{RTT_PREFIX}")
+    print(f"Live IP addresses saved to {live_ips_filename}")
+    print(f"Raw scan output saved to {raw_output_filename}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Nmap ping sweep, saves live IP addresses and raw output")
+    parser.add_argument('target_network', help="target in CIDR format, e.g. 192.168.1.0/24")
+    parser.add_argument('--stream', action='store_true',
+                        help="parse nmap output while it runs: write hosts as found and show progress")
+    parser.add_argument('--stats-every', default='5s',
+                        help="progress interval passed to nmap in --stream mode (default: 5s)")
+    parser.add_argument('--shard', type=int, metavar='PREFIX',
+                        help="split the target into /PREFIX blocks scanned in parallel")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="nmap processes running at once with --shard (default: 4)")
+    parser.add_argument('--max-rate', type=int,
+                        help="packets per second for the whole sweep with --shard or --backend tcp")
+    parser.add_argument('--retries', type=int, default=2,
+                        help="times a failed block is retried with --shard (default: 2)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="rescan using the stored liveness history and report what changed")
+    parser.add_argument('--max-age', type=float, default=24,
+                        help="hours before a block is fully swept again with --incremental (default: 24)")
+    parser.add_argument('--sample', type=float, default=0.05,
+                        help="fraction of quiet addresses probed in fresh blocks with --incremental (default: 0.05)")
+    parser.add_argument('--backend', choices=('nmap', 'tcp'), default='nmap',
+                        help="nmap ping sweep, or built-in TCP connect sweep without root (default: nmap)")
+    parser.add_argument('--ports', default=DEFAULT_TCP_PORTS,
+                        help=f"ports tried on every host with --backend tcp (default: {DEFAULT_TCP_PORTS})")
+    parser.add_argument('--concurrency', type=int, default=1024,
+                        help="connection attempts in flight with --backend tcp (default: 1024)")
+    parser.add_argument('--timeout', type=float, default=2.0,
+                        help="longest connect timeout in seconds with --backend tcp (default: 2)")
+    args = parser.parse_args()
+    if args.backend == 'tcp' and (args.shard or args.incremental):
+        parser.error("--backend tcp runs its own parallel sweep, it cannot be combined with --shard or --incremental")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.backend == 'tcp':
+        run_tcp_scan(args.target_network, args.ports, args.concurrency, args.max_rate, args.timeout)
+    elif args.incremental:
+        run_nmap_incremental(args.target_network, args.max_age, args.sample, args.stats_every)
+    elif args.shard:
+        run_nmap_sharded(args.target_network, args.shard, args.workers, args.max_rate, args.retries)
+    elif args.stream:
+        run_nmap_stream(args.target_network, args.stats_every)
+    else:
+        run_nmap_scan(args.target_network)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+import sys
+import os
+import hashlib
+import argparse
+import posixpath
+from urllib.parse import urlsplit, parse_qsl
+
+# Usage:
+#   python wayback-classify.py <wayback_output.txt> <wayback_dir> [--quiet]
+# Example:
+#   python wayback-classify.py example.com/recon/wayback/wayback_output.txt example.com/recon/wayback
+#
+# Reads the waybackurls output once and writes, sorted and without duplicates:
+#   <wayback_dir>/params/wayback_params.txt    URL up to the first '=' of every URL with a query
+#   <wayback_dir>/params/param_names.txt       parameter names found in those queries
+#   <wayback_dir>/extensions/<ext>.txt         URLs whose path ends in .js .jsp .json .php .aspx .html
+#
+# Memory grows with the number of unique URLs and parameters, not with the size
+# of the input, so multi-million line dumps with many repeats are fine.
+
+EXTENSIONS = ('js', 'jsp', 'json', 'php', 'aspx', 'html')
+
+def classify(lines):
+    seen = set()
+    extensions = {ext: set() for ext in EXTENSIONS}
+    param_prefixes = set()
+    param_names = set()
+
+    for line in lines:
+        url = line.strip()
+        if not url:
+            continue
+        # 8-byte digests keep the duplicate filter small for long URLs
+        digest = hashlib.blake2b(url.encode('utf-8', 'surrogateescape'), digest_size=8).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            continue
+        ext = posixpath.splitext(parts.path)[1][1:].lower()
+        if ext in extensions:
+            extensions[ext].add(url)
+        if '=' in parts.query:
+            param_prefixes.add(url.split('=', 1)[0])
+            param_names.update(name for name, _ in parse_qsl(parts.query, keep_blank_values=True) if name)
+
+    return extensions, param_prefixes, param_names
+
+def write_sorted(filename, items):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename + '.tmp', 'w', errors='surrogateescape') as f:
+        f.writelines(f"{item}\n" for item in sorted(items))
+    os.replace(filename + '.tmp', filename)
+
+def main():
+    parser = argparse.ArgumentParser(description="Split wayback URLs into parameter and file type lists")
+    parser.add_argument('input_file', help="waybackurls output, one URL per line")
+    parser.add_argument('wayback_dir', help="directory receiving params/ and extensions/")
+    parser.add_argument('--quiet', action='store_true', help="do not print the parameter list")
+    args = parser.parse_args()
+
+    with open(args.input_file, errors='surrogateescape') as f:
+        extensions, param_prefixes, param_names = classify(f)
+
+    write_sorted(os.path.join(args.wayback_dir, 'params', 'wayback_params.txt'), param_prefixes)
+    write_sorted(os.path.join(args.wayback_dir, 'params', 'param_names.txt'), param_names)
+    for ext, urls in extensions.items():
+        if urls:
+            write_sorted(os.path.join(args.wayback_dir, 'extensions', f"{ext}.txt"), urls)
+
+    if not args.quiet:
+        for prefix in sorted(param_prefixes):
+            print(f"{prefix}=")
+    counts = ', '.join(f"{len(urls)} {ext}" for ext, urls in extensions.items() if urls)
+    print(f"    {len(param_prefixes)} parameterised URLs, {len(param_names)} parameter names, "
+          f"{counts or 'no matching files'}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
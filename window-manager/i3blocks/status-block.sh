@@ -0,0 +1,27 @@
+#!/bin/sh
+# Streams one status-daemon.py block to the bar, replacing per-interval scripts.
+# Usage: status-block.sh <block> [polybar]
+#   i3blocks: command=~/.config/i3blocks/status-block.sh cpu
+#             interval=persist
+#             format=json
+#   polybar:  exec = ~/.config/i3blocks/status-block.sh cpu polybar
+#             tail = true
+# Starts the daemon when it is not running, and reconnects if it restarts.
+
+dir="${XDG_RUNTIME_DIR:-/tmp}/status-daemon"
+name="$1"
+[ "$2" = "polybar" ] && name="$name.polybar"
+
+trap 'kill "$reader" 2>/dev/null; exit' HUP INT TERM
+
+while :; do
+    # Returns once the FIFOs exist, at once when the daemon is already running
+    "$(dirname "$0")/status-daemon.py" --background
+    cat "$dir/$name" 2>/dev/null &
+    reader=$!
+    # Ask for the current value, the daemon cannot tell a new reader from the
+    # previous one. Opened read-write so this never blocks.
+    [ -p "$dir/control" ] && echo "$name" 1<>"$dir/control"
+    wait "$reader"
+    sleep 1
+done
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Status bar daemon for i3blocks and polybar
+One long-lived process samples /proc/stat, /proc/meminfo and /sys/class/net
+and keeps the previous counters in memory, instead of a script (and its
+awk/bc children) being started for every block on every interval.
+Each block in status-daemon.ini has its own update interval. Its output is
+streamed into a FIFO in $XDG_RUNTIME_DIR/status-daemon/: <block> carries
+i3blocks JSON lines (interval=persist, format=json) and <block>.polybar
+carries polybar tail lines. status-block.sh connects a bar block to its FIFO
+with cat, and starts the daemon when it is not running.
+A line is only written when the block's text changes, or when a bar
+(re)connects: status-block.sh writes the FIFO's name to the control FIFO in
+the same directory and gets the current value replayed.
+Usage: status-daemon.py [--config FILE] [--dir DIR] [--background]
+       status-daemon.py --print [BLOCK ...]
+"""
+
+import argparse
+import configparser
+import errno
+import fcntl
+import heapq
+import json
+import os
+import select
+import signal
+import socket
+import struct
+import sys
+import time
+
+DEFAULT_CONFIG = os.path.expanduser("~/.config/i3blocks/status-daemon.ini")
+DEFAULT_DIR = os.path.join(os.environ.get('XDG_RUNTIME_DIR', '/tmp'), "status-daemon")
+CONNECT_RETRY = 1.0  # seconds between looking for newly started bar readers
+
+# Used when there is no config file, same blocks as the shipped i3blocks config
+DEFAULT_BLOCKS = {
+    'cpu': {'type': 'cpu', 'interval': '1'},
+    'memory': {'type': 'memory', 'interval': '5'},
+    'eth0_ip': {'type': 'net', 'interface': 'eth0', 'interval': '10'},
+    'wlan0_ip': {'type': 'net', 'interface': 'wlan0', 'interval': '10'},
+    'tun0_ip': {'type': 'net', 'interface': 'tun0', 'interval': '10'},
+    'clock': {'type': 'clock', 'format': '%Y-%m-%d %H:%M', 'interval': '5'},
+}
+
+# --------------- Blocks -----------------------------------------
+
+class CpuBlock:
+    """Busy percentage of all CPUs since the previous sample"""
+
+    def __init__(self, options):
+        self.warning = float(options.get('warning', 50))
+        self.critical = float(options.get('critical', 80))
+        self.previous = None
+
+    def sample(self):
+        with open("/proc/stat") as f:
+            # cpu  user nice system idle iowait irq softirq steal guest guest_nice
+            fields = [int(value) for value in f.readline().split()[1:]]
+        total = sum(fields)
+        idle = fields[3] + fields[4]
+        previous, self.previous = self.previous, (total, idle)
+        if previous is None or total == previous[0]:
+            usage = 0.0
+        else:
+            usage = (total - previous[0] - (idle - previous[1])) / (total - previous[0]) * 100
+        usage = min(100.0, max(0.0, usage))
+        color = "#00FF00"
+        if usage > self.critical:
+            color = "#FF0000"
+        elif usage > self.warning:
+            color = "#FFFF00"
+        return f"CPU: {usage:.1f}%", color
+
+def human_kib(kib):
+    """Size in KiB formatted like `free -h`"""
+    value = float(kib)
+    for unit in ('Ki', 'Mi', 'Gi', 'Ti'):
+        if value < 1024 or unit == 'Ti':
+            break
+        value /= 1024
+    return f"{value:.1f}{unit}" if value < 10 else f"{value:.0f}{unit}"
+
+class MemoryBlock:
+    """Used/total memory, used meaning MemTotal - MemAvailable"""
+
+    def __init__(self, options):
+        pass
+
+    def sample(self):
+        info = {}
+        with open("/proc/meminfo") as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                if key in ('MemTotal', 'MemAvailable'):
+                    info[key] = int(value.split()[0])
+                    if len(info) == 2:
+                        break
+        return f"{human_kib(info['MemTotal'] - info['MemAvailable'])}/{human_kib(info['MemTotal'])}", None
+
+class NetBlock:
+    """IPv4 address of an interface, or its rx/tx rates with show = rates; empty when it is down"""
+    SIOCGIFADDR = 0x8915
+
+    def __init__(self, options):
+        self.interface = options.get('interface', 'eth0')
+        self.show = options.get('show', 'address')
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.previous = None
+
+    def address(self):
+        ifreq = struct.pack('256s', self.interface[:15].encode())
+        try:
+            return socket.inet_ntoa(fcntl.ioctl(self.sock.fileno(), self.SIOCGIFADDR, ifreq)[20:24])
+        except OSError:
+            return ""
+
+    def rates(self):
+        stats = f"/sys/class/net/{self.interface}/statistics"
+        try:
+            with open(f"{stats}/rx_bytes") as rx, open(f"{stats}/tx_bytes") as tx:
+                now, rx_bytes, tx_bytes = time.monotonic(), int(rx.read()), int(tx.read())
+        except (OSError, ValueError):
+            self.previous = None
+            return ""
+        previous, self.previous = self.previous, (now, rx_bytes, tx_bytes)
+        if previous is None or now <= previous[0]:
+            return "↓0 ↑0"
+        elapsed = now - previous[0]
+        return (f"↓{human_bits((rx_bytes - previous[1]) * 8 / elapsed)} "
+                f"↑{human_bits((tx_bytes - previous[2]) * 8 / elapsed)}")
+
+    def sample(self):
+        try:
+            with open(f"/sys/class/net/{self.interface}/operstate") as f:
+                state = f.read().strip()
+        except OSError:
+            return "", None
+        if state == 'down':
+            self.previous = None
+            return "", None
+        return (self.rates() if self.show == 'rates' else self.address()), None
+
+def human_bits(bits_per_sec):
+    for unit in ('', 'k', 'M', 'G'):
+        if bits_per_sec < 1000:
+            break
+        bits_per_sec /= 1000
+    return f"{bits_per_sec:.0f}{unit}" if bits_per_sec >= 10 or not unit else f"{bits_per_sec:.1f}{unit}"
+
+class ClockBlock:
+    def __init__(self, options):
+        self.format = options.get('format', '%Y-%m-%d %H:%M')
+
+    def sample(self):
+        return time.strftime(self.format), None
+
+BLOCK_TYPES = {
+    'cpu': CpuBlock,
+    'memory': MemoryBlock,
+    'net': NetBlock,
+    'clock': ClockBlock,
+}
+
+def load_blocks(path):
+    """{name: (block, interval)} from the config file, DEFAULT_BLOCKS when it does not exist"""
+    config = configparser.ConfigParser(interpolation=None)
+    if not config.read(path):
+        config.read_dict(DEFAULT_BLOCKS)
+    blocks = {}
+    for name in config.sections():
+        options = config[name]
+        block_type = options.get('type', name)
+        if block_type not in BLOCK_TYPES:
+            print(f"Error: block [{name}] has unknown type '{block_type}'.", file=sys.stderr)
+            sys.exit(1)
+        blocks[name] = (BLOCK_TYPES[block_type](options), max(0.1, float(options.get('interval', 5))))
+    return blocks
+
+# --------------- Outputs ----------------------------------------
+
+def i3blocks_line(text, color):
+    record = {'full_text': text}
+    if color:
+        record['color'] = color
+    return json.dumps(record, ensure_ascii=False)
+
+def polybar_line(text, color):
+    text = text.replace('%', '%%')
+    return f"%{{F{color}}}{text}%{{F-}}" if color and text else text
+
+class Fifo:
+    """Write end of one block's FIFO, reconnected whenever a new reader opens it"""
+
+    def __init__(self, path, formatter):
+        self.path = path
+        self.formatter = formatter
+        self.fd = None
+        if not os.path.exists(path):
+            # An existing FIFO is kept, a bar still blocked opening it connects to us
+            os.mkfifo(path, 0o600)
+
+    def connect(self):
+        """True when a reader just connected"""
+        if self.fd is not None:
+            return False
+        try:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno in (errno.ENXIO, errno.ENOENT):
+                return False  # no reader yet
+            raise
+        return True
+
+    def write(self, text, color):
+        if self.fd is None:
+            return
+        try:
+            os.write(self.fd, (self.formatter(text, color) + "\n").encode())
+        except BlockingIOError:
+            pass  # reader is not keeping up, it gets the next change
+        except OSError:
+            os.close(self.fd)  # reader went away (EPIPE)
+            self.fd = None
+
+    def remove(self):
+        if self.fd is not None:
+            os.close(self.fd)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+# --------------- Daemon -----------------------------------------
+
+def replay_requests(control, pending):
+    """FIFO names written to the control FIFO since the last call"""
+    try:
+        pending += os.read(control, 4096)
+    except BlockingIOError:
+        return [], pending
+    *lines, pending = pending.split(b"\n")
+    return [line.decode(errors='replace').strip() for line in lines], pending
+
+def run(blocks, directory, ready=None):
+    fifos = {name: [Fifo(os.path.join(directory, name), i3blocks_line),
+                    Fifo(os.path.join(directory, f"{name}.polybar"), polybar_line)]
+             for name in blocks}
+    by_path = {os.path.basename(fifo.path): (name, fifo) for name, outputs in fifos.items() for fifo in outputs}
+    control_path = os.path.join(directory, "control")
+    if not os.path.exists(control_path):
+        os.mkfifo(control_path, 0o600)
+    # Opened read-write, so it never reports EOF between two writers
+    control = os.open(control_path, os.O_RDWR | os.O_NONBLOCK)
+    pending = b""
+    last = {}
+    if ready is not None:
+        os.close(ready)  # FIFOs exist, let `status-daemon.py --background` return
+    # Every block's own schedule, aligned to its interval so clocks tick on time
+    now = time.time()
+    queue = [(now, name) for name in blocks]
+    heapq.heapify(queue)
+    next_connect = now
+    try:
+        while True:
+            now = time.time()
+            if now >= next_connect:
+                next_connect = now + CONNECT_RETRY
+                for name, outputs in fifos.items():
+                    for fifo in outputs:
+                        if fifo.connect() and name in last:
+                            fifo.write(*last[name])
+            # A bar reconnecting to a FIFO we still hold open is not visible as
+            # a new open, so the wrapper asks for the current value instead
+            requests, pending = replay_requests(control, pending)
+            for request in requests:
+                name, fifo = by_path.get(request, (None, None))
+                if fifo and name in last:
+                    fifo.connect()
+                    fifo.write(*last[name])
+            while queue[0][0] <= now:
+                _, name = heapq.heappop(queue)
+                block, interval = blocks[name]
+                try:
+                    output = block.sample()
+                except (OSError, ValueError, KeyError, IndexError):
+                    output = ("", None)
+                if output != last.get(name):
+                    last[name] = output
+                    for fifo in fifos[name]:
+                        fifo.write(*output)
+                heapq.heappush(queue, ((now // interval + 1) * interval, name))
+            select.select([control], [], [], max(0.0, min(queue[0][0], next_connect) - time.time()))
+    finally:
+        os.close(control)
+        try:
+            os.unlink(control_path)
+        except OSError:
+            pass
+        for outputs in fifos.values():
+            for fifo in outputs:
+                fifo.remove()
+
+def print_blocks(blocks, names):
+    """Print updates of the chosen blocks to stdout, for checking a config"""
+    blocks = {name: blocks[name] for name in names or blocks}
+    queue = [(time.time(), name) for name in blocks]
+    last = {}
+    while True:
+        due, name = heapq.heappop(queue)
+        time.sleep(max(0.0, due - time.time()))
+        block, interval = blocks[name]
+        output = block.sample()
+        if output != last.get(name):
+            last[name] = output
+            print(f"{name}: {i3blocks_line(*output)}", flush=True)
+        heapq.heappush(queue, ((time.time() // interval + 1) * interval, name))
+
+def daemonize():
+    """Detach; the parent exits once the child closes the returned fd (ready or already running)"""
+    ready_read, ready_write = os.pipe()
+    if os.fork():
+        os.close(ready_write)
+        os.read(ready_read, 1)
+        os._exit(0)
+    os.close(ready_read)
+    os.setsid()
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    return ready_write
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stream status bar blocks to i3blocks and polybar from one process")
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help=f"block definitions (default: {DEFAULT_CONFIG})")
+    parser.add_argument('--dir', default=DEFAULT_DIR, help=f"FIFO directory (default: {DEFAULT_DIR})")
+    parser.add_argument('--background', action='store_true', help="detach, exit at once if already running")
+    parser.add_argument('--print', nargs='*', metavar='BLOCK', help="print block updates to stdout instead")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    blocks = load_blocks(args.config)
+    if args.print is not None:
+        unknown = [name for name in args.print if name not in blocks]
+        if unknown:
+            print(f"Error: unknown block(s): {', '.join(unknown)}")
+            sys.exit(1)
+        print_blocks(blocks, args.print)
+        return
+
+    os.makedirs(args.dir, mode=0o700, exist_ok=True)
+    ready = daemonize() if args.background else None
+    lock = open(os.path.join(args.dir, ".lock"), 'w')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        if not args.background:
+            print("status-daemon is already running.", file=sys.stderr)
+        return
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    run(blocks, args.dir, ready)
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
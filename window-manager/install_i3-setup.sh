@@ -38,7 +38,9 @@ echo "[+] Setting up i3blocks"
 mkdir -p ~/.config/i3blocks
 safe_copy "$SCRIPT_DIR/i3blocks/config" ~/.config/i3blocks/config
 safe_copy "$SCRIPT_DIR/i3blocks/rofi-launch.sh" ~/.config/i3blocks/rofi-launch.sh
-safe_copy "$SCRIPT_DIR/i3blocks/cpu.sh" ~/.config/i3blocks/cpu.sh
+safe_copy "$SCRIPT_DIR/i3blocks/status-daemon.py" ~/.config/i3blocks/status-daemon.py
+safe_copy "$SCRIPT_DIR/i3blocks/status-daemon.ini" ~/.config/i3blocks/status-daemon.ini
+safe_copy "$SCRIPT_DIR/i3blocks/status-block.sh" ~/.config/i3blocks/status-block.sh
 
 # 4. Setup polybar
 echo "[+] Setting up polybar"